@@ -0,0 +1,81 @@
+"""
+Single-pass OCR correction tables.
+
+The stages fix known OCR misreadings with find-and-replace dictionaries. Going
+through a dictionary with one str.replace (or re.sub) per entry costs a scan of
+the text per entry, so the cost grows with the size of the dictionary.
+
+CorrectionTable compiles a dictionary once into a single regex and replaces
+every match through a dictionary lookup, scanning the text once. The keys are
+laid out as a trie (shared prefixes are matched once), so the work at each
+position is bounded by the key length and the number of distinct characters
+that can follow a prefix, and levels off as the dictionary grows.
+At each position the longest key wins, and replaced text is not scanned again.
+"""
+import re
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+def trie_pattern(keys) -> str:
+    """
+    Regex source matching any of the literal keys, longest key first.
+
+    ['each', 'ea', 'eachch'] becomes 'ea(?:ch(?:ch)?)?': after a shared
+    prefix the pattern tries to continue before settling for the shorter key.
+    """
+    trie = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return f'(?:{body})?'
+        return body
+
+    return build(trie)
+
+
+class CorrectionTable:
+    """
+    A correction dictionary ({misread: correction}) compiled for single-pass use.
+
+    By default every occurrence of a key is replaced. A regex can be given
+    instead to restrict where corrections apply (e.g. only next to digits);
+    each of its matches is looked up in the dictionary.
+    """
+
+    def __init__(self, corrections: Dict[str, str], regex: Optional[re.Pattern] = None):
+        # Entries that map a word to itself never change the text
+        self.corrections = {incorrect: correct for incorrect, correct in corrections.items()
+                            if incorrect and incorrect != correct}
+        if regex is None:
+            regex = re.compile(trie_pattern(self.corrections)) if self.corrections else None
+        self.regex = regex
+
+    def _replace(self, match: re.Match) -> str:
+        found = match.group(0)
+        return self.corrections.get(found, found)
+
+    def apply(self, text: str) -> str:
+        """Correct one string."""
+        if self.regex is None:
+            return text
+        return self.regex.sub(self._replace, text)
+
+    def apply_series(self, texts: pd.Series) -> pd.Series:
+        """Correct a whole column of strings; missing values stay missing."""
+        if self.regex is None:
+            return texts
+        return texts.str.replace(self.regex, self._replace, regex=True)
+
+    def __len__(self) -> int:
+        return len(self.corrections)
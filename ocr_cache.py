@@ -0,0 +1,126 @@
+"""
+On-disk cache of per-page OCR results.
+
+Each entry holds the PaddleOCR output of one rendered page (rec_texts, rec_polys,
+rec_scores) as JSON. Entries are keyed by the SHA-256 of the PDF bytes, the page
+number, the render DPI and the detection/recognition model names, so re-running the
+pipeline after changing a downstream heuristic skips ocr.predict for pages already seen.
+The cache is capped in bytes and evicts the least recently used entries first.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def pdf_content_hash(pdf_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a PDF file's bytes."""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_ocr_result(results) -> dict:
+    """
+    Convert a PaddleOCR page result into plain lists so it can be pickled,
+    written as JSON, and read back with the same values.
+    """
+    rec_texts = [str(text) for text in results.get("rec_texts", [])]
+    rec_polys = [np.asarray(poly).tolist() for poly in results.get("rec_polys", [])]
+    rec_scores = [float(score) for score in results.get("rec_scores", [])]
+    return {"rec_texts": rec_texts, "rec_polys": rec_polys, "rec_scores": rec_scores}
+
+
+class OcrPageCache:
+    """
+    Directory of JSON files, one per OCR'd page, with an LRU size cap.
+
+    Recency is tracked with file modification times: a hit touches the entry,
+    and eviction removes the oldest entries until the total size fits.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def make_key(pdf_hash: str, page_number: int, dpi: int, det_model: str, rec_model: str,
+                 render_mode: str = "full") -> str:
+        """Build the cache key for one page of one PDF rendered and OCR'd with the given settings."""
+        raw = f"{pdf_hash}|{page_number}|{dpi}|{det_model}|{rec_model}"
+        if render_mode != "full":
+            raw += f"|{render_mode}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entries(self):
+        """Yield (path, mtime, size) for every cache entry."""
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_mtime, stat.st_size
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached OCR result for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as most recently used
+        self.hits += 1
+        return results
+
+    def put(self, key: str, results: dict) -> None:
+        """Store a normalized OCR result and evict old entries if over the size cap."""
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+        previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        self._total_bytes += os.path.getsize(path) - previous_size
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def log_stats(self) -> None:
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        logging.info(f"OCR cache: {self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate), "
+                     f"{self.evictions} evictions, {self._total_bytes / (1024 * 1024):.1f} MB in {self.cache_dir}")
@@ -0,0 +1,153 @@
+"""
+Page-range shards and a resumable checkpoint manifest for long OCR runs.
+
+A long extraction is split into shards of consecutive pages. Each shard's word
+rows are written to their own CSV as soon as the shard finishes, and the shard
+is then recorded in a JSON manifest. A restarted run with the same PDF, page
+range and settings skips the recorded shards and resumes at the first
+incomplete page; merge_shards() then assembles the final word-coordinate CSV.
+"""
+import json
+import logging
+import os
+import shutil
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from ocr_writer import OcrRowWriter, output_format
+from table_schema import OCR_WORDS_DTYPES
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def plan_shards(start_page: int, end_page: int, shard_size: int) -> List[Tuple[int, int]]:
+    """Split the 1-based inclusive page range into (first, last) shards of at most shard_size pages."""
+    if shard_size < 1:
+        return [(start_page, end_page)]
+    return [(first, min(first + shard_size - 1, end_page))
+            for first in range(start_page, end_page + 1, shard_size)]
+
+
+def shard_file_name(first_page: int, last_page: int) -> str:
+    return f"pages_{first_page:04d}-{last_page:04d}.csv"
+
+
+class ShardManifest:
+    """
+    JSON record of the shards already written for one run.
+
+    The manifest stores the run settings it was created with (PDF hash, page
+    range, shard size, OCR settings). A manifest written with different settings
+    is discarded, so a resumed run never mixes shards from incompatible runs.
+    """
+
+    def __init__(self, shard_dir: str, run_config: dict):
+        self.shard_dir = shard_dir
+        self.run_config = run_config
+        self.completed = {}  # "first-last" -> {"first", "last", "file", "rows"}
+        os.makedirs(shard_dir, exist_ok=True)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.shard_dir, MANIFEST_NAME)
+
+    @classmethod
+    def load(cls, shard_dir: str, run_config: dict) -> 'ShardManifest':
+        """Open the manifest in shard_dir, or start a new one if it is missing or from another run."""
+        manifest = cls(shard_dir, run_config)
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return manifest
+        except json.JSONDecodeError:
+            logging.warning(f"Unreadable shard manifest {manifest.path}; starting over.")
+            return manifest
+
+        if saved.get('run_config') != run_config:
+            logging.warning(f"Shard manifest {manifest.path} was written with different settings; starting over.")
+            return manifest
+        for key, shard in saved.get('completed', {}).items():
+            # A shard only counts if its CSV is still there
+            if os.path.exists(os.path.join(shard_dir, shard['file'])):
+                manifest.completed[key] = shard
+        return manifest
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'run_config': self.run_config, 'completed': self.completed}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def shard_path(self, first_page: int, last_page: int) -> str:
+        return os.path.join(self.shard_dir, shard_file_name(first_page, last_page))
+
+    def is_complete(self, first_page: int, last_page: int) -> bool:
+        return f"{first_page}-{last_page}" in self.completed
+
+    def mark_complete(self, first_page: int, last_page: int, rows: int) -> None:
+        """Record a finished shard and flush the manifest to disk."""
+        self.completed[f"{first_page}-{last_page}"] = {
+            'first': first_page, 'last': last_page,
+            'file': shard_file_name(first_page, last_page), 'rows': rows,
+        }
+        self.save()
+
+    def first_incomplete_page(self, shards: List[Tuple[int, int]]) -> Optional[int]:
+        """Return the first page of the first shard not yet written, or None when all are done."""
+        for first_page, last_page in shards:
+            if not self.is_complete(first_page, last_page):
+                return first_page
+        return None
+
+
+def count_csv_rows(csv_path: str) -> int:
+    """Number of data rows in a CSV with a header line."""
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+def merge_shards(manifest: ShardManifest, shards: List[Tuple[int, int]], output_csv: str) -> int:
+    """
+    Concatenate the shard CSVs, in page order, into output_csv and return the
+    number of rows written. Files are streamed, so memory use does not grow
+    with the number of pages.
+    """
+    missing = [shard for shard in shards if not manifest.is_complete(*shard)]
+    if missing:
+        raise RuntimeError(f"Cannot merge: shards {missing} are not complete.")
+
+    if output_format(output_csv) == 'parquet':
+        return _merge_shards_to_parquet(manifest, shards, output_csv)
+
+    rows = 0
+    tmp_path = f"{output_csv}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+        for index, (first_page, last_page) in enumerate(shards):
+            with open(manifest.shard_path(first_page, last_page), 'r', encoding='utf-8', newline='') as f:
+                header = f.readline()
+                if index == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+            rows += manifest.completed[f"{first_page}-{last_page}"]['rows']
+    os.replace(tmp_path, output_csv)
+    return rows
+
+
+def _merge_shards_to_parquet(manifest: ShardManifest, shards: List[Tuple[int, int]], output_csv: str,
+                             chunk_rows: int = 100_000) -> int:
+    """
+    Convert the shard CSVs, in page order and in bounded chunks, into one Parquet file.
+    Words are read as written: OCR text such as 'NA', 'null' or 'nan' stays text,
+    and only empty numeric fields become missing values.
+    """
+    columns = list(pd.read_csv(manifest.shard_path(*shards[0]), nrows=0).columns)
+    dtypes = {column: OCR_WORDS_DTYPES.get(column, "string") for column in columns}
+    na_values = {column: [''] for column, dtype in dtypes.items() if dtype != "string"}
+    with OcrRowWriter(output_csv, columns) as writer:
+        for first_page, last_page in shards:
+            for chunk in pd.read_csv(manifest.shard_path(first_page, last_page), chunksize=chunk_rows,
+                                     dtype=dtypes, keep_default_na=False, na_values=na_values):
+                writer.write_batch(chunk)
+    return writer.rows_written
@@ -0,0 +1,95 @@
+"""
+Incremental writer for OCR word rows.
+
+The extractor hands over one page of words at a time as a DataFrame and the
+writer appends it to disk straight away, so memory holds one page of rows
+rather than the whole document. Output goes to CSV (appended chunks, header
+written once) or, for a .parquet path, to one Parquet row group per batch.
+pyarrow is only needed for Parquet output and is imported on first use.
+
+Rows are written to "<path>.part" and moved into place on close(), so an
+interrupted run never leaves a truncated file under the final name.
+"""
+import logging
+import os
+from typing import List, Optional
+
+import pandas as pd
+
+from table_schema import OCR_WORDS_DTYPES, cast_to_schema, import_pyarrow, output_format
+
+
+class OcrRowWriter:
+    """
+    Append word-row batches to a CSV or Parquet file.
+
+    Use as a context manager: the file is finalized on a clean exit and the
+    partial file is removed if an exception escapes.
+    """
+
+    def __init__(self, output_path: str, columns: List[str], file_format: Optional[str] = None):
+        self.output_path = str(output_path)
+        self.columns = list(columns)
+        self.file_format = file_format or output_format(self.output_path)
+        self.part_path = f"{self.output_path}.part"
+        self.rows_written = 0
+        self.batches_written = 0
+        self._parquet_writer = None
+        self._schema = None
+
+        if self.file_format == 'parquet':
+            pa, _ = import_pyarrow()
+            dtypes = {column: OCR_WORDS_DTYPES.get(column, "string") for column in self.columns}
+            self._dtypes = dtypes
+            self._schema = pa.Schema.from_pandas(
+                pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()}),
+                preserve_index=False)
+
+        os.makedirs(os.path.dirname(self.output_path) or '.', exist_ok=True)
+        if self.file_format == 'csv':
+            # Header up front, so a document with no words still yields a readable CSV
+            pd.DataFrame(columns=self.columns).to_csv(self.part_path, index=False)
+
+    def write_batch(self, batch: pd.DataFrame) -> None:
+        """Append one batch (typically one page) of rows."""
+        batch = batch[self.columns]
+        if self.file_format == 'csv':
+            if len(batch):
+                batch.to_csv(self.part_path, mode='a', header=False, index=False)
+        else:
+            pa, pq = import_pyarrow()
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.part_path, self._schema)
+            if len(batch):
+                table = pa.Table.from_pandas(cast_to_schema(batch, self._dtypes), schema=self._schema, preserve_index=False)
+                self._parquet_writer.write_table(table)
+        self.rows_written += len(batch)
+        self.batches_written += 1
+
+    def close(self) -> None:
+        """Finish the file and move it to output_path."""
+        if self.file_format == 'parquet':
+            if self._parquet_writer is None:
+                _, pq = import_pyarrow()
+                self._parquet_writer = pq.ParquetWriter(self.part_path, self._schema)
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        os.replace(self.part_path, self.output_path)
+        logging.info(f"Wrote {self.rows_written} rows in {self.batches_written} batches to {self.output_path}")
+
+    def abort(self) -> None:
+        """Drop the partial file."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def __enter__(self) -> 'OcrRowWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,218 @@
+"""
+Compiled regular expressions shared by the pipeline stages.
+
+Every stage used to build its regexes inline, on every call and often inside
+loops over words. The patterns live here instead, compiled once at import:
+commodity numbers, tariff paragraphs, units of quantity, rates of duty and
+header noise.
+
+Where a stage tries a list of patterns in order and keeps the first one that
+matches (units, rates), the list is compiled into a single FirstMatchPattern,
+which gives the same result as the original loop with one combined search in
+the common case.
+"""
+import re
+from typing import List, Optional
+
+
+class FirstMatchPattern:
+    """
+    An ordered list of patterns compiled into one regex.
+
+    search(text) returns what this loop returns:
+
+        for pattern in patterns:
+            match = re.search(pattern, text, flags)
+            if match:
+                return match
+
+    The combined regex (one named group per pattern) finds the leftmost
+    position where any pattern matches, and the first pattern in list order
+    that matches there. No pattern matches further left, so only the patterns
+    ahead of it in the list still need a search, starting after that position.
+    Text that matches nothing, or whose leftmost match is the first pattern,
+    costs a single search.
+    """
+
+    def __init__(self, patterns: List[str], flags: int = 0):
+        self.patterns = list(patterns)
+        self.compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+        self.combined = re.compile('|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(self.patterns)), flags)
+
+    def search(self, text: str) -> Optional[re.Match]:
+        leftmost = self.combined.search(text)
+        if leftmost is None:
+            return None
+        index, pos = int(leftmost.lastgroup[1:]), leftmost.start()
+        for earlier in self.compiled[:index]:
+            match = earlier.search(text, pos + 1)
+            if match:
+                return match
+        return self.compiled[index].match(text, pos)
+
+    def __iter__(self):
+        return iter(self.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+
+def any_of(patterns: List[str], flags: int = 0) -> re.Pattern:
+    """One regex that matches wherever any of the patterns matches."""
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), flags)
+
+
+###############################################
+# Commodity numbers
+###############################################
+
+# A whole word that is a commodity number: 0291 000, 0293100
+COMMODITY_NUMBER = re.compile(r'\d{4}\s*\d{3}')
+# Schedule A numbers as printed (00xx xxx), matched against a whole word
+SCHEDULE_A_NUMBER = re.compile(r'^00\d{2}\s?\d{3}$')
+# Words that start like a commodity number, used to locate the commodity column
+COMMODITY_CANDIDATE = re.compile(r'^\d{7}|\d{4}\s*\d{3}')
+# Formatted table keys: 0010 600
+SPACED_COMMODITY_NUMBER = re.compile(r'^\d{4}\s?\d{3}$')
+
+# Commodity numbers inside free text, tried in this order
+COMMODITY_NUMBER_FORMATS = [
+    re.compile(r'\b(\d{4})\s*(\d{3})\b'),  # 4 digits + 3 digits with optional space
+    re.compile(r'\b(\d{3})\s*(\d{4})\b'),  # 3 digits + 4 digits with optional space
+    re.compile(r'\b(\d{7})\b'),            # 7 digits together
+    re.compile(r'\b(\d{4})\s+(\d{2})\s*(\d{1})\b'),  # 4 + 2 + 1 format
+]
+
+NON_DIGITS = re.compile(r'[^\d]')
+NON_ASCII_DIGITS = re.compile(r'[^0-9]')
+
+
+def digit_context_pattern(chars: str) -> re.Pattern:
+    """
+    Any of chars (characters misread for digits) in numeric context: between
+    two digits, at the start before a digit, or at the end after a digit.
+    """
+    c = '[' + ''.join(re.escape(char) for char in chars) + ']'
+    return re.compile(rf'(?<=\d){c}(?=\d)|^{c}(?=\d)|(?<=\d){c}$')
+
+
+###############################################
+# Tariff paragraphs
+###############################################
+
+# A whole word that is a tariff paragraph: 1530(b), 1765
+TARIFF_PARAGRAPH = re.compile(r'\d{3,4}(?:\([a-zA-Z]\))?')
+# Paragraphs of Schedule A (Group 00), matched against a whole word
+SCHEDULE_A_TARIFF = re.compile(r'^(70[0-9]|71[0-9]|1558)$')
+THREE_DIGIT_TARIFF = re.compile(r'^\d{3}$')
+
+
+###############################################
+# Units of quantity
+###############################################
+
+# A word that is a unit on its own (including common OCR misreads)
+UNIT_WORD = re.compile(r'^(No|Lb|each|ea|N0|1b|Ib)\.?$', re.IGNORECASE)
+
+# Units in description text, tried in this order
+UNIT_PATTERNS = [
+    r'\b(lb|lbs|pound|pounds)\b',
+    r'\b(kg|kilogram|kilograms)\b',
+    r'\b(ton|tons|tonne|tonnes)\b',
+    r'\b(gal|gallon|gallons)\b',
+    r'\b(qt|quart|quarts)\b',
+    r'\b(pt|pint|pints)\b',
+    r'\b(oz|ounce|ounces)\b',
+    r'\b(cu\s?ft|cubic\s+feet?)\b',
+    r'\b(sq\s?ft|square\s+feet?)\b',
+    r'\b(linear\s+feet?|lin\s?ft)\b',
+    r'\b(yard|yards|yd)\b',
+    r'\b(meter|metres?|m)\b',
+    r'\b(each|ea)\b',
+    r'\b(dozen|doz)\b',
+    r'\b(gross)\b',
+    r'\b(case|cases)\b',
+    r'\b(box|boxes)\b',
+    r'\b(bag|bags)\b',
+    r'\b(bale|bales)\b',
+    r'\b(bundle|bundles)\b',
+    r'\b(head|hd)\b',  # For livestock
+    r'\b(no|number)\b',  # Sometimes "No" indicates quantity units
+]
+UNIT = FirstMatchPattern(UNIT_PATTERNS, re.IGNORECASE)
+
+# Context-aware patterns for specific commodities
+UNIT_CONTEXT_PATTERNS = {
+    'livestock': {
+        'patterns': [r'cattle', r'sheep', r'lamb', r'swine', r'pig', r'horse', r'animal'],
+        'units': ['No', 'Head']
+    },
+    'weight_based': {
+        'patterns': [r'meat', r'beef', r'pork', r'carcass', r'dressed', r'fresh', r'frozen'],
+        'units': ['Lb', 'Cwt']
+    },
+    'volume_based': {
+        'patterns': [r'liquid', r'oil', r'milk', r'beverage'],
+        'units': ['Gal', 'Qt']
+    },
+    'count_based': {
+        'patterns': [r'eggs', r'birds', r'chickens', r'turkeys', r'ducks', r'poultry'],
+        'units': ['No', 'Doz']
+    }
+}
+
+# (context type, any-of regex for the context words, [(unit, whole-word regex)])
+UNIT_CONTEXTS = [
+    (context_type,
+     any_of(context_info['patterns'], re.IGNORECASE),
+     [(unit, re.compile(rf'\b{re.escape(unit.lower())}\b', re.IGNORECASE)) for unit in context_info['units']])
+    for context_type, context_info in UNIT_CONTEXT_PATTERNS.items()
+]
+
+
+###############################################
+# Rates of duty
+###############################################
+
+# Rate formats including OCR artifacts, tried in this order
+RATE_PATTERNS = [
+    r'(\d+\.?\d*%)',           # Percentage rates (12%, 15%, etc.)
+    r'(\d+½%)',                # Half percentages (12½%)
+    r'(\d+%%\d*)',             # OCR artifacts like "12%%1"
+    r'(Free\.?)',              # Free rates
+    r'(\$\d+\.?\d*)',          # Dollar amounts
+    r'(\d+\.\d+%)',            # Decimal percentages
+    # OCR artifacts from page 28 data
+    r'(2y21b)',                # OCR artifact for "2½¢ lb"
+    r'(31b)',                  # OCR artifact for "3¢ lb"
+    r'(1½)',                   # Half cent rates
+    r'(\d+¢)',                 # Cent rates
+    r'(\d+t)',                 # OCR "t" for "¢"
+    r'(\d+plb)',               # OCR "plb" patterns
+    r'(\d+each)',              # "each" rates
+    r'(\$\d+\s+each)',         # Dollar each rates
+]
+RATE = FirstMatchPattern(RATE_PATTERNS, re.IGNORECASE)
+DOLLAR_EACH = re.compile(r'\$(\d+\.?\d*)\s*each', re.IGNORECASE)
+
+
+###############################################
+# Noise and text cleanup
+###############################################
+
+# Header lines and fragments that are not descriptions (matched at the start)
+NOISE_PATTERNS = [
+    r'^[A-Z0-9\s]+$',  # All caps abbreviations
+    r'^\d+$',          # Just numbers
+    r'^[^\w\s]+$',     # Just punctuation
+    r'SCHEDULE A',
+    r'COMMODITY',
+    r'RATE OF DUTY',
+    r'TARIFF',
+    r'Group.*ANIMAL',
+    r'ECONOMIC CLASS'
+]
+NOISE = any_of(NOISE_PATTERNS, re.IGNORECASE)
+
+WHITESPACE_RUN = re.compile(r'\s+')
+DASH_RUN = re.compile(r'-+')
@@ -0,0 +1,160 @@
+"""
+Shared schema and file I/O for the tables passed between pipeline stages.
+
+The intermediate artifacts (ocr_word_coords, cleaned_classified_words and
+final-table) are stored as Parquet, which keeps column types across stages and
+is read without re-parsing text. Each artifact has a column-type map below;
+write_table() casts to it before writing, and read_table() hands every stage
+plain numpy/object columns with NaN for missing values, the same shapes the
+stages got from pd.read_csv.
+
+A path ending in .csv is still written as CSV, and read_table() recognizes a
+Parquet file by its magic bytes, so CSV inputs keep working everywhere.
+pyarrow is only imported when a Parquet file is actually read or written.
+"""
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+PARQUET_MAGIC = b'PAR1'
+
+COORDINATE_DTYPES = {
+    "TopLeft_X": "Int64", "TopLeft_Y": "Int64",
+    "TopRight_X": "Int64", "TopRight_Y": "Int64",
+    "BottomRight_X": "Int64", "BottomRight_Y": "Int64",
+    "BottomLeft_X": "Int64", "BottomLeft_Y": "Int64",
+}
+
+# ocr_word_coords: one row per recognized word (01_get_ocr_data.py)
+OCR_WORDS_DTYPES = {
+    "Word": "string",
+    "Confidence": "float64",
+    **COORDINATE_DTYPES,
+    "Page": "Int64",
+}
+
+# cleaned_classified_words: words split into table columns (enhanced_clean.py).
+# Commodity numbers are stored as float64 only for on-disk compatibility; stages
+# derive Int64 keys from them with commodity.parse_commodity_numbers when a table is read.
+CLEANED_WORDS_DTYPES = {
+    "Commodity Number": "float64",
+    "Commodity Description": "string",
+    "Unit of Quantity": "string",
+    "Rate of Duty 1930": "string",
+    "Rate of Duty Trade Agreement": "string",
+    "Tariff Paragraph": "string",
+    **COORDINATE_DTYPES,
+    "Confidence": "float64",
+    "Page": "Int64",
+    "Indent Level": "Int64",  # added by 03: indentation level of the word's description line
+}
+
+# final-table: one row per commodity number (02 creates it, 03-06 fill in columns)
+FINAL_TABLE_DTYPES = {
+    "SCHEDULE A COMMODITY NUMBER": "string",
+    "COMMODITY DESCRIPTION AND ECONOMIC CLASS": "string",
+    "UNIT OF QUANTITY": "string",
+    "RATE OF DUTY 1930": "string",
+    "RATE OF DUTY TRADE AGREEMENT": "string",
+    "TARIFF PARAGRAPH": "string",
+}
+
+
+def output_format(path: str) -> str:
+    """Return 'parquet' for .parquet/.pq paths and 'csv' otherwise."""
+    return 'parquet' if os.path.splitext(str(path))[1].lower() in ('.parquet', '.pq') else 'csv'
+
+
+def import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet files need pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def _as_text(column: pd.Series) -> pd.Series:
+    """Strings with empty values as missing, matching what a CSV round trip gives."""
+    text = column.map(lambda value: value if isinstance(value, str) else str(value), na_action='ignore')
+    return text.where(text.notna() & (text != ''), None).astype("string")
+
+
+def cast_to_schema(df: pd.DataFrame, dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Cast df's columns to the schema types. Columns not in the schema keep their
+    type, except object columns, which are stored as text.
+    """
+    dtypes = dtypes or {}
+    out = df.copy()
+    for column in out.columns:
+        dtype = dtypes.get(column)
+        if dtype == "string" or (dtype is None and out[column].dtype == object):
+            out[column] = _as_text(out[column])
+        elif dtype is not None:
+            values = pd.to_numeric(out[column], errors='coerce')
+            try:
+                out[column] = values.astype(dtype)
+            except TypeError:
+                out[column] = values.astype("float64")  # e.g. fractional values in an integer column
+    return out
+
+
+def write_table(df: pd.DataFrame, path: str, dtypes: Optional[Dict[str, str]] = None) -> None:
+    """
+    Write a stage output. Parquet paths are cast to `dtypes` and written
+    atomically; .csv paths are written as plain CSV.
+    """
+    os.makedirs(os.path.dirname(str(path)) or '.', exist_ok=True)
+    if output_format(path) == 'csv':
+        df.to_csv(path, index=False)
+        return
+
+    pa, pq = import_pyarrow()
+    table = pa.Table.from_pandas(cast_to_schema(df, dtypes), preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def is_parquet_file(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(PARQUET_MAGIC)) == PARQUET_MAGIC
+
+
+def as_read_back(df: pd.DataFrame, dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    df as read_table() returns it after write_table() to a Parquet path, without
+    the file: cast to the schema, then plain numpy/object columns with NaN for
+    missing values and a fresh RangeIndex. Stages run in one process hand each
+    other tables in this shape.
+    """
+    out = cast_to_schema(df, dtypes).reset_index(drop=True)
+    for column in out.columns:
+        values = out[column]
+        if isinstance(values.dtype, pd.StringDtype) or values.dtype == object:
+            out[column] = values.astype(object).where(values.notna(), np.nan)
+        elif pd.api.types.is_extension_array_dtype(values.dtype):
+            numpy_dtype = values.dtype.numpy_dtype
+            if values.isna().any():
+                numpy_dtype = np.float64 if values.dtype.kind in 'iuf' else object
+            out[column] = values.to_numpy(dtype=numpy_dtype, na_value=np.nan)
+    return out
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """
+    Read a stage input written by write_table() (or any CSV). Parquet columns
+    come back as numpy dtypes, integers with gaps as float64, and text columns
+    as object with NaN for missing values.
+    """
+    if not is_parquet_file(path):
+        return pd.read_csv(path)
+
+    _, pq = import_pyarrow()
+    df = pq.read_table(path).to_pandas(ignore_metadata=True)
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
@@ -0,0 +1,51 @@
+"""
+Canonical commodity number keys.
+
+Schedule A commodity numbers have seven digits and are printed as 'XXXX XXX'
+('0010 600'). The stages see them in several shapes: the cleaned words table
+holds them as numbers, so the leading zeros are gone (10600.0), while the
+final table holds the printed form. Joining the two used to mean rebuilding
+one format from the other, row by row, in every stage.
+
+The canonical key is the seven-digit number as an integer (10600 for
+'0010 600'), in a nullable fixed-width integer column (COMMODITY_KEY_DTYPE).
+parse_commodity_numbers() turns any of the shapes above into keys for a whole
+column at once, and format_commodity_numbers() prints keys the way the final
+table shows them, so stages join on keys with a plain indexed lookup.
+"""
+import pandas as pd
+
+from patterns import NON_DIGITS
+
+COMMODITY_KEY_DTYPE = 'Int64'
+COMMODITY_DIGITS = 7
+
+
+def parse_commodity_numbers(values) -> pd.Series:
+    """
+    Canonical keys for a column of commodity numbers: 10600.0, 10600, '10600.0',
+    '0010600' and '0010 600' all become 10600. Missing values, and values that
+    are not a number of at most seven digits, become <NA>.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        numbers = values.astype(float)
+        valid = (numbers % 1 == 0) & (numbers >= 0) & (numbers < 10 ** COMMODITY_DIGITS)
+        return numbers.where(valid).astype(COMMODITY_KEY_DTYPE)
+
+    text = values.astype(str).str.strip().str.replace(r'\.0*$', '', regex=True)
+    digits = text.str.replace(NON_DIGITS, '', regex=True)
+    valid = values.notna() & digits.str.len().between(1, COMMODITY_DIGITS)
+    return pd.to_numeric(digits.where(valid), errors='coerce').astype(COMMODITY_KEY_DTYPE)
+
+
+def format_commodity_numbers(keys) -> pd.Series:
+    """Keys printed as in the final table ('0010 600'); '' for missing keys."""
+    keys = pd.Series(keys, dtype=COMMODITY_KEY_DTYPE)
+    digits = keys.astype(str).str.zfill(COMMODITY_DIGITS)
+    return (digits.str[:4] + ' ' + digits.str[4:]).where(keys.notna(), '').astype(object)
+
+
+def format_commodity_number(key) -> str:
+    """One key printed as in the final table."""
+    return format_commodity_numbers([key]).iloc[0]
@@ -1,14 +1,17 @@
 import json
-import re
 import pandas as pd
 import numpy as np
 from collections import Counter
+from commodity import format_commodity_numbers, parse_commodity_numbers
+from corrections import CorrectionTable
+from patterns import COMMODITY_NUMBER_FORMATS, NON_DIGITS, digit_context_pattern
+from table_schema import FINAL_TABLE_DTYPES, read_table, write_table
 
 
 # Configuration
-RAW_CSV = r'new-work/output/ocr_word_coords.csv'  # Raw OCR data
-CLEAN_CSV = r'new-work/output/cleaned_classified_words.csv'  # Path to your clean words CSV
-OUTPUT_CSV = r'new-work/output/final-table.csv'
+RAW_CSV = r'new-work/output/ocr_word_coords.parquet'  # Raw OCR data
+CLEAN_CSV = r'new-work/output/cleaned_classified_words.parquet'  # Path to your clean words table (Parquet or CSV)
+OUTPUT_CSV = r'new-work/output/final-table.parquet'
 
 COLUMNS = [
     'SCHEDULE A COMMODITY NUMBER',
@@ -19,13 +22,8 @@ COLUMNS = [
     'TARIFF PARAGRAPH'
 ]
 
-# Enhanced regex patterns for commodity numbers
-commodity_patterns = [
-    re.compile(r'\b(\d{4})\s*(\d{3})\b'),  # 4 digits + 3 digits with optional space
-    re.compile(r'\b(\d{3})\s*(\d{4})\b'),  # 3 digits + 4 digits with optional space  
-    re.compile(r'\b(\d{7})\b'),            # 7 digits together
-    re.compile(r'\b(\d{4})\s+(\d{2})\s*(\d{1})\b'),  # 4 + 2 + 1 format
-]
+# Regex patterns for commodity numbers, tried in order
+commodity_patterns = COMMODITY_NUMBER_FORMATS
 
 # OCR correction patterns for commodity numbers
 ocr_corrections = {
@@ -37,6 +35,8 @@ ocr_corrections = {
     'G': '6',   # G to 6 (sometimes)
     'B': '8',   # B to 8 (sometimes)
 }
+# Only in numeric context - when surrounded by digits or at start/end
+number_corrections = CorrectionTable(ocr_corrections, regex=digit_context_pattern(''.join(ocr_corrections)))
 
 
 def clean_ocr_artifacts_in_number(text):
@@ -47,13 +47,7 @@ def clean_ocr_artifacts_in_number(text):
     text = str(text).strip()
     
     # Apply OCR corrections for numbers
-    for incorrect, correct in ocr_corrections.items():
-        # Only apply in numeric context - when surrounded by digits or at start/end
-        text = re.sub(rf'(?<=\d){incorrect}(?=\d)', correct, text)
-        text = re.sub(rf'^{incorrect}(?=\d)', correct, text)
-        text = re.sub(rf'(?<=\d){incorrect}$', correct, text)
-    
-    return text
+    return number_corrections.apply(text)
 
 def extract_commodity_number(text):
     """Extract and format commodity number from text using multiple patterns."""
@@ -89,7 +83,7 @@ def extract_commodity_number(text):
                 return commodity_num
     
     # If no pattern matched but looks like commodity number
-    digits_only = re.sub(r'[^\d]', '', text)
+    digits_only = NON_DIGITS.sub('', text)
     if len(digits_only) == 7:
         commodity_num = f"{digits_only[:4]} {digits_only[4:]}"
         if is_valid_commodity_number(commodity_num):
@@ -169,45 +163,24 @@ def enhance_commodity_detection(df):
 
 def extract_commodity_numbers_from_csv(csv_path):
     """
-    Extract commodity numbers from the cleaned classified words CSV.
+    Extract commodity numbers from the cleaned classified words table.
     Returns formatted commodity numbers for the first column.
     """
-    df = pd.read_csv(csv_path)
-    
-    # Get all rows with commodity numbers (already cleaned by enhanced cleaning script)
-    commodity_rows = df[df['Commodity Number'].notna()].copy()
+    return extract_commodity_numbers(read_table(csv_path))
+
+def extract_commodity_numbers(df):
+    """
+    Unique commodity numbers of the cleaned classified words table, formatted
+    for the first column of the final table.
+    """
+    # Commodity numbers were already cleaned by the enhanced cleaning script
+    commodity_rows = df[df['Commodity Number'].notna()]
     
     print(f"Found {len(commodity_rows)} rows with commodity numbers")
     
-    # Extract unique commodity numbers
-    commodity_numbers = []
-    seen = set()
-    
-    for _, row in commodity_rows.iterrows():
-        commodity_num = str(row['Commodity Number']).strip()
-        if commodity_num and commodity_num != 'nan' and commodity_num not in seen:
-            # Clean and format the commodity number
-            clean_num = re.sub(r'[^\d]', '', commodity_num)  # Keep only digits
-            
-            if len(clean_num) == 7:
-                # Format as "0010 600"
-                formatted_num = f"{clean_num[:4]} {clean_num[4:]}"
-            elif len(clean_num) == 6:
-                # Add leading zero and format as "0010 600"  
-                formatted_num = f"0{clean_num[:3]} {clean_num[3:]}"
-            else:
-                formatted_num = clean_num
-            
-            commodity_numbers.append(formatted_num)
-            seen.add(commodity_num)
-    
-    # Sort by the numeric value to ensure proper order
-    def sort_key(commodity_num):
-        # Extract numeric part for sorting
-        digits = re.sub(r'[^\d]', '', commodity_num)
-        return int(digits) if digits else 0
-    
-    commodity_numbers.sort(key=sort_key)
+    # Unique commodity numbers in numeric order, formatted as "0010 600"
+    keys = parse_commodity_numbers(commodity_rows['Commodity Number']).dropna().drop_duplicates().sort_values()
+    commodity_numbers = format_commodity_numbers(keys).tolist()
     
     print(f"Extracted {len(commodity_numbers)} unique commodity numbers")
     print(f"Sample numbers: {commodity_numbers[:5]}")
@@ -218,9 +191,13 @@ def extract_commodity_numbers_from_csv(csv_path):
 
 def save_to_new_csv(commodity_numbers, output_csv, columns):
     """
-    Save commodity numbers to a new CSV file with all column headers.
+    Save commodity numbers to a new final table (Parquet or CSV) with all column headers.
     Creates empty columns for future data population.
     """
+    write_table(new_final_table(commodity_numbers, columns), output_csv, FINAL_TABLE_DTYPES)
+
+def new_final_table(commodity_numbers, columns=COLUMNS):
+    """The final table with commodity numbers in the first column and the other columns empty."""
     df = pd.DataFrame(columns=columns)
     
     # Fill first column with commodity numbers
@@ -230,7 +207,7 @@ def save_to_new_csv(commodity_numbers, output_csv, columns):
     for col in columns[1:]:
         df[col] = ""
     
-    df.to_csv(output_csv, index=False)
+    return df
 
 
 
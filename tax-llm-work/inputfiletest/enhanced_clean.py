@@ -4,23 +4,49 @@ This script analyzes OCR coordinates dynamically to classify words into proper c
 """
 import pandas as pd
 import numpy as np
-import re
 import logging
 import os
+from typing import Any, Dict, TypedDict
+from geometry import column_bands
+from patterns import COMMODITY_CANDIDATE, NON_ASCII_DIGITS, SCHEDULE_A_NUMBER, SCHEDULE_A_TARIFF, UNIT_WORD
+from table_schema import CLEANED_WORDS_DTYPES, read_table, write_table
 
 # Configuration
-INPUT_CSV = r'new-work/output/ocr_word_coords.csv'
-OUTPUT_CSV = r'new-work/output/cleaned_classified_words.csv'
+INPUT_CSV = r'new-work/output/ocr_word_coords.parquet'
+OUTPUT_CSV = r'new-work/output/cleaned_classified_words.parquet'
 DROP_ROWS_BEFORE = 14  # Number of initial rows to drop (headers/irrelevant)
 EXCLUDE_FOOTER_Y_THRESHOLD = 2700  # Exclude rows with Y coordinates above this (footer area)
+ZONE_TEMPLATE_TOLERANCE = 25  # Max X drift of a page's anchor columns to reuse a cached zone template
+COLUMN_BIN_WIDTH = 10  # Width of the X histogram bins used to find column bands
+COLUMN_MIN_GAP = 40  # Narrowest empty X stretch that separates two column bands
+COLUMN_MIN_SHARE = 0.02  # Share of a page's words a band needs to be taken as a table column
+
+# Output columns in the order classify_word_by_coordinates() returns them
+CLASSIFIED_COLUMNS = ['Commodity Number', 'Commodity Description', 'Unit of Quantity',
+                      'Rate of Duty 1930', 'Rate of Duty Trade Agreement', 'Tariff Paragraph']
+# Zones in the order they are checked, with the output column a word in the zone goes to
+ZONE_COLUMNS = [('commodity', 0), ('tariff', 5), ('unit', 2), ('rate_1930', 3), ('rate_trade', 4),
+                ('description', 1)]
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+class Zone(TypedDict):
+    """X extent of one table column on a page."""
+    min_x: float
+    max_x: float
+    center: float
+
+# Column name ('commodity', 'tariff', 'unit', 'description', 'rate_1930', 'rate_trade') -> zone
+ZoneMap = Dict[str, Zone]
+
 def load_and_preprocess(input_csv: str) -> pd.DataFrame:
-    """Load the OCR CSV and perform initial cleaning."""
-    df = pd.read_csv(input_csv)
+    """Load the OCR word table (Parquet or CSV) and perform initial cleaning."""
+    df = read_table(input_csv)
     logging.info(f"Loaded {len(df)} rows from {input_csv}")
-    
+    return preprocess(df)
+
+def preprocess(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the header rows and the footer area from the OCR word table."""
     # Drop header rows
     if DROP_ROWS_BEFORE > 0:
         df = df.iloc[DROP_ROWS_BEFORE:].reset_index(drop=True)
@@ -35,12 +61,24 @@ def load_and_preprocess(input_csv: str) -> pd.DataFrame:
     
     return df
 
-def analyze_coordinate_zones(df):
+def band_zone(band, pad_left: float, pad_right: float) -> Zone:
+    """Zone around a column band (a row of geometry.column_bands()), widened by the pads."""
+    return Zone(min_x=band['min_x'] - pad_left, max_x=band['max_x'] + pad_right, center=band['center'])
+
+def table_column_bands(bands: pd.DataFrame, word_count: int) -> pd.DataFrame:
+    """The column bands holding at least COLUMN_MIN_SHARE of the words, leaving out a few stray words."""
+    return bands[bands['count'] >= max(1, np.ceil(COLUMN_MIN_SHARE * word_count))]
+
+def analyze_coordinate_zones(df) -> ZoneMap:
     """Dynamically analyze coordinate patterns to identify zones for different data types."""
     zones = {}
+
+    # Column bands of the words' left edges, from one histogram pass
+    bands = column_bands(df['TopLeft_X'], COLUMN_BIN_WIDTH, COLUMN_MIN_GAP)
+    logging.info(f"Column bands: {', '.join(f'{band.min_x:.0f}-{band.max_x:.0f}' for band in bands.itertuples())}")
     
     # 1. Find COMMODITY NUMBERS by pattern
-    commodity_candidates = df[df['Word'].str.match(r'^\d{7}|\d{4}\s*\d{3}', na=False)]
+    commodity_candidates = df[df['Word'].str.match(COMMODITY_CANDIDATE, na=False)]
     if len(commodity_candidates) > 0:
         x_coords = commodity_candidates['TopLeft_X'].values
         zones['commodity'] = {
@@ -50,19 +88,16 @@ def analyze_coordinate_zones(df):
         }
         logging.info(f"Commodity zone: X={zones['commodity']['min_x']:.0f}-{zones['commodity']['max_x']:.0f}")
     
-    # 2. Find TARIFF PARAGRAPHS by pattern (rightmost)
-    tariff_candidates = df[df['Word'].str.match(r'^70[0-9]|^71[0-9]|^1558', na=False)]
-    if len(tariff_candidates) > 0:
-        x_coords = tariff_candidates['TopLeft_X'].values
-        zones['tariff'] = {
-            'min_x': np.min(x_coords) - 50,
-            'max_x': np.max(x_coords) + 100,
-            'center': np.median(x_coords)
-        }
+    # 2. TARIFF PARAGRAPHS are the rightmost column band that is not a few stray words
+    tariff_bands = table_column_bands(bands, len(df))
+    if 'commodity' in zones:
+        tariff_bands = tariff_bands[tariff_bands['min_x'] > zones['commodity']['max_x']]
+    if len(tariff_bands) > 0:
+        zones['tariff'] = band_zone(tariff_bands.iloc[-1], 50, 100)
         logging.info(f"Tariff zone: X={zones['tariff']['min_x']:.0f}-{zones['tariff']['max_x']:.0f}")
     
     # 3. Find UNITS by pattern
-    unit_candidates = df[df['Word'].str.match(r'^(No|Lb|each|ea|N0|1b|Ib)\.?$', na=False, case=False)]
+    unit_candidates = df[df['Word'].str.match(UNIT_WORD, na=False)]
     if 'commodity' in zones and 'tariff' in zones:
         # Filter units between commodity and tariff
         unit_candidates = unit_candidates[
@@ -131,78 +166,25 @@ def analyze_coordinate_zones(df):
         }
         logging.info(f"Description zone: X={zones['description']['min_x']:.0f}-{zones['description']['max_x']:.0f}")
     
-    # 5. Calculate RATE zones (between unit and tariff)
+    # 5. Calculate RATE zones (between unit and tariff) from the column bands in the rate area
     if 'unit' in zones and 'tariff' in zones:
         rate_start = zones['unit']['max_x'] + 20
         rate_end = zones['tariff']['min_x'] - 20
-        
-        # Find actual words in the rate area (after units, before tariff)
-        rate_area_words = df[
-            (df['TopLeft_X'] > rate_start) & 
-            (df['TopLeft_X'] < rate_end)
-        ]
-        
-        if len(rate_area_words) > 0:
-            rate_x_coords = rate_area_words['TopLeft_X'].values
-            logging.info(f"Found {len(rate_area_words)} words in rate area between X={rate_start:.0f} and X={rate_end:.0f}")
-            logging.info(f"Rate area coordinates: {sorted(set(rate_x_coords))}")
-            logging.info(f"Sample rate words: {rate_area_words['Word'].head(10).tolist()}")
-            
-            # If we have enough rate data, try to split into two zones
-            if len(rate_x_coords) > 3:
-                # Sort coordinates and look for natural clustering
-                sorted_coords = np.sort(rate_x_coords)
-                
-                # Try to find a gap to split into two rate columns
-                # Calculate gaps between consecutive coordinates
-                gaps = np.diff(sorted_coords)
-                if len(gaps) > 0 and np.max(gaps) > 100:  # If there's a significant gap
-                    # Find the largest gap
-                    max_gap_idx = np.argmax(gaps)
-                    split_point = (sorted_coords[max_gap_idx] + sorted_coords[max_gap_idx + 1]) / 2
-                    
-                    zones['rate_1930'] = {
-                        'min_x': rate_start,
-                        'max_x': split_point,
-                        'center': (rate_start + split_point) / 2
-                    }
-                    
-                    zones['rate_trade'] = {
-                        'min_x': split_point,
-                        'max_x': rate_end,
-                        'center': (split_point + rate_end) / 2
-                    }
-                    
-                    logging.info(f"Rate zones split at natural gap: 1930 at X={rate_start:.0f}-{split_point:.0f}, Trade at X={split_point:.0f}-{rate_end:.0f}")
-                else:
-                    # No clear gap, split evenly
-                    rate_mid = (rate_start + rate_end) / 2
-                    
-                    zones['rate_1930'] = {
-                        'min_x': rate_start,
-                        'max_x': rate_mid,
-                        'center': (rate_start + rate_mid) / 2
-                    }
-                    
-                    zones['rate_trade'] = {
-                        'min_x': rate_mid,
-                        'max_x': rate_end,
-                        'center': (rate_mid + rate_end) / 2
-                    }
-                    
-                    logging.info(f"Rate zones split evenly: 1930 at X={rate_start:.0f}-{rate_mid:.0f}, Trade at X={rate_mid:.0f}-{rate_end:.0f}")
-            else:
-                # Few rate words, create single zone for 1930
-                zones['rate_1930'] = {
-                    'min_x': rate_start,
-                    'max_x': rate_end,
-                    'center': (rate_start + rate_end) / 2
-                }
-                logging.info(f"Single rate zone (1930): X={rate_start:.0f}-{rate_end:.0f}")
-            
-            # Log the actual rate words found
-            rate_words = rate_area_words['Word'].tolist()
-            logging.info(f"Found {len(rate_words)} words in rate area: {rate_words[:10]}...")  # Show first 10
+        rate_bands = bands[(bands['center'] >= rate_start) & (bands['center'] <= rate_end)]
+
+        if len(rate_bands) > 1:
+            # The 1930 and trade agreement columns meet in the widest gap between the bands
+            gaps = rate_bands['min_x'].to_numpy()[1:] - rate_bands['max_x'].to_numpy()[:-1]
+            widest = np.argmax(gaps)
+            split_point = (rate_bands['max_x'].iloc[widest] + rate_bands['min_x'].iloc[widest + 1]) / 2
+            zones['rate_1930'] = Zone(min_x=rate_start, max_x=split_point, center=(rate_start + split_point) / 2)
+            zones['rate_trade'] = Zone(min_x=split_point, max_x=rate_end, center=(split_point + rate_end) / 2)
+            logging.info(f"Rate zones split between {len(rate_bands)} bands: 1930 at X={rate_start:.0f}-{split_point:.0f}, "
+                         f"Trade at X={split_point:.0f}-{rate_end:.0f}")
+        elif len(rate_bands) == 1:
+            # One rate column
+            zones['rate_1930'] = Zone(min_x=rate_start, max_x=rate_end, center=(rate_start + rate_end) / 2)
+            logging.info(f"Single rate zone (1930): X={rate_start:.0f}-{rate_end:.0f}")
         else:
             logging.info("No words found in calculated rate area")
     else:
@@ -210,6 +192,98 @@ def analyze_coordinate_zones(df):
     
     return zones
 
+def page_anchor_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The anchor columns of each page: the centers of its leftmost (commodity)
+    and rightmost (tariff) table column bands, whatever the words in them
+    (NaN when the page has no bands). One row per page, indexed by page.
+    """
+    anchors = {}
+    for page, x in df['TopLeft_X'].groupby(df['Page']):
+        bands = table_column_bands(column_bands(x, COLUMN_BIN_WIDTH, COLUMN_MIN_GAP), x.notna().sum())
+        anchors[page] = (bands['center'].iloc[0], bands['center'].iloc[-1]) if len(bands) else (np.nan, np.nan)
+    return pd.DataFrame.from_dict(anchors, orient='index', columns=['commodity', 'tariff'])
+
+def shift_zones(zones: ZoneMap, shift: float) -> ZoneMap:
+    """The zones moved right by shift."""
+    return {zone: {key: value + shift for key, value in bounds.items()} for zone, bounds in zones.items()}
+
+class ZoneTemplateCache:
+    """
+    Zone sets learned on calibrated pages (layout templates), keyed by the
+    pages' anchor columns.
+
+    A page whose anchor columns all lie within tolerance of a template's
+    reuses the closest template, moved by the mean anchor drift, instead of
+    being recalibrated with analyze_coordinate_zones(). The cache can be kept
+    and passed to later runs over pages of the same layouts.
+    """
+
+    def __init__(self, tolerance: float = ZONE_TEMPLATE_TOLERANCE):
+        self.tolerance = tolerance
+        self.templates = []  # (anchor X array, zones)
+        self.hits = 0
+        self.misses = 0
+
+    def match(self, anchors: np.ndarray):
+        """Zones of the closest template within tolerance, shifted onto the page; None if none matches."""
+        best, best_drift, best_distance = None, None, None
+        for template_anchors, zones in self.templates:
+            drift = anchors - template_anchors
+            distance = np.abs(drift).max()
+            if distance <= self.tolerance and (best is None or distance < best_distance):
+                best, best_drift, best_distance = zones, drift, distance
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return shift_zones(best, best_drift.mean())
+
+    def add(self, anchors: np.ndarray, zones: ZoneMap):
+        self.templates.append((np.asarray(anchors, dtype=float), zones))
+
+def analyze_page_zones(df: pd.DataFrame, cache: ZoneTemplateCache = None) -> Dict[Any, ZoneMap]:
+    """
+    Column zones per page ({page: zones}), for inputs whose pages are scanned
+    with different horizontal offsets. Only pages whose anchor columns match
+    no cached template are calibrated with analyze_coordinate_zones(); pages
+    without column bands (no word positions) get the zones of the whole input.
+    """
+    cache = cache if cache is not None else ZoneTemplateCache()
+    anchors = page_anchor_columns(df)
+    page_positions = df.groupby('Page').indices
+    input_zones = None
+    page_zones = {}
+    for page, page_anchors in zip(anchors.index, anchors.to_numpy(dtype=float)):
+        if np.isnan(page_anchors).any():
+            if input_zones is None:
+                input_zones = analyze_coordinate_zones(df)
+            page_zones[page] = input_zones
+            continue
+        zones = cache.match(page_anchors)
+        if zones is None:
+            logging.info(f"Calibrating column zones on page {page}")
+            zones = analyze_coordinate_zones(df.iloc[page_positions[page]])
+            cache.add(page_anchors, zones)
+        page_zones[page] = zones
+    logging.info(f"Column zones for {len(page_zones)} pages: {len(cache.templates)} templates, "
+                 f"{cache.hits} pages reused a template")
+    return page_zones
+
+def page_zone_bounds(pages: pd.Series, page_zones: Dict[Any, ZoneMap]) -> dict:
+    """
+    Per-word zone bounds for classify_words_by_coordinates(), from the zones of
+    each word's page: {zone: {'min_x': array, 'max_x': array}}, NaN where the
+    page has no such zone.
+    """
+    bounds = {}
+    for zone, _ in ZONE_COLUMNS:
+        bounds[zone] = {}
+        for edge in ('min_x', 'max_x'):
+            per_page = {page: zones[zone][edge] for page, zones in page_zones.items() if zone in zones}
+            bounds[zone][edge] = pages.map(per_page).to_numpy(dtype=float)
+    return bounds
+
 def clean_commodity_number(raw_number):
     """
     Clean and standardize a single commodity number.
@@ -226,7 +300,7 @@ def clean_commodity_number(raw_number):
     clean_num = clean_num.replace(' ', '')
     
     # Remove any non-digit characters except leading zeros
-    clean_num = re.sub(r'[^0-9]', '', clean_num)
+    clean_num = NON_ASCII_DIGITS.sub('', clean_num)
     
     # Filter out OCR artifacts (too short numbers that are likely fragments)
     if len(clean_num) <= 3:
@@ -269,9 +343,9 @@ def classify_word_by_coordinates(word: str, x_coord: float, zones: dict):
     tariff_para = None
     
     # 1. Check pattern-based classification first
-    if re.match(r'^00\d{2}\s?\d{3}$', word):
+    if SCHEDULE_A_NUMBER.match(word):
         commodity_num = word
-    elif re.match(r'^(70[0-9]|71[0-9]|1558)$', word):
+    elif SCHEDULE_A_TARIFF.match(word):
         tariff_para = word
     else:
         # 2. Use coordinate-based classification
@@ -295,20 +369,46 @@ def classify_word_by_coordinates(word: str, x_coord: float, zones: dict):
     
     return commodity_num, description, unit, rate_1930, rate_trade, tariff_para
 
-def main():
-    """Main processing function."""
-    # Load and preprocess
-    df = load_and_preprocess(INPUT_CSV)
-    
+def classify_words_by_coordinates(words: pd.Series, x_coords: pd.Series, zones: dict) -> pd.DataFrame:
+    """
+    classify_word_by_coordinates() for whole columns at once. The zone bounds
+    may be numbers or per-word arrays (see page_zone_bounds()); a word is
+    never in a zone whose bound is NaN for it.
+    Returns a DataFrame with the CLASSIFIED_COLUMNS, aligned with words.index:
+    each row holds the stripped word in the column it was classified into and
+    None in the other five.
+    """
+    text = words.astype(str).str.strip()
+    x = pd.to_numeric(x_coords, errors='coerce').to_numpy(dtype=float)
+
+    # Pattern matches win over the zones; a missing X falls through to description
+    conditions = [text.str.fullmatch(SCHEDULE_A_NUMBER).to_numpy(dtype=bool),
+                  text.str.fullmatch(SCHEDULE_A_TARIFF).to_numpy(dtype=bool)]
+    choices = [0, 5]
+    for zone, column in ZONE_COLUMNS:
+        if zone in zones:
+            conditions.append((zones[zone]['min_x'] <= x) & (x <= zones[zone]['max_x']))
+            choices.append(column)
+    column_index = np.select(conditions, choices, default=1)
+
+    classified = np.full((len(text), len(CLASSIFIED_COLUMNS)), None, dtype=object)
+    classified[np.arange(len(text)), column_index] = text.to_numpy(dtype=object)
+    return pd.DataFrame(classified, index=words.index, columns=CLASSIFIED_COLUMNS)
+
+def classify_words(df: pd.DataFrame, cache: ZoneTemplateCache = None) -> pd.DataFrame:
+    """
+    Split preprocessed OCR words into the table columns by their coordinates.
+    Multi-page inputs get column zones per page (see analyze_page_zones()).
+    Returns the cleaned, classified words table with coordinates.
+    """
     # Analyze coordinate zones dynamically
-    zones = analyze_coordinate_zones(df)
+    if 'Page' in df.columns and df['Page'].notna().all() and df['Page'].nunique() > 1:
+        zones = page_zone_bounds(df['Page'], analyze_page_zones(df, cache))
+    else:
+        zones = analyze_coordinate_zones(df)
     
     # Classify each word based on coordinates
-    df[['Commodity Number', 'Commodity Description', 'Unit of Quantity', 
-        'Rate of Duty 1930', 'Rate of Duty Trade Agreement', 'Tariff Paragraph']] = df.apply(
-        lambda row: pd.Series(classify_word_by_coordinates(row['Word'], row['TopLeft_X'], zones)), 
-        axis=1
-    )
+    df[CLASSIFIED_COLUMNS] = classify_words_by_coordinates(df['Word'], df['TopLeft_X'], zones)
     
     # Clean commodity numbers
     logging.info("=== CLEANING COMMODITY NUMBERS ===")
@@ -332,13 +432,10 @@ def main():
                    'TopLeft_X', 'TopLeft_Y', 'TopRight_X', 'TopRight_Y', 
                    'BottomRight_X', 'BottomRight_Y', 'BottomLeft_X', 'BottomLeft_Y',
                    'Confidence', 'Page']]
-    
-    # Save cleaned output
-    os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
-    output_df.to_csv(OUTPUT_CSV, index=False)
-    logging.info(f"Saved classified data with coordinates to {OUTPUT_CSV}")
-    
-    # Show summary
+    return output_df
+
+def log_summary(output_df: pd.DataFrame):
+    """Log how many words landed in each column."""
     logging.info(f"Total rows: {len(output_df)}")
     logging.info(f"Rows with Commodity Number: {output_df['Commodity Number'].notna().sum()}")
     logging.info(f"Rows with Description: {output_df['Commodity Description'].notna().sum()}")
@@ -346,6 +443,19 @@ def main():
     logging.info(f"Rows with Rate 1930: {output_df['Rate of Duty 1930'].notna().sum()}")
     logging.info(f"Rows with Rate Trade: {output_df['Rate of Duty Trade Agreement'].notna().sum()}")
     logging.info(f"Rows with Tariff Paragraph: {output_df['Tariff Paragraph'].notna().sum()}")
+
+def main():
+    """Main processing function."""
+    # Load and preprocess
+    df = load_and_preprocess(INPUT_CSV)
+    output_df = classify_words(df)
+    
+    # Save cleaned output
+    write_table(output_df, OUTPUT_CSV, CLEANED_WORDS_DTYPES)
+    logging.info(f"Saved classified data with coordinates to {OUTPUT_CSV}")
+    
+    # Show summary
+    log_summary(output_df)
     
     return output_df
 
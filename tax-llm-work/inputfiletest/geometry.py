@@ -0,0 +1,224 @@
+"""
+Vectorized layout helpers shared by the pipeline stages.
+
+Several stages group OCR words into text rows by their Y coordinate. Instead of
+walking a sorted DataFrame word by word, assign_row_ids() sorts the Y values
+once with NumPy and derives an integer row id for every word, which callers
+can use with groupby or as a plain column.
+
+Stages also attach words to the commodity number printed on the same line.
+nearest_anchor() sorts the commodity rows once per page and finds the nearest
+one for every word with a binary search; word_index.WordIndex builds on it.
+
+column_bands() finds the text columns of a page from a histogram of the words'
+left edges, in one pass over the words and one over the histogram bins, and
+indent_levels() clusters the left edges of description lines into a few
+indentation levels.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _row_starts_by_anchor(sorted_y: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Boolean mask of row starts where each row holds the words within threshold
+    of the row's first word. Jumps from row to row with a binary search, so the
+    Python loop runs once per row rather than once per word.
+    """
+    starts = np.zeros(len(sorted_y), dtype=bool)
+    i = 0
+    while i < len(sorted_y):
+        starts[i] = True
+        if np.isnan(sorted_y[i]):
+            i += 1
+        else:
+            i = max(i + 1, int(np.searchsorted(sorted_y, sorted_y[i] + threshold, side='right')))
+    return starts
+
+
+def assign_row_ids(y, threshold: float, groups=None, mode: str = "gap") -> np.ndarray:
+    """
+    Return an integer row id per element of y, numbered top to bottom from 0.
+
+    mode="gap" starts a new row wherever the distance to the previous word
+    (in Y order) exceeds threshold: np.diff on the sorted values, then a
+    cumulative sum over the breaks. mode="anchor" starts a new row once a word
+    is more than threshold below the first word of the current row, the rule
+    used by the original row-grouping loops.
+
+    groups (e.g. page numbers) keeps rows from spanning groups; rows are then
+    numbered group by group. Missing Y values each get a row of their own.
+    """
+    if mode not in ("gap", "anchor"):
+        raise ValueError(f"Unknown row banding mode: {mode}")
+    y = np.asarray(y, dtype=float)
+    row_ids = np.empty(len(y), dtype=np.int64)
+    if len(y) == 0:
+        return row_ids
+
+    if groups is None:
+        order = np.argsort(y, kind='stable')
+        group_breaks = np.zeros(len(y), dtype=bool)
+    else:
+        groups = np.asarray(groups)
+        order = np.lexsort((y, groups))
+        sorted_groups = groups[order]
+        group_breaks = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+    sorted_y = y[order]
+
+    if mode == "gap":
+        gaps = np.diff(sorted_y)
+        starts = np.r_[True, (gaps > threshold) | np.isnan(gaps)]
+        starts |= group_breaks
+    else:
+        starts = np.zeros(len(y), dtype=bool)
+        bounds = np.r_[np.flatnonzero(group_breaks), len(y)] if groups is not None else np.array([0, len(y)])
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            starts[begin:end] = _row_starts_by_anchor(sorted_y[begin:end], threshold)
+
+    row_ids[order] = np.cumsum(starts) - 1
+    return row_ids
+
+
+def row_id_series(df: pd.DataFrame, threshold: float, y_column: str = 'TopLeft_Y',
+                  group_column: Optional[str] = None, mode: str = "gap") -> pd.Series:
+    """assign_row_ids() for a DataFrame, returned as a Series aligned with df.index."""
+    groups = df[group_column].to_numpy() if group_column is not None else None
+    return pd.Series(assign_row_ids(df[y_column].to_numpy(dtype=float), threshold, groups, mode),
+                     index=df.index, name='Row_Id')
+
+
+def group_bounds(sorted_codes: np.ndarray):
+    """(codes, starts, ends) of the runs of equal values in an already sorted array."""
+    if len(sorted_codes) == 0:
+        empty = np.array([], dtype=np.int64)
+        return sorted_codes[:0], empty, empty
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ends = np.r_[starts[1:], len(sorted_codes)]
+    return sorted_codes[starts], starts, ends
+
+
+def nearest_in_sorted(sorted_y: np.ndarray, sorted_positions: np.ndarray, query_y: np.ndarray,
+                      tolerance: float) -> np.ndarray:
+    """
+    For each query_y, the entry of sorted_positions whose Y is nearest and at
+    most tolerance away, or -1. sorted_y must be ascending without NaN, and
+    sorted_positions ascending among equal Y values; ties go to the smaller
+    position.
+    """
+    result = np.full(len(query_y), -1, dtype=np.int64)
+    if len(sorted_y) == 0 or len(query_y) == 0:
+        return result
+    # Index of the first anchor in each run of equal Y values (the one listed first)
+    run_starts = np.r_[True, sorted_y[1:] != sorted_y[:-1]]
+    first_of_run = np.maximum.accumulate(np.where(run_starts, np.arange(len(sorted_y)), 0))
+
+    after = np.searchsorted(sorted_y, query_y, side='left')  # first anchor at or after y
+    before = after - 1
+    after_distance = np.full(len(query_y), np.inf)
+    before_distance = np.full(len(query_y), np.inf)
+    has_after = after < len(sorted_y)
+    has_before = before >= 0
+    after = np.minimum(after, len(sorted_y) - 1)
+    before = first_of_run[np.maximum(before, 0)]
+    after_distance[has_after] = sorted_y[after[has_after]] - query_y[has_after]
+    before_distance[has_before] = query_y[has_before] - sorted_y[before[has_before]]
+
+    take_before = (before_distance < after_distance) | (
+        (before_distance == after_distance) & (sorted_positions[before] < sorted_positions[after]))
+    best = np.where(take_before, before, after)
+    best_distance = np.where(take_before, before_distance, after_distance)
+    return np.where(best_distance <= tolerance, sorted_positions[best], -1)
+
+
+def nearest_anchor(y, anchor_y, tolerance: float, groups=None, anchor_groups=None) -> np.ndarray:
+    """
+    For each y, the position (0-based, into anchor_y) of the nearest anchor at
+    most tolerance away, or -1 when there is none. With groups/anchor_groups
+    (e.g. page numbers), only anchors in the same group are considered.
+
+    Anchors are sorted once by group and Y, and every y is placed with a binary
+    search in its group's slice, so the cost is O((N + M) log M) rather than a
+    scan of all M anchors per word. Ties (same distance) go to the anchor
+    listed first, as with a loop keeping the first strictly closer anchor.
+    Missing values never match.
+    """
+    y = np.asarray(y, dtype=float)
+    anchor_y = np.asarray(anchor_y, dtype=float)
+    result = np.full(len(y), -1, dtype=np.int64)
+    if len(y) == 0 or len(anchor_y) == 0:
+        return result
+
+    if groups is None:
+        query_codes = np.zeros(len(y), dtype=np.int64)
+        anchor_codes = np.zeros(len(anchor_y), dtype=np.int64)
+    else:
+        codes, _ = pd.factorize(pd.Series(np.concatenate([np.asarray(anchor_groups, dtype=object),
+                                                          np.asarray(groups, dtype=object)])))
+        anchor_codes, query_codes = codes[:len(anchor_y)], codes[len(anchor_y):]
+
+    anchors = np.flatnonzero(~np.isnan(anchor_y) & (anchor_codes >= 0))
+    anchors = anchors[np.lexsort((anchor_y[anchors], anchor_codes[anchors]))]
+    queries = np.flatnonzero(~np.isnan(y) & (query_codes >= 0))
+    queries = queries[np.argsort(query_codes[queries], kind='stable')]
+
+    anchor_groups_found, anchor_starts, anchor_ends = group_bounds(anchor_codes[anchors])
+    anchor_slices = dict(zip(anchor_groups_found.tolist(), zip(anchor_starts, anchor_ends)))
+    for code, start, end in zip(*group_bounds(query_codes[queries])):
+        if code not in anchor_slices:
+            continue
+        anchor_start, anchor_end = anchor_slices[code]
+        group_anchors = anchors[anchor_start:anchor_end]
+        group_queries = queries[start:end]
+        result[group_queries] = nearest_in_sorted(anchor_y[group_anchors], group_anchors, y[group_queries], tolerance)
+    return result
+
+
+def column_bands(x, bin_width: float = 10, min_gap: float = 40, min_count: int = 1) -> pd.DataFrame:
+    """
+    Column bands of a set of word left edges (X), left to right.
+
+    X is binned into a histogram of bin_width; occupied bins separated by an
+    empty stretch narrower than min_gap belong to the same band. Returns one
+    row per band with the min_x, max_x and median (center) X of its words and
+    their count; bands with fewer than min_count words are dropped. Missing
+    X values are ignored.
+    """
+    x = np.asarray(x, dtype=float)
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return pd.DataFrame({'min_x': [], 'max_x': [], 'center': [], 'count': []})
+
+    bins = ((x - x.min()) // bin_width).astype(np.int64)
+    occupied = np.flatnonzero(np.bincount(bins))
+    empty_run = (np.diff(occupied) - 1) * bin_width
+    band_of_bin = np.zeros(occupied[-1] + 1, dtype=np.int64)
+    band_of_bin[occupied] = np.cumsum(np.r_[False, empty_run >= min_gap])
+
+    grouped = pd.Series(x).groupby(band_of_bin[bins])
+    bands = pd.DataFrame({'min_x': grouped.min(), 'max_x': grouped.max(), 'center': grouped.median(),
+                          'count': grouped.size()})
+    return bands[bands['count'] >= min_count].reset_index(drop=True)
+
+
+def indent_levels(x, tolerance: float) -> np.ndarray:
+    """
+    Indentation level of each X value, 0 for the leftmost. The distinct X
+    values are clustered left to right and a new level starts at the first value
+    more than tolerance right of the level's first value, so OCR jitter stays
+    within a level while indents drifting in small steps can't chain into one.
+    Missing X values get -1.
+    """
+    x = np.asarray(x, dtype=float)
+    levels = np.full(len(x), -1, dtype=np.int64)
+    found = ~np.isnan(x)
+    values, inverse = np.unique(x[found], return_inverse=True)
+    # Index of the first value of each level, one search per level
+    starts = [0]
+    while starts[-1] < len(values):
+        starts.append(int(np.searchsorted(values, values[starts[-1]] + tolerance, side='right')))
+    value_levels = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+    levels[found] = value_levels[inverse]
+    return levels
@@ -4,22 +4,60 @@
 
 import os
 import pandas as pd
-from PIL import Image
 import fitz  # PyMuPDF for PDF processing
 from paddleocr import PaddleOCR
 import numpy as np
-import re
 import logging
-from typing import List
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import List, Optional, Tuple
+from ocr_cache import OcrPageCache, normalize_ocr_result, pdf_content_hash
+from ocr_shards import ShardManifest, count_csv_rows, merge_shards, plan_shards
+from ocr_stream import run_page_pipeline
+from ocr_writer import OcrRowWriter
+from patterns import COMMODITY_NUMBER, TARIFF_PARAGRAPH
+from page_render import PageBufferPool, pixmap_to_ndarray, render_page_image, render_page_pixmap
+from table_schema import read_table, write_table
+from text_layer import has_usable_text_layer, text_layer_result
 
 ###############################################
 # Configuration
 ###############################################
 pdf_path = r'1950 Schedule A (scanned by ILL, Reed College).pdf'
-output_word_coords = r'new-work/output/ocr_word_coords.csv'
-output_cleaned_csv = r'new-work/output/cleaned_classified_words.csv'
+output_word_coords = r'new-work/output/ocr_word_coords.parquet'  # a .csv path writes CSV instead
+output_cleaned_csv = r'new-work/output/cleaned_classified_words.parquet'
 start_page = 28
 end_page = 28  # Pages with the table
+ocr_dpi = 300
+ocr_cache_dir = r'new-work/cache/ocr'  # Per-page OCR results reused across runs
+ocr_cache_max_mb = 512
+render_queue_depth = 2  # Rendered pages waiting for OCR (0 = no render/OCR overlap)
+write_queue_depth = 4  # OCR results waiting to be written
+ocr_batch_size = 1  # Rendered pages per ocr.predict call
+ocr_max_batch_mb = 256  # Upper bound on rendered pixels held by one batch
+adaptive_dpi = False  # Probe pages at low DPI; skip blank pages and render only the content region
+use_text_layer = True  # Read pages that already carry a text layer instead of OCR'ing them
+shard_size = 0  # Pages per checkpointed shard (0 = one pass, no checkpoints)
+shard_dir = r'new-work/output/ocr_shards'  # Per-shard CSVs and the resume manifest
+
+# PaddleOCR settings, shared by the main process and the OCR worker processes
+ocr_model_config = {
+    "text_detection_model_name": "PP-OCRv5_mobile_det",
+    "text_recognition_model_name": "PP-OCRv5_mobile_rec",
+    "use_doc_orientation_classify": False,
+    "use_doc_unwarping": False,
+    "use_textline_orientation": False,
+}
+
+word_coord_headers = [
+    "Word", "Confidence",
+    "TopLeft_X", "TopLeft_Y",
+    "TopRight_X", "TopRight_Y",
+    "BottomRight_X", "BottomRight_Y",
+    "BottomLeft_X", "BottomLeft_Y",
+    "Page"
+]
 
 ###############################################
 # Logging Setup
@@ -29,9 +67,138 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 ###############################################
 # OCR Extraction: Extract Words with Coordinates (Original Style)
 ###############################################
-def extract_ocr_words_with_coords(pdf_path: str, start_page: int, end_page: int, ocr: PaddleOCR, output_csv: str = output_word_coords) -> None:
+def ocr_result_to_frame(results, page_number: int) -> pd.DataFrame:
+    """
+    Convert one PaddleOCR page result (rec_texts, rec_polys, rec_scores)
+    into a DataFrame of word-coordinate rows, built column by column.
+    page_number is 1-based.
+    """
+    rec_texts = list(results.get("rec_texts", []))
+    count = len(rec_texts)
+    rec_polys = list(results.get("rec_polys", []))[:count]
+    rec_scores = list(results.get("rec_scores", []))[:count]
+    rec_polys += [[[None, None]] * 4] * (count - len(rec_polys))
+    rec_scores += [None] * (count - len(rec_scores))
+
+    columns = {"Word": rec_texts, "Confidence": rec_scores}
+    for corner, name in enumerate(("TopLeft", "TopRight", "BottomRight", "BottomLeft")):
+        columns[f"{name}_X"] = [poly[corner][0] for poly in rec_polys]
+        columns[f"{name}_Y"] = [poly[corner][1] for poly in rec_polys]
+    columns["Page"] = [page_number] * count
+    return pd.DataFrame(columns, columns=word_coord_headers)
+
+# Per-process state for the OCR worker pool. Each worker loads its own
+# PaddleOCR model and opens the PDF once, then serves many pages.
+_worker_ocr = None
+_worker_doc = None
+
+_worker_adaptive = False
+
+def _init_ocr_worker(pdf_path: str, model_config: dict, adaptive: bool = False) -> None:
+    """Load PaddleOCR and open the PDF once per worker process."""
+    global _worker_ocr, _worker_doc, _worker_adaptive
+    _worker_ocr = PaddleOCR(**model_config)
+    _worker_doc = fitz.open(pdf_path)
+    _worker_adaptive = adaptive
+
+def render_for_ocr(page, adaptive: bool = False,
+                   buffers: Optional[PageBufferPool] = None) -> Tuple[Optional[np.ndarray], Tuple[int, int]]:
+    """page_render.render_page_image() at ocr_dpi: (image copied out of the pixmap, origin)."""
+    return render_page_image(page, ocr_dpi, buffers, adaptive)
+
+def offset_ocr_result(results: dict, origin: Tuple[int, int]) -> dict:
+    """Shift the polygons of a normalized OCR result from region to full-page coordinates."""
+    dx, dy = origin
+    if not dx and not dy:
+        return results
+    shifted = dict(results)
+    shifted["rec_polys"] = [[[x + dx, y + dy] for x, y in poly] for poly in results["rec_polys"]]
+    return shifted
+
+def predict_pages(ocr: PaddleOCR, images: List[Optional[np.ndarray]],
+                  origins: Optional[List[Tuple[int, int]]] = None) -> List[dict]:
+    """
+    Run OCR on one or more rendered pages, returning one normalized result per image.
+    Several images go to PaddleOCR in a single predict call. Blank pages (None)
+    get an empty result, and results are shifted by each image's origin.
+    """
+    page_results = [normalize_ocr_result({}) for _ in images]
+    todo = [i for i, image in enumerate(images) if image is not None]
+    if len(todo) == 1:
+        raw_results = [ocr.predict(images[todo[0]])[0]]  # Assuming single image result
+    elif todo:
+        raw_results = ocr.predict([images[i] for i in todo])
+    else:
+        raw_results = []
+    for i, results in zip(todo, raw_results):
+        page_results[i] = normalize_ocr_result(results)
+    if origins is not None:
+        page_results = [offset_ocr_result(results, origin) for results, origin in zip(page_results, origins)]
+    return page_results
+
+def batch_pages(doc, page_numbers: List[int], batch_size: int, max_batch_bytes: int,
+                dpi: int = ocr_dpi) -> List[List[int]]:
+    """
+    Group pages into predict batches of at most batch_size pages whose rendered
+    RGB buffers (estimated from the page size at dpi) stay under max_batch_bytes.
+    A page larger than the byte budget still gets a batch of its own.
+    """
+    batches, current, current_bytes = [], [], 0
+    for page_number in page_numbers:
+        rect = doc[page_number].rect
+        page_bytes = int(round(rect.width * dpi / 72)) * int(round(rect.height * dpi / 72)) * 3
+        if current and (len(current) >= batch_size or current_bytes + page_bytes > max_batch_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(page_number)
+        current_bytes += page_bytes
+    if current:
+        batches.append(current)
+    return batches
+
+def _ocr_page_in_worker(page_number: int) -> dict:
+    """Render and OCR a single page (0-based) inside a worker process."""
+    pix = render_page_pixmap(_worker_doc[page_number], ocr_dpi, _worker_adaptive)
+    if pix is None:
+        return normalize_ocr_result({})
+    # Zero-copy view; pix stays alive until predict returns
+    return predict_pages(_worker_ocr, [pixmap_to_ndarray(pix)], [(pix.x, pix.y)])[0]
+
+def extract_ocr_words_with_coords(pdf_path: str, start_page: int, end_page: int, ocr: PaddleOCR, output_csv: str = output_word_coords,
+                                  workers: int = 1, cache: Optional[OcrPageCache] = None,
+                                  render_queue_depth: int = 0, write_queue_depth: int = write_queue_depth,
+                                  batch_size: int = 1, max_batch_mb: int = ocr_max_batch_mb,
+                                  adaptive: bool = False, text_layer: bool = False) -> None:
     """
     Extract words and their coordinates from PDF using OCR and save to CSV.
+
+    With workers > 1 the pages are spread over a pool of worker processes,
+    each holding its own PaddleOCR instance built from ocr_model_config;
+    `ocr` is then unused and may be None. Rows are always written in page order.
+
+    With a cache, pages already OCR'd for the same PDF bytes, DPI and models
+    are read back from disk instead of calling ocr.predict.
+
+    With render_queue_depth > 0 (in-process runs), rendering, OCR and result
+    writing run as a streaming pipeline with bounded queues between them, so
+    PDF decoding overlaps with inference (see ocr_stream.run_page_pipeline).
+
+    With batch_size > 1 (in-process runs), up to batch_size rendered pages are
+    sent to each ocr.predict call, capped by max_batch_mb of page buffers, and
+    the results are split back per page.
+
+    With adaptive=True every page is first probed at low DPI: blank pages are
+    skipped and only the inked region is rendered at ocr_dpi. Word coordinates
+    are shifted back into the full-page ocr_dpi frame, so downstream zone logic
+    sees the same coordinate system either way.
+
+    With text_layer=True, pages that already carry a usable embedded text layer
+    are read with PyMuPDF's word extraction (scaled to ocr_dpi coordinates, with
+    Confidence 1.0) and only image-only pages go through OCR.
+
+    Rows are appended to output_csv page by page, in page order, as soon as a
+    page and all pages before it are done (see ocr_writer.OcrRowWriter); a
+    .parquet output path writes one Parquet row group per page instead of CSV.
     """
     logging.info(f"Extracting words with coordinates from PDF pages {start_page}-{end_page}...")
     try:
@@ -40,58 +207,160 @@ def extract_ocr_words_with_coords(pdf_path: str, start_page: int, end_page: int,
         logging.error(f"Failed to open PDF: {e}")
         return
 
-    extracted_data = []
-
+    page_numbers = []
     for page_number in range(start_page - 1, end_page):
         if page_number >= len(doc):
             logging.warning(f"Page {page_number + 1} does not exist. Skipping.")
             continue
+        page_numbers.append(page_number)
 
-        logging.info(f"Processing Page {page_number + 1}...")
-        page = doc[page_number]
-        pix = page.get_pixmap(dpi=300)
-        image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        image_np = np.array(image)
-
-        # Updated: Use structure like rec_texts, rec_polys, rec_scores
-        results = ocr.predict(image_np)[0]  # Assuming single image result
-
-        rec_texts = results.get("rec_texts", [])
-        rec_polys = results.get("rec_polys", [])
-        rec_scores = results.get("rec_scores", [])
-
-        for i, word in enumerate(rec_texts):
-            poly = rec_polys[i] if i < len(rec_polys) else [[None, None]] * 4
-            score = rec_scores[i] if i < len(rec_scores) else None
-
-            row = {
-                "Word": word,
-                "Confidence": score,
-                "TopLeft_X": poly[0][0],
-                "TopLeft_Y": poly[0][1],
-                "TopRight_X": poly[1][0],
-                "TopRight_Y": poly[1][1],
-                "BottomRight_X": poly[2][0],
-                "BottomRight_Y": poly[2][1],
-                "BottomLeft_X": poly[3][0],
-                "BottomLeft_Y": poly[3][1],
-                "Page": page_number + 1
-            }
-            extracted_data.append(row)
-
-    headers = [
-        "Word", "Confidence",
-        "TopLeft_X", "TopLeft_Y",
-        "TopRight_X", "TopRight_Y",
-        "BottomRight_X", "BottomRight_Y",
-        "BottomLeft_X", "BottomLeft_Y",
-        "Page"
-    ]
+    page_results = {}
+    if text_layer:
+        for page_number in page_numbers:
+            if has_usable_text_layer(doc[page_number]):
+                page_results[page_number] = text_layer_result(doc[page_number], ocr_dpi)
+        logging.info(f"{len(page_results)} pages read from the embedded text layer, "
+                     f"{len(page_numbers) - len(page_results)} image-only pages need OCR")
+    ocr_pages = [page_number for page_number in page_numbers if page_number not in page_results]
+
+    cache_keys = {}
+    if cache is not None:
+        pdf_hash = pdf_content_hash(pdf_path)
+        for page_number in ocr_pages:
+            cache_keys[page_number] = OcrPageCache.make_key(
+                pdf_hash, page_number + 1, ocr_dpi,
+                ocr_model_config["text_detection_model_name"],
+                ocr_model_config["text_recognition_model_name"],
+                render_mode="adaptive" if adaptive else "full")
+            cached = cache.get(cache_keys[page_number])
+            if cached is not None:
+                page_results[page_number] = cached
+    pending_pages = [page_number for page_number in page_numbers if page_number not in page_results]
+    if cache is not None:
+        logging.info(f"{len(ocr_pages) - len(pending_pages)} pages served from OCR cache, {len(pending_pages)} pages to OCR")
+
+    writer = OcrRowWriter(output_csv, word_coord_headers)
+    next_index = 0
+
+    def flush_ready_pages() -> None:
+        # Write every finished page that has no unfinished page before it
+        nonlocal next_index
+        while next_index < len(page_numbers) and page_numbers[next_index] in page_results:
+            page_number = page_numbers[next_index]
+            writer.write_batch(ocr_result_to_frame(page_results.pop(page_number), page_number + 1))
+            next_index += 1
+
+    def store(page_number: int, results: dict) -> None:
+        page_results[page_number] = results
+        if cache is not None:
+            cache.put(cache_keys[page_number], results)
+        flush_ready_pages()
+
+    with writer:
+        flush_ready_pages()  # pages served from the text layer or cache ahead of the first OCR page
+        if workers > 1 and len(pending_pages) > 1:
+            doc.close()
+            pool_size = min(workers, len(pending_pages))
+            logging.info(f"Running OCR on {len(pending_pages)} pages with {pool_size} worker processes...")
+            # spawn keeps Paddle's native thread pools out of forked children
+            with ProcessPoolExecutor(max_workers=pool_size,
+                                     mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_ocr_worker,
+                                     initargs=(str(pdf_path), ocr_model_config, adaptive)) as executor:
+                # map() yields results in submission order, i.e. page order
+                for page_number, results in zip(pending_pages, executor.map(_ocr_page_in_worker, pending_pages)):
+                    logging.info(f"Processed Page {page_number + 1} ({len(results['rec_texts'])} words)")
+                    store(page_number, results)
+        elif pending_pages:
+            if ocr is None:
+                ocr = PaddleOCR(**ocr_model_config)
+            batches = batch_pages(doc, pending_pages, max(1, batch_size), max_batch_mb * 1024 * 1024)
+            if batch_size > 1:
+                logging.info(f"Running OCR on {len(pending_pages)} pages in {len(batches)} batches of up to {batch_size} pages")
+
+            def store_batch(batch: List[int], batch_results: List[dict]) -> None:
+                for page_number, results in zip(batch, batch_results):
+                    store(page_number, results)
+
+            def recognize_batch(rendered: List[tuple]) -> List[dict]:
+                images = [image for image, _ in rendered]
+                origins = [origin for _, origin in rendered]
+                return predict_pages(ocr, images, origins)
 
-    df = pd.DataFrame(extracted_data, columns=headers)
-    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
-    df.to_csv(output_csv, index=False)
-    logging.info(f"Word-coordinate CSV saved to: {output_csv}")
+            if render_queue_depth > 0:
+                # Rendered pages cross threads, so each is copied once into a recycled buffer:
+                # up to render_queue_depth queued batches + one in OCR + one being rendered
+                buffers = PageBufferPool((render_queue_depth + 2) * max(len(batch) for batch in batches))
+                run_page_pipeline(
+                    batches,
+                    render=lambda batch: [render_for_ocr(doc[page_number], adaptive, buffers) for page_number in batch],
+                    recognize=recognize_batch,
+                    write=store_batch,
+                    render_queue_depth=render_queue_depth,
+                    write_queue_depth=write_queue_depth)
+            else:
+                for batch in batches:
+                    logging.info(f"Processing Page{'s' if len(batch) > 1 else ''} {', '.join(str(p + 1) for p in batch)}...")
+                    pixmaps = [render_page_pixmap(doc[page_number], ocr_dpi, adaptive) for page_number in batch]
+                    # zero-copy views, valid while pixmaps are alive
+                    images = [pixmap_to_ndarray(pix) if pix is not None else None for pix in pixmaps]
+                    origins = [(pix.x, pix.y) if pix is not None else (0, 0) for pix in pixmaps]
+
+                    # Updated: Use structure like rec_texts, rec_polys, rec_scores
+                    store_batch(batch, predict_pages(ocr, images, origins))
+                    del images, pixmaps
+        if next_index != len(page_numbers):
+            raise RuntimeError(f"OCR finished without results for {len(page_numbers) - next_index} pages")
+
+    if cache is not None:
+        cache.log_stats()
+    logging.info(f"Word-coordinate {writer.file_format.upper()} saved to: {output_csv}")
+
+def extract_ocr_words_sharded(pdf_path: str, start_page: int, end_page: int, ocr: Optional[PaddleOCR],
+                              output_csv: str = output_word_coords, shard_size: int = 50,
+                              shard_dir: str = shard_dir, restart: bool = False, **extract_kwargs) -> None:
+    """
+    Run extract_ocr_words_with_coords shard by shard and merge the shards into output_csv.
+
+    Each shard of shard_size pages is written to its own CSV in shard_dir and
+    recorded in a manifest as soon as it finishes, so a crash only loses the
+    shard in progress. Re-running with the same PDF, page range and settings
+    resumes at the first incomplete page; restart=True discards earlier shards.
+    Remaining keyword arguments are passed through to extract_ocr_words_with_coords.
+    """
+    shards = plan_shards(start_page, end_page, shard_size)
+    run_config = {
+        "pdf_hash": pdf_content_hash(pdf_path),
+        "start_page": start_page, "end_page": end_page, "shard_size": shard_size,
+        "dpi": ocr_dpi,
+        "det_model": ocr_model_config["text_detection_model_name"],
+        "rec_model": ocr_model_config["text_recognition_model_name"],
+        "adaptive": bool(extract_kwargs.get("adaptive", False)),
+        "text_layer": bool(extract_kwargs.get("text_layer", False)),
+    }
+    manifest = ShardManifest(shard_dir, run_config) if restart else ShardManifest.load(shard_dir, run_config)
+
+    resume_page = manifest.first_incomplete_page(shards)
+    if resume_page is None:
+        logging.info(f"All {len(shards)} shards already complete in {shard_dir}")
+    else:
+        logging.info(f"{len(manifest.completed)} of {len(shards)} shards already complete; resuming at page {resume_page}")
+        if ocr is None and extract_kwargs.get("workers", 1) <= 1:
+            ocr = PaddleOCR(**ocr_model_config)  # one model for all shards
+
+    for first_page, last_page in shards:
+        if manifest.is_complete(first_page, last_page):
+            continue
+        shard_csv = manifest.shard_path(first_page, last_page)
+        extract_ocr_words_with_coords(pdf_path, first_page, last_page, ocr, output_csv=shard_csv, **extract_kwargs)
+        if not os.path.exists(shard_csv):
+            raise RuntimeError(f"OCR of pages {first_page}-{last_page} did not produce {shard_csv}")
+        manifest.mark_complete(first_page, last_page, count_csv_rows(shard_csv))
+        logging.info(f"Shard {first_page}-{last_page} checkpointed ({len(manifest.completed)}/{len(shards)})")
+
+    os.makedirs(os.path.dirname(output_csv) or '.', exist_ok=True)
+    rows = merge_shards(manifest, shards, output_csv)
+    logging.info(f"Merged {len(shards)} shards ({rows} words) into {output_csv}")
 
 ###############################################
 # Pattern-based Classification Functions
@@ -107,46 +376,30 @@ def classify_by_pattern(word: str) -> str:
     
     word = str(word).strip()
     
-    # Commodity Number patterns: 0291 000, 0293 100, etc.
-    if re.match(r'^\d{4}\s*\d{3}$', word):
+    if COMMODITY_NUMBER.fullmatch(word):
         return 'commodity_number'
     
-    # Tariff Paragraph patterns: 1530(b), 1765, etc.
-    if re.match(r'^\d{3,4}(\([a-zA-Z]\))?$', word):
+    if TARIFF_PARAGRAPH.fullmatch(word):
         return 'tariff_paragraph'
     
     # Everything else is description (includes units, rates, trade agreements, etc.)
     return 'description'
 
-def group_words_by_rows(df: pd.DataFrame, y_threshold: float = 25) -> List[List[int]]:
-    """
-    Group words into rows based on Y-coordinates proximity.
-    Returns list of lists containing indices for each row.
-    """
-    df_sorted = df.sort_values('TopLeft_Y').reset_index(drop=True)
-    rows = []
-    current_row = [0]
-    current_y = df_sorted.iloc[0]['TopLeft_Y']
-    
-    for i in range(1, len(df_sorted)):
-        y_coord = df_sorted.iloc[i]['TopLeft_Y']
-        if abs(y_coord - current_y) <= y_threshold:
-            current_row.append(i)
-        else:
-            rows.append(current_row)
-            current_row = [i]
-            current_y = y_coord
-    
-    if current_row:
-        rows.append(current_row)
-    
-    # Convert back to original indices
-    original_rows = []
-    for row in rows:
-        original_indices = [df_sorted.index[i] for i in row]
-        original_rows.append(original_indices)
-    
-    return original_rows
+def _stripped_words(words: pd.Series) -> pd.Series:
+    """Words as stripped strings, with missing words as ''."""
+    return words.astype(str).str.strip().where(words.notna(), '')
+
+def commodity_number_mask(words: pd.Series) -> pd.Series:
+    """True where the word is a commodity number."""
+    return _stripped_words(words).str.fullmatch(COMMODITY_NUMBER)
+
+def classify_words_by_pattern(words: pd.Series) -> pd.Series:
+    """Column-wise classify_by_pattern: one pattern label per word."""
+    text = _stripped_words(words)
+    is_commodity = text.str.fullmatch(COMMODITY_NUMBER)
+    is_tariff = text.str.fullmatch(TARIFF_PARAGRAPH)
+    labels = np.select([is_commodity, is_tariff], ['commodity_number', 'tariff_paragraph'], 'description')
+    return pd.Series(labels, index=words.index, dtype=object)
 
 def classify_row_context(row_words: List[str], row_patterns: List[str]) -> dict:
     """
@@ -167,6 +420,30 @@ def classify_row_context(row_words: List[str], row_patterns: List[str]) -> dict:
     
     return refined_classification
 
+def classify_ocr_words(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classify every word of an OCR word table into Commodity_Number,
+    Description or Tariff_Paragraph, column by column:
+    regex masks for the patterns and np.where to fill the three columns.
+    The row context rule of classify_row_context keeps every pattern label
+    as it is, so no row pass is needed.
+    Adds those columns plus Pattern_Classification to a copy of df.
+    """
+    df = df.copy()
+
+    # First pass: Pattern-based classification
+    df['Pattern_Classification'] = classify_words_by_pattern(df['Word']).to_numpy()
+
+    # Second pass: Assign to specific columns (only 3 categories)
+    classification = df['Pattern_Classification'].to_numpy()
+    words = df['Word'].to_numpy(dtype=object)
+    df['Commodity_Number'] = np.where(classification == 'commodity_number', words, None)
+    df['Tariff_Paragraph'] = np.where(classification == 'tariff_paragraph', words, None)
+    # Everything else goes to description
+    df['Description'] = np.where((classification != 'commodity_number') & (classification != 'tariff_paragraph'),
+                                 words, None)
+    return df
+
 ###############################################
 # OCR Cleaning: Clean and Classify Words
 ###############################################
@@ -180,18 +457,15 @@ def clean_ocr_words_with_coords(input_csv: str, output_csv: str) -> None:
     logging.info(f"Loading OCR data from {input_csv}...")
     
     try:
-        df = pd.read_csv(input_csv)
+        df = read_table(input_csv)
         logging.info(f"Loaded {len(df)} words from OCR data")
     except Exception as e:
         logging.error(f"Failed to load CSV: {e}")
         return
     
     # Find first commodity number and skip rows before it
-    first_commodity_idx = None
-    for idx, word in enumerate(df['Word']):
-        if pd.notna(word) and re.match(r'^\d{4}\s*\d{3}$', str(word).strip()):
-            first_commodity_idx = idx
-            break
+    commodity_positions = np.flatnonzero(commodity_number_mask(df['Word']).to_numpy())
+    first_commodity_idx = int(commodity_positions[0]) if len(commodity_positions) else None
     
     if first_commodity_idx is not None:
         df = df.iloc[first_commodity_idx:].reset_index(drop=True)
@@ -200,47 +474,8 @@ def clean_ocr_words_with_coords(input_csv: str, output_csv: str) -> None:
     else:
         logging.warning("No commodity numbers found in the data!")
     
-    # Initialize classification columns (only 3 categories)
-    df['Commodity_Number'] = None
-    df['Description'] = None
-    df['Tariff_Paragraph'] = None
-    df['Pattern_Classification'] = None
-    
-    # First pass: Pattern-based classification
-    logging.info("Performing pattern-based classification...")
-    df['Pattern_Classification'] = df['Word'].apply(classify_by_pattern)
-    
-    # Second pass: Row-based context refinement
-    logging.info("Refining classification with row context...")
-    word_rows = group_words_by_rows(df)
-    
-    for row_indices in word_rows:
-        if len(row_indices) <= 1:
-            continue
-            
-        row_words = [df.iloc[i]['Word'] for i in row_indices]
-        row_patterns = [df.iloc[i]['Pattern_Classification'] for i in row_indices]
-        
-        refined = classify_row_context(row_words, row_patterns)
-        
-        # Update refined classifications
-        for i in row_indices:
-            word = df.iloc[i]['Word']
-            if word in refined:
-                df.at[i, 'Pattern_Classification'] = refined[word]
-    
-    # Third pass: Assign to specific columns (only 3 categories)
-    logging.info("Assigning words to specific columns...")
-    for idx, row in df.iterrows():
-        word = row['Word']
-        classification = row['Pattern_Classification']
-        
-        if classification == 'commodity_number':
-            df.at[idx, 'Commodity_Number'] = word
-        elif classification == 'tariff_paragraph':
-            df.at[idx, 'Tariff_Paragraph'] = word
-        else:  # Everything else goes to description
-            df.at[idx, 'Description'] = word
+    logging.info("Classifying words by pattern and row context...")
+    df = classify_ocr_words(df)
     
     # Keep only new classified columns first, then coordinates (no Word or Pattern_Classification)
     output_columns = [
@@ -254,8 +489,7 @@ def clean_ocr_words_with_coords(input_csv: str, output_csv: str) -> None:
     df_output = df[output_columns].copy()
     
     # Save the classified data
-    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
-    df_output.to_csv(output_csv, index=False)
+    write_table(df_output, output_csv)
     logging.info(f"Cleaned and classified data saved to: {output_csv}")
     
     # Print summary statistics (simplified to 3 categories)
@@ -271,18 +505,55 @@ def clean_ocr_words_with_coords(input_csv: str, output_csv: str) -> None:
         for idx, row in sample_data.iterrows():
             logging.info(f"Row {idx}: Commodity={row['Commodity_Number']}")
 
-def main():
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Extract and classify OCR words from the Schedule A PDF.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of OCR worker processes (default: 1, run in-process). Match to core count.")
+    parser.add_argument("--cache-dir", default=ocr_cache_dir, help="Directory for cached per-page OCR results.")
+    parser.add_argument("--cache-size-mb", type=int, default=ocr_cache_max_mb,
+                        help="Size cap of the OCR cache; least recently used pages are evicted first.")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-run OCR and leave the cache untouched.")
+    parser.add_argument("--render-queue-depth", type=int, default=render_queue_depth,
+                        help="Rendered pages buffered ahead of OCR for in-process runs (0 disables the streaming pipeline).")
+    parser.add_argument("--write-queue-depth", type=int, default=write_queue_depth,
+                        help="OCR results buffered ahead of the writer stage.")
+    parser.add_argument("--batch-size", type=int, default=ocr_batch_size,
+                        help="Rendered pages per PaddleOCR predict call for in-process runs.")
+    parser.add_argument("--max-batch-mb", type=int, default=ocr_max_batch_mb,
+                        help="Memory cap for the rendered pages of one batch.")
+    parser.add_argument("--adaptive-dpi", action="store_true", default=adaptive_dpi,
+                        help="Probe pages at low DPI, skip blank pages and OCR only the content region at full DPI.")
+    parser.add_argument("--no-text-layer", action="store_true",
+                        help="OCR every page, even pages that already carry an embedded text layer.")
+    parser.add_argument("--start-page", type=int, default=start_page, help="First page to OCR (1-based).")
+    parser.add_argument("--end-page", type=int, default=end_page, help="Last page to OCR (inclusive).")
+    parser.add_argument("--shard-size", type=int, default=shard_size,
+                        help="Write and checkpoint every N pages so an interrupted run can resume (0 disables).")
+    parser.add_argument("--shard-dir", default=shard_dir, help="Directory for shard CSVs and the checkpoint manifest.")
+    parser.add_argument("--restart", action="store_true", help="Ignore completed shards and OCR the whole range again.")
+    return parser.parse_args()
+
+def main(workers: int = 1, cache_dir: Optional[str] = ocr_cache_dir, cache_size_mb: int = ocr_cache_max_mb,
+         render_queue_depth: int = render_queue_depth, write_queue_depth: int = write_queue_depth,
+         batch_size: int = ocr_batch_size, max_batch_mb: int = ocr_max_batch_mb, adaptive: bool = adaptive_dpi,
+         text_layer: bool = use_text_layer, first_page: int = start_page, last_page: int = end_page,
+         shard_size: int = shard_size, shard_dir: str = shard_dir, restart: bool = False):
     # ocr = PaddleOCR(use_angle_cls=True, lang="en")
-    ocr = PaddleOCR(
-    text_detection_model_name="PP-OCRv5_mobile_det",
-    text_recognition_model_name="PP-OCRv5_mobile_rec",
-    use_doc_orientation_classify=False,
-    use_doc_unwarping=False,
-    use_textline_orientation=False) #new ocr model
+    # The model is built lazily (in-process or once per worker) only for pages missing from the cache
+    ocr = None  # new ocr model, see ocr_model_config
+    cache = OcrPageCache(cache_dir, max_bytes=cache_size_mb * 1024 * 1024) if cache_dir else None
 
     # Step 1: Extract OCR words with coordinates
     print("Step 1: Extracting OCR words with coordinates...")
-    extract_ocr_words_with_coords(pdf_path, start_page, end_page, ocr)
+    extract_kwargs = dict(workers=workers, cache=cache,
+                          render_queue_depth=render_queue_depth, write_queue_depth=write_queue_depth,
+                          batch_size=batch_size, max_batch_mb=max_batch_mb, adaptive=adaptive,
+                          text_layer=text_layer)
+    if shard_size > 0:
+        extract_ocr_words_sharded(pdf_path, first_page, last_page, ocr, output_csv=output_word_coords,
+                                  shard_size=shard_size, shard_dir=shard_dir, restart=restart, **extract_kwargs)
+    else:
+        extract_ocr_words_with_coords(pdf_path, first_page, last_page, ocr, **extract_kwargs)
     print(f"Raw OCR data saved to: {output_word_coords}")
     
     # Step 2: Clean and classify the OCR words
@@ -294,4 +565,18 @@ def main():
     print(f"Final output: {output_cleaned_csv}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_arguments()
+    main(workers=args.workers,
+         cache_dir=None if args.no_cache else args.cache_dir,
+         cache_size_mb=args.cache_size_mb,
+         render_queue_depth=args.render_queue_depth,
+         write_queue_depth=args.write_queue_depth,
+         batch_size=args.batch_size,
+         max_batch_mb=args.max_batch_mb,
+         adaptive=args.adaptive_dpi,
+         text_layer=use_text_layer and not args.no_text_layer,
+         first_page=args.start_page,
+         last_page=args.end_page,
+         shard_size=args.shard_size,
+         shard_dir=args.shard_dir,
+         restart=args.restart)
\ No newline at end of file
@@ -1,15 +1,21 @@
 import pandas as pd
 import numpy as np
 import logging
-import re
+from commodity import format_commodity_numbers, parse_commodity_numbers
+from corrections import CorrectionTable
+from geometry import indent_levels
+from patterns import DASH_RUN, NOISE, WHITESPACE_RUN
+from table_schema import CLEANED_WORDS_DTYPES, FINAL_TABLE_DTYPES, read_table, write_table
+from word_index import WordIndex
 
 # =========================
 # Configuration
 # =========================
-INPUT_CSV = r"new-work/output/cleaned_classified_words.csv"
-FINAL_TABLE_CSV = r"new-work/output/final-table.csv"
+INPUT_CSV = r"new-work/output/cleaned_classified_words.parquet"
+FINAL_TABLE_CSV = r"new-work/output/final-table.parquet"
 OUTPUT_TXT = r"new-work/output/formatted_commodities.txt"
 Y_PROXIMITY_THRESHOLD = 50  # Max vertical distance to consider lines as continuations
+INDENT_TOLERANCE = 12  # Max X gap between line starts on the same indentation level
 
 # =========================
 # Logging Setup
@@ -23,105 +29,118 @@ logging.basicConfig(
 # Helper Functions
 # =========================
 
+def has_description(data: pd.DataFrame) -> pd.Series:
+    """Rows of the cleaned words table with a non-empty description."""
+    return data['Commodity Description'].notna() & (data['Commodity Description'] != '')
+
+def continuation_lines(data: pd.DataFrame, y_threshold: int = Y_PROXIMITY_THRESHOLD) -> np.ndarray:
+    """
+    Whether each line (row, in order) continues the line above it: both have
+    text, it starts further right and less than y_threshold lower, and the
+    line above does not end with ':'.
+    """
+    descriptions = data['Commodity Description']
+    text = descriptions.astype(str).str.strip().where(descriptions.notna(), '')
+    x = data['TopLeft_X'].astype(float)
+    y = data['TopLeft_Y'].astype(float)
+
+    # Compare every line with the next one through shifted columns
+    has_text = (text != '').to_numpy(dtype=bool)
+    joins_next = (has_text & pd.Series(has_text).shift(-1, fill_value=False).to_numpy(dtype=bool)
+                  & (x.shift(-1) > x).to_numpy(dtype=bool)
+                  & (y.shift(-1) - y < y_threshold).to_numpy(dtype=bool)
+                  & ~text.str.endswith(':').to_numpy(dtype=bool))
+    continues = np.zeros(len(data), dtype=bool)
+    continues[1:] = joins_next[:-1]
+    return continues
+
 def combine_split_lines(data: pd.DataFrame, y_threshold: int = Y_PROXIMITY_THRESHOLD) -> pd.DataFrame:
     """
     Combine lines that are likely continuations of the previous line,
-    based on indentation and vertical proximity.
+    based on indentation and vertical proximity (see continuation_lines).
+    Each run of continuations is merged into the line it starts from,
+    however long the run is.
     """
-    processed_data = data.copy().reset_index(drop=True)  # Reset index to avoid KeyError
-    skip_indices = set()
-    
-    for i in range(len(processed_data) - 1):
-        try:
-            curr_x = processed_data.iloc[i]['TopLeft_X']
-            next_x = processed_data.iloc[i+1]['TopLeft_X']
-            curr_y = processed_data.iloc[i]['TopLeft_Y']
-            next_y = processed_data.iloc[i+1]['TopLeft_Y']
-            curr_desc = str(processed_data.iloc[i]['Commodity Description']).strip() if pd.notna(processed_data.iloc[i]['Commodity Description']) else ''
-            next_desc = str(processed_data.iloc[i+1]['Commodity Description']).strip() if pd.notna(processed_data.iloc[i+1]['Commodity Description']) else ''
-            y_proximity = next_y - curr_y
-            
-            if curr_desc and next_desc:
-                if (next_x > curr_x) and (y_proximity < y_threshold) and not curr_desc.endswith(':'):
-                    combined_desc = f"{curr_desc} {next_desc}"
-                    processed_data.at[i, 'Commodity Description'] = combined_desc
-                    skip_indices.add(i+1)
-        except (IndexError, KeyError) as e:
-            logging.warning(f"Error at index {i}: {e}")
-            continue
-    
-    # Remove combined rows - only drop indices that actually exist
-    valid_skip_indices = [idx for idx in skip_indices if idx < len(processed_data)]
-    if valid_skip_indices:
-        result_data = processed_data.drop(index=valid_skip_indices).reset_index(drop=True)
-    else:
-        result_data = processed_data.reset_index(drop=True)
-    
-    return result_data
+    processed_data = data.reset_index(drop=True)  # Reset index to avoid KeyError
+    descriptions = processed_data['Commodity Description']
+    text = descriptions.astype(str).str.strip().where(descriptions.notna(), '')
+    continues = continuation_lines(processed_data, y_threshold)
+
+    # Run-length merge: a run is a line and the continuation lines right below it
+    run_ids = np.cumsum(~continues)
+    in_run = continues.copy()
+    in_run[:-1] |= continues[1:]
+    merged_text = text[in_run].groupby(run_ids[in_run]).agg(' '.join)
+
+    result_data = processed_data[~continues].copy()
+    merged_rows = in_run[~continues]
+    result_data.loc[merged_rows, 'Commodity Description'] = merged_text.loc[run_ids[~continues][merged_rows]].to_numpy()
+    return result_data.reset_index(drop=True)
 
-def process_commodity_descriptions_by_pixels(data: pd.DataFrame) -> pd.DataFrame:
+def process_commodity_descriptions_by_pixels(data: pd.DataFrame, indent_tolerance: float = INDENT_TOLERANCE) -> pd.DataFrame:
     """
     Build hierarchical descriptions using indentation (X position) and parent-child logic.
     Enhanced to create cleaner, more targeted descriptions matching expected format.
+    Line starts are clustered into indentation levels (see geometry.indent_levels),
+    returned in the 'Indent Level' column, and the open parent lines are kept
+    on a stack while walking the lines top to bottom. A top-level line without
+    deeper lines under it is a leaf and keeps its own description.
     """
     data = data.sort_values(by=['Page', 'TopLeft_Y'])
-    x_values = sorted(data['TopLeft_X'].unique())
-    x_level_map = {x: level for level, x in enumerate(x_values)}
-    current_texts = [None] * len(x_values)
-    data['Is Parent'] = False
-
-    for idx, row in data.iterrows():
-        description = str(row['Commodity Description']).strip() if pd.notna(row['Commodity Description']) else ''
-        if not description:
-            continue
-            
-        # Apply OCR corrections
-        description = apply_advanced_ocr_corrections(description)
-        
-        x_coord = row['TopLeft_X']
-        level = x_level_map[x_coord]
-        current_texts[level] = description
-        
-        # Clear deeper levels when we encounter a new item at this level
-        for i in range(level + 1, len(current_texts)):
-            current_texts[i] = None
-        
+    levels = indent_levels(data['TopLeft_X'], indent_tolerance)
+    data['Indent Level'] = pd.array(np.where(levels >= 0, levels, None), dtype='Int64')
+    # Lines without an X position are placed below every level
+    walk_levels = np.where(levels >= 0, levels, levels.max(initial=-1) + 1)
+
+    raw_descriptions = data['Commodity Description']
+    has_text = (raw_descriptions.astype(str).str.strip().where(raw_descriptions.notna(), '') != '').to_numpy(dtype=bool)
+    # OCR corrections, applied to the whole column at once
+    corrected_descriptions = apply_advanced_ocr_corrections_series(raw_descriptions).to_numpy(dtype=object)
+    x_coords = data['TopLeft_X'].to_numpy(dtype=float)
+    descriptions = raw_descriptions.to_numpy(dtype=object).copy()
+    is_parents = np.zeros(len(data), dtype=bool)
+    # Whether the next line with text is indented deeper than this one
+    text_rows = np.flatnonzero(has_text)
+    has_children = np.zeros(len(data), dtype=bool)
+    has_children[text_rows[:-1]] = walk_levels[text_rows[1:]] > walk_levels[text_rows[:-1]]
+
+    # Open lines, shallowest first: (level, text, parent text or None if it can't be a parent,
+    # stack position of the nearest line below it that can)
+    stack = []
+    for i in np.flatnonzero(has_text):
+        description, level, x_coord = corrected_descriptions[i], walk_levels[i], x_coords[i]
+
+        # A new line closes the open lines at its level and deeper
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        below = len(stack) - 1 if stack and stack[-1][2] else (stack[-1][3] if stack else -1)
+
         # Enhanced parent detection
         is_parent = (description.endswith(':') or 
-                    level == 0 or  # Top-level items are often parents
+                    (level == 0 and has_children[i]) or  # Top-level items with lines under them are parents
                     x_coord < 100 or  # Far-left items are likely parents
                     any(pattern in description.lower() for pattern in 
                         ['cattle', 'sheep', 'lambs', 'animals', 'live', 'meat', 'poultry', 
                          'fresh', 'chilled', 'frozen', 'prepared', 'preserved']))
+        is_parents[i] = is_parent
         
-        data.at[idx, 'Is Parent'] = is_parent
-        
-        if level == 0 and not is_parent:
-            # Top level non-parent items keep their original description
-            data.at[idx, 'Commodity Description'] = description
-        elif not is_parent:
-            # Build targeted hierarchical description
-            relevant_parents = []
-            for i in range(level):
-                if current_texts[i] and current_texts[i] != description:
-                    parent_text = current_texts[i].rstrip(':').strip()
-                    if parent_text and not is_noise_text(parent_text):
-                        relevant_parents.append(parent_text)
-            
-            # Create concise description
-            if relevant_parents:
-                # Only use the most relevant parent (last one)
-                main_parent = relevant_parents[-1] if relevant_parents else ""
-                if main_parent and not description.startswith(main_parent):
-                    hierarchical_desc = f"{main_parent}: {description}"
-                else:
-                    hierarchical_desc = description
-                data.at[idx, 'Commodity Description'] = hierarchical_desc
-            else:
-                data.at[idx, 'Commodity Description'] = description
-        else:
-            # This is a parent item - keep it but might filter later
-            data.at[idx, 'Commodity Description'] = description
+        if level != 0 and not is_parent:
+            # Build targeted hierarchical description from the closest parent with other text
+            parent = below
+            while parent >= 0 and stack[parent][1] == description:
+                parent = stack[parent][3]
+            if parent >= 0:
+                main_parent = stack[parent][2]
+                if not description.startswith(main_parent):
+                    description = f"{main_parent}: {description}"
+        descriptions[i] = description
+
+        parent_text = corrected_descriptions[i].rstrip(':').strip() if corrected_descriptions[i] else ''
+        usable = bool(parent_text) and not is_noise_text(parent_text)
+        stack.append((level, corrected_descriptions[i], parent_text if usable else None, below))
+
+    data['Commodity Description'] = pd.Series(descriptions, index=data.index).astype(raw_descriptions.dtype)
+    data['Is Parent'] = is_parents
     
     # Filter to keep only meaningful descriptions
     result = data[
@@ -132,59 +151,61 @@ def process_commodity_descriptions_by_pixels(data: pd.DataFrame) -> pd.DataFrame
     result = result.drop(columns=['Is Parent'])
     return result
 
+# Common OCR corrections in descriptions
+description_corrections = CorrectionTable({
+    'Catt1e': 'Cattle', 'p0unds': 'pounds', 'eachch': 'each', 'chi11ed': 'chilled',
+    'fr0zen': 'frozen', 'P0u1try': 'Poultry', '1ive': 'live', '8eef': 'Beef',
+    'Veach1': 'Veal', 'H0gs': 'Hogs', '60ats': 'Goats', '8aby': 'Baby',
+    'guineachs': 'guineas', 'inc1uding': 'including', 'c0rned': 'corned',
+    'Deachd': 'Dead', 'undressed': 'undressed', 'Turkeys': 'Turkeys',
+    'Ducks': 'Ducks', '8irds': 'Birds', 'Mutt0n': 'Mutton', 'Reindeer': 'Reindeer',
+    'meacht': 'meat', 'Venis0n': 'Venison', '1ess': 'less', 'm0re': 'more',
+    'dairy': 'dairy', 'purp0ses': 'purposes', 'kidneys': 'kidneys',
+    't0ngues': 'tongues', 'heachrts': 'hearts', '0ffa1': 'offal',
+    'ca1ves': 'calves', 'n. 8. p. f': 'n. s. p. f', 'chicks': 'chicks',
+    '0f': 'of', '0r': 'or', 'f0r': 'for', '（': '(', '）': ')',
+    'and less': 'and less', 'or more': 'or more'
+})
+
 def apply_advanced_ocr_corrections(text):
     """Apply comprehensive OCR corrections for better text quality."""
     if not text:
         return ""
     
-    # Common OCR corrections
-    corrections = {
-        'Catt1e': 'Cattle', 'p0unds': 'pounds', 'eachch': 'each', 'chi11ed': 'chilled',
-        'fr0zen': 'frozen', 'P0u1try': 'Poultry', '1ive': 'live', '8eef': 'Beef',
-        'Veach1': 'Veal', 'H0gs': 'Hogs', '60ats': 'Goats', '8aby': 'Baby',
-        'guineachs': 'guineas', 'inc1uding': 'including', 'c0rned': 'corned',
-        'Deachd': 'Dead', 'undressed': 'undressed', 'Turkeys': 'Turkeys',
-        'Ducks': 'Ducks', '8irds': 'Birds', 'Mutt0n': 'Mutton', 'Reindeer': 'Reindeer',
-        'meacht': 'meat', 'Venis0n': 'Venison', '1ess': 'less', 'm0re': 'more',
-        'dairy': 'dairy', 'purp0ses': 'purposes', 'kidneys': 'kidneys',
-        't0ngues': 'tongues', 'heachrts': 'hearts', '0ffa1': 'offal',
-        'ca1ves': 'calves', 'n. 8. p. f': 'n. s. p. f', 'chicks': 'chicks',
-        '0f': 'of', '0r': 'or', 'f0r': 'for', '（': '(', '）': ')',
-        '1ess': 'less', 'and less': 'and less', 'or more': 'or more'
-    }
-    
-    for incorrect, correct in corrections.items():
-        text = text.replace(incorrect, correct)
+    text = description_corrections.apply(text)
     
     # Clean up extra spaces and dashes
-    text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single space
-    text = re.sub(r'-+', '-', text)   # Multiple dashes to single dash
+    text = WHITESPACE_RUN.sub(' ', text)  # Multiple spaces to single space
+    text = DASH_RUN.sub('-', text)   # Multiple dashes to single dash
     text = text.strip()
     
     return text
 
+def apply_advanced_ocr_corrections_series(descriptions: pd.Series) -> pd.Series:
+    """apply_advanced_ocr_corrections() for a whole column; missing values become ''."""
+    text = descriptions.where(descriptions.notna(), '').astype(str).str.strip()
+    text = description_corrections.apply_series(text)
+    text = text.str.replace(WHITESPACE_RUN, ' ', regex=True).str.replace(DASH_RUN, '-', regex=True)
+    return text.str.strip()
+
 def is_noise_text(text):
     """Check if text is noise that should be filtered out."""
-    noise_patterns = [
-        r'^[A-Z0-9\s]+$',  # All caps abbreviations
-        r'^\d+$',          # Just numbers
-        r'^[^\w\s]+$',     # Just punctuation
-        r'SCHEDULE A',
-        r'COMMODITY',
-        r'RATE OF DUTY',
-        r'TARIFF',
-        r'Group.*ANIMAL',
-        r'ECONOMIC CLASS'
-    ]
-    
-    for pattern in noise_patterns:
-        if re.match(pattern, text, re.IGNORECASE):
-            return True
-    return False
+    return NOISE.match(text) is not None
 
-def save_outputs(hierarchical_data: pd.DataFrame, final_table_path: str, txt_path: str):
+def commodity_anchors(original_data: pd.DataFrame, word_index: WordIndex = None) -> WordIndex:
+    """
+    Index of the rows of the cleaned words table that carry a commodity number,
+    taken from word_index (a WordIndex over original_data) when given.
+    """
+    if word_index is None:
+        word_index = WordIndex(original_data)
+    return word_index.subset(original_data['Commodity Number'].notna() & (original_data['Commodity Number'] != ''))
+
+def save_outputs(hierarchical_data: pd.DataFrame, final_table_path: str, txt_path: str,
+                 original_data: pd.DataFrame = None, word_index: WordIndex = None):
     """
     Save the processed data by updating the final table with hierarchical descriptions.
+    original_data is the cleaned words table; it is read from INPUT_CSV when not given.
     """
     import os
     os.makedirs(os.path.dirname(final_table_path), exist_ok=True)
@@ -192,7 +213,7 @@ def save_outputs(hierarchical_data: pd.DataFrame, final_table_path: str, txt_pat
     
     # Load the final table created by 02_commodity_number.py
     try:
-        final_table = pd.read_csv(final_table_path)
+        final_table = read_table(final_table_path)
         logging.info(f"Loaded final table with {len(final_table)} rows from {final_table_path}")
     except FileNotFoundError:
         logging.error(f"Final table not found at {final_table_path}. Please run 02_commodity_number.py first.")
@@ -202,146 +223,111 @@ def save_outputs(hierarchical_data: pd.DataFrame, final_table_path: str, txt_pat
     logging.info(f"Hierarchical data columns: {list(hierarchical_data.columns)}")
     logging.info(f"Sample hierarchical data rows: {len(hierarchical_data)}")
     
-    # Create a mapping of commodity numbers to descriptions
-    commodity_desc_map = {}
-    
     # Load the original cleaned data to get commodity numbers
-    original_data = pd.read_csv(INPUT_CSV)
+    if original_data is None:
+        original_data = read_table(INPUT_CSV)
     
-    # Group descriptions by Y-coordinate proximity to match with commodity numbers
-    for idx, row in hierarchical_data.iterrows():
-        description = str(row.get('Commodity Description', '')).strip()
-        if not description or description == 'nan':
-            continue
-            
-        # Find nearby commodity numbers in the original data using coordinates
-        y_coord = row.get('TopLeft_Y', 0)
-        tolerance = 30  # Y-coordinate tolerance
-        
-        # Find commodity numbers within Y-coordinate range
-        nearby_commodities = original_data[
-            (original_data['Commodity Number'].notna()) & 
-            (original_data['Commodity Number'] != '') &
-            (abs(original_data['TopLeft_Y'] - y_coord) <= tolerance)
-        ]
-        
-        if len(nearby_commodities) > 0:
-            # Get the closest commodity number
-            closest_commodity = nearby_commodities.iloc[0]['Commodity Number']
-            commodity_num = str(closest_commodity).strip()
-            
-            if commodity_num and commodity_num != 'nan':
-                commodity_desc_map[commodity_num] = description
-                logging.info(f"Mapped: {commodity_num} -> {description[:50]}...")
+    final_table, commodity_desc_map = add_descriptions(hierarchical_data, final_table, original_data, word_index)
     
-    logging.info(f"Created {len(commodity_desc_map)} commodity-description mappings")
+    # Save updated final table (overwrite the original)
+    write_table(final_table, final_table_path, FINAL_TABLE_DTYPES)
     
-    # Update the final table with hierarchical descriptions
-    updated_count = 0
+    # Save descriptions to text file
+    write_descriptions(commodity_desc_map, txt_path)
     
-    logging.info("Debugging commodity mappings:")
-    logging.info(f"Sample mappings: {list(commodity_desc_map.keys())[:5]}")
-    logging.info(f"Sample final table commodity numbers: {final_table['SCHEDULE A COMMODITY NUMBER'].head().tolist()}")
+    logging.info(f"Updated final table saved to: {final_table_path}")
+    logging.info(f"Formatted descriptions saved to: {txt_path}")
+
+def add_descriptions(hierarchical_data: pd.DataFrame, final_table: pd.DataFrame, original_data: pd.DataFrame,
+                     word_index: WordIndex = None):
+    """
+    Fill the description column of the final table from the hierarchical
+    descriptions, each matched to the nearest commodity number in the cleaned
+    words table (original_data, indexed by word_index when given). Returns the
+    updated final table and the description per commodity key.
+    """
+    # Match descriptions with the nearest commodity number on the same page by Y-coordinate
+    tolerance = 30  # Y-coordinate tolerance
+    commodity_index = commodity_anchors(original_data, word_index)
+    nearest_commodities = commodity_index.nearest_values(hierarchical_data, 'Commodity Number', tolerance)
     
-    for idx, row in final_table.iterrows():
-        commodity_num_formatted = str(row['SCHEDULE A COMMODITY NUMBER']).strip()
-        
-        # Convert "0106 000" to "10600.0" format to match our mappings
-        # Remove spaces: "0106 000" -> "0106000"
-        clean_num = commodity_num_formatted.replace(' ', '')
-        
-        # Convert "0106000" to "10600.0" format by removing leading zero and adjusting trailing zeros
-        if len(clean_num) == 7:
-            # "0106000" -> remove leading zero -> "106000"
-            without_leading_zero = clean_num[1:]  # "106000"
-            
-            # For the format conversion, we need to match the pattern in our data
-            # Our data has: 10600.0, 10700.0, 12000.0, 12200.0, etc.
-            # Pattern: take first 3-5 significant digits, add trailing zeros to make it reasonable
-            
-            # Remove all trailing zeros first
-            without_trailing_zeros = without_leading_zero.rstrip('0')  # "106", "12", etc.
-            
-            # Apply logic based on the length to match our data patterns
-            if len(without_trailing_zeros) == 2:  # "12" -> should become "12000"
-                converted_num = without_trailing_zeros + '000'
-            elif len(without_trailing_zeros) == 3:  # "106" -> should become "10600"  
-                converted_num = without_trailing_zeros + '00'
-            elif len(without_trailing_zeros) == 4:  # "2540" -> should become "25400"
-                converted_num = without_trailing_zeros + '0'
-            else:  # 5+ digits or other cases
-                converted_num = without_trailing_zeros
-            
-            # Add decimal: "10600" -> "10600.0"
-            mapping_key = f"{converted_num}.0"
-        else:
-            mapping_key = clean_num
-        
-        logging.info(f"Converting {commodity_num_formatted} -> {mapping_key}")
-        
-        # Look for exact match
-        if mapping_key in commodity_desc_map:
-            matched_desc = commodity_desc_map[mapping_key]
-            final_table.at[idx, 'COMMODITY DESCRIPTION AND ECONOMIC CLASS'] = matched_desc
-            updated_count += 1
-            logging.info(f"✅ Updated {commodity_num_formatted} -> {matched_desc[:50]}...")
-        else:
-            logging.info(f"❌ No match found for {commodity_num_formatted} (tried {mapping_key})")
+    # Description per commodity key; the last description matched to a commodity wins
+    descriptions = hierarchical_data['Commodity Description'].astype(str).str.strip()
+    keys = parse_commodity_numbers(nearest_commodities)
+    matched = keys.notna() & hierarchical_data['Commodity Description'].notna() & (descriptions != '') & (descriptions != 'nan')
+    commodity_desc_map = descriptions[matched].groupby(keys[matched], sort=False).last()
     
-    # Save updated final table (overwrite the original)
-    final_table.to_csv(final_table_path, index=False)
+    logging.info(f"Created {len(commodity_desc_map)} commodity-description mappings")
+    logging.info(f"Sample mappings: {format_commodity_numbers(commodity_desc_map.index[:5]).tolist()}")
+    logging.info(f"Sample final table commodity numbers: {final_table['SCHEDULE A COMMODITY NUMBER'].head().tolist()}")
     
-    # Save descriptions to text file
+    # Update the final table with hierarchical descriptions, joined on the commodity key
+    final_keys = parse_commodity_numbers(final_table['SCHEDULE A COMMODITY NUMBER'])
+    matched_descriptions = final_keys.map(commodity_desc_map)
+    has_description = matched_descriptions.notna()
+    final_table['COMMODITY DESCRIPTION AND ECONOMIC CLASS'] = \
+        final_table['COMMODITY DESCRIPTION AND ECONOMIC CLASS'].astype(object)
+    final_table.loc[has_description, 'COMMODITY DESCRIPTION AND ECONOMIC CLASS'] = matched_descriptions[has_description]
+    updated_count = int(has_description.sum())
+    for commodity_num in final_table.loc[~has_description, 'SCHEDULE A COMMODITY NUMBER']:
+        logging.info(f"No match found for {commodity_num}")
+    logging.info(f"Updated {updated_count} commodity descriptions")
+    
+    return final_table, commodity_desc_map
+
+def write_descriptions(commodity_desc_map: pd.Series, txt_path: str):
+    """Write one "0010 600: description" line per commodity."""
     with open(txt_path, "w", encoding='utf-8') as f:
-        for commodity_num, description in commodity_desc_map.items():
+        for commodity_num, description in zip(format_commodity_numbers(commodity_desc_map.index), commodity_desc_map):
             f.write(f"{commodity_num}: {description}\n")
-    
-    logging.info(f"Updated final table saved to: {final_table_path}")
-    logging.info(f"Updated {updated_count} commodity descriptions")
-    logging.info(f"Formatted descriptions saved to: {txt_path}")
 
-def print_sample(hierarchical_data: pd.DataFrame, n: int = 10):
+def print_sample(hierarchical_data: pd.DataFrame, n: int = 10, original_data: pd.DataFrame = None,
+                 word_index: WordIndex = None):
     """
     Print a sample of the hierarchical descriptions.
     """
     print("\nSample of processed hierarchical descriptions:")
     
     # Load original data to get commodity numbers for context
-    original_data = pd.read_csv(INPUT_CSV)
+    if original_data is None:
+        original_data = read_table(INPUT_CSV)
     
     valid_descriptions = hierarchical_data['Commodity Description'].dropna()
     valid_descriptions = [desc for desc in valid_descriptions if str(desc).strip()]
     
+    # Nearest commodity number for the first row with each description
+    tolerance = 30
+    first_rows = hierarchical_data[~hierarchical_data['Commodity Description'].duplicated()]
+    commodity_index = commodity_anchors(original_data, word_index)
+    nearest_commodities = commodity_index.nearest_values(first_rows, 'Commodity Number', tolerance)
+    nearest_numbers = format_commodity_numbers(parse_commodity_numbers(nearest_commodities))
+    commodity_by_desc = dict(zip(first_rows['Commodity Description'], nearest_numbers))
+    
     for i, desc in enumerate(valid_descriptions[:n]):
-        # Find the row with this description
-        desc_row = hierarchical_data[hierarchical_data['Commodity Description'] == desc].iloc[0]
-        y_coord = desc_row.get('TopLeft_Y', 0)
-        
-        # Find nearby commodity number
-        tolerance = 30
-        nearby_commodities = original_data[
-            (original_data['Commodity Number'].notna()) & 
-            (original_data['Commodity Number'] != '') &
-            (abs(original_data['TopLeft_Y'] - y_coord) <= tolerance)
-        ]
-        
-        commodity_num = "Unknown"
-        if len(nearby_commodities) > 0:
-            commodity_num = str(nearby_commodities.iloc[0]['Commodity Number']).strip()
+        commodity_num = commodity_by_desc.get(desc) or "Unknown"
         
         print(f"{commodity_num}: {desc}")
 
-# =========================
-# Main Processing
-# =========================
+def add_indent_levels(data: pd.DataFrame, indent_tolerance: float = INDENT_TOLERANCE) -> pd.DataFrame:
+    """
+    The cleaned words table with an 'Indent Level' column for the later
+    stages: the level process_commodity_descriptions_by_pixels() gives the
+    description line each word belongs to once split lines are combined.
+    Missing for words without a description or position.
+    """
+    described = has_description(data)
+    description_data = data[described].reset_index(drop=True)
+    continues = continuation_lines(description_data)
+    line_levels = indent_levels(description_data['TopLeft_X'][~continues], indent_tolerance)
+    word_levels = line_levels[np.cumsum(~continues) - 1]
+    levels = pd.Series(pd.NA, index=data.index, dtype='Int64')
+    levels[described.to_numpy()] = pd.array(np.where(word_levels >= 0, word_levels, None), dtype='Int64')
+    return data.assign(**{'Indent Level': levels})
 
-def main():
-    # Load data
-    data = pd.read_csv(INPUT_CSV)
-    logging.info(f"Loaded {len(data)} rows from {INPUT_CSV}")
-    
+def build_hierarchy(data: pd.DataFrame) -> pd.DataFrame:
+    """Hierarchical descriptions from the description words of the cleaned words table."""
     # Filter only rows with descriptions (ignore empty/nan descriptions)
-    description_data = data[data['Commodity Description'].notna() & (data['Commodity Description'] != '')].copy()
+    description_data = data[has_description(data)].copy()
     logging.info(f"Found {len(description_data)} rows with descriptions")
 
     # Combine split lines
@@ -351,12 +337,30 @@ def main():
     # Build hierarchy - this updates the Description column directly
     hierarchical_data = process_commodity_descriptions_by_pixels(combined_data)
     logging.info(f"After hierarchy processing: {len(hierarchical_data)} rows")
+    return hierarchical_data
+
+# =========================
+# Main Processing
+# =========================
+
+def main():
+    # Load data
+    data = read_table(INPUT_CSV)
+    logging.info(f"Loaded {len(data)} rows from {INPUT_CSV}")
+    
+    hierarchical_data = build_hierarchy(data)
+
+    # Indentation levels for the later stages, saved with the cleaned words
+    data = add_indent_levels(data)
+    write_table(data, INPUT_CSV, CLEANED_WORDS_DTYPES)
+    logging.info(f"Saved indentation levels to {INPUT_CSV}")
+    word_index = WordIndex(data)
 
     # Save outputs - now updates the final table with new column headers
-    save_outputs(hierarchical_data, FINAL_TABLE_CSV, OUTPUT_TXT)
+    save_outputs(hierarchical_data, FINAL_TABLE_CSV, OUTPUT_TXT, original_data=data, word_index=word_index)
 
     # Print sample
-    print_sample(hierarchical_data)
+    print_sample(hierarchical_data, original_data=data, word_index=word_index)
     
     print(f"\nFinal table with hierarchical descriptions updated in: {FINAL_TABLE_CSV}")
     print("The 'COMMODITY DESCRIPTION AND ECONOMIC CLASS' column has been populated.")
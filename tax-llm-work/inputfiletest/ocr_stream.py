@@ -0,0 +1,136 @@
+"""
+Three-stage streaming pipeline for page OCR.
+
+Pages flow through bounded queues: a render thread rasterizes pages with PyMuPDF,
+the calling thread runs OCR, and a writer thread consumes the results. Rendering
+of the next pages overlaps with inference on the current one, while the queue
+depths bound how many rendered pages (~25 MB each at 300 DPI) are held in memory.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+_DONE = object()
+
+
+class StageStats:
+    """Busy time and item count for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def record(self, item, seconds: float) -> None:
+        self.items += len(item) if isinstance(item, (list, tuple)) else 1
+        self.busy_seconds += seconds
+
+    def log(self, wall_seconds: float) -> None:
+        rate = self.items / self.busy_seconds if self.busy_seconds > 0 else float('inf')
+        utilization = self.busy_seconds / wall_seconds * 100 if wall_seconds > 0 else 0.0
+        logging.info(f"  {self.name}: {self.items} pages, {self.busy_seconds:.2f}s busy, "
+                     f"{rate:.2f} pages/s, {utilization:.0f}% of wall time")
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Block until item is queued or the pipeline is stopping. Returns False when stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_page_pipeline(pages: Iterable[int],
+                      render: Callable[[int], Any],
+                      recognize: Callable[[Any], Any],
+                      write: Callable[[int, Any], None],
+                      render_queue_depth: int = 2,
+                      write_queue_depth: int = 4) -> None:
+    """
+    Run render -> recognize -> write over pages with bounded queues between stages.
+
+    render(page) runs on a background thread, recognize(image) on the calling
+    thread, and write(page, result) on a second background thread. Pages are
+    written in the order they are given. An item may also be a batch (a list of
+    pages), in which case throughput is still reported per page. An exception in
+    any stage stops the pipeline and is re-raised here.
+    """
+    render_queue = queue.Queue(maxsize=max(1, render_queue_depth))
+    write_queue = queue.Queue(maxsize=max(1, write_queue_depth))
+    stop = threading.Event()
+    errors = []
+    stats = {name: StageStats(name) for name in ('render', 'ocr', 'write')}
+
+    def render_stage():
+        try:
+            for page in pages:
+                started = time.perf_counter()
+                image = render(page)
+                stats['render'].record(page, time.perf_counter() - started)
+                if not _put(render_queue, (page, image), stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(render_queue, _DONE, stop)
+
+    def write_stage():
+        try:
+            while not stop.is_set():
+                try:
+                    item = write_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    return
+                page, result = item
+                started = time.perf_counter()
+                write(page, result)
+                stats['write'].record(page, time.perf_counter() - started)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    wall_started = time.perf_counter()
+    renderer = threading.Thread(target=render_stage, name='ocr-render', daemon=True)
+    writer = threading.Thread(target=write_stage, name='ocr-write', daemon=True)
+    renderer.start()
+    writer.start()
+
+    try:
+        while not stop.is_set():
+            try:
+                item = render_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            page, image = item
+            started = time.perf_counter()
+            result = recognize(image)
+            del image  # release the rendered page before waiting on the writer
+            stats['ocr'].record(page, time.perf_counter() - started)
+            if not _put(write_queue, (page, result), stop):
+                break
+    except Exception:
+        stop.set()
+        raise
+    finally:
+        _put(write_queue, _DONE, stop)
+        renderer.join()
+        writer.join()
+
+    if errors:
+        raise errors[0]
+
+    wall_seconds = time.perf_counter() - wall_started
+    logging.info(f"Streaming OCR pipeline finished in {wall_seconds:.2f}s "
+                 f"(render queue depth {render_queue_depth}, write queue depth {write_queue_depth}):")
+    for stage in stats.values():
+        stage.log(wall_seconds)
@@ -0,0 +1,147 @@
+"""
+Page rasterization helpers for the OCR extractor.
+
+PyMuPDF renders a page into a Pixmap whose sample buffer is already a packed
+HxWx3 uint8 image. These helpers expose that buffer to numpy without the two
+extra copies made by pix.samples -> PIL.Image -> np.array.
+
+Adaptive rendering first probes each page at a low DPI to find blank pages and
+the bounds of the inked area, then renders only that region at full resolution.
+The clipped pixmap's (x, y) origin places it in the full-page pixel frame.
+"""
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+DEFAULT_DPI = 300
+PROBE_DPI = 50
+INK_LEVEL = 160  # Gray values below this count as ink in the probe render
+MIN_INK_FRACTION = 0.0005  # Pages with less ink than this are treated as blank
+MIN_LINE_INK_FRACTION = 0.002  # Probe rows/columns with less ink are scan noise
+REGION_MARGIN_PT = 12  # Padding around the detected region, in PDF points
+
+
+class _PixmapSamples:
+    """
+    A pixmap's sample buffer in numpy's array interface. Arrays made from it
+    have it as their base, so they keep the pixmap (and its buffer) alive;
+    pix.samples_mv does not hold a reference to the pixmap.
+    """
+
+    def __init__(self, pix):
+        self.pix = pix
+        self.__array_interface__ = {
+            'shape': (pix.height, pix.width, pix.n),
+            'typestr': '|u1',
+            'data': (pix.samples_ptr, False),
+            'strides': (pix.stride, pix.n, 1),
+            'version': 3,
+        }
+
+
+def pixmap_to_ndarray(pix, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Return the pixmap samples as an (height, width, n) uint8 array.
+
+    Without `out` the array is a zero-copy view of the pixmap's buffer; the view
+    holds a reference to `pix`, so it stays valid after the caller drops the
+    pixmap. With `out` (same shape, uint8) the samples are copied once into it
+    and `out` is returned.
+    """
+    view = np.asarray(_PixmapSamples(pix))
+    if out is None:
+        return view
+    np.copyto(out, view)
+    return out
+
+
+class PageBufferPool:
+    """
+    Ring of pre-allocated page buffers, reused while page dimensions match.
+
+    A buffer handed out by acquire() is reused `capacity` acquisitions later, so
+    capacity must cover every rendered page that can be alive at once (e.g. the
+    render queue depth plus the page in OCR plus the page being rendered).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._buffers: "OrderedDict[Tuple[int, ...], deque]" = OrderedDict()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        ring = self._buffers.setdefault(shape, deque())
+        self._buffers.move_to_end(shape)
+        # Forget rings for shapes not seen recently (e.g. adaptive page regions) so
+        # the pool does not grow without bound; buffers still in use stay alive.
+        while len(self._buffers) > self.capacity:
+            self._buffers.popitem(last=False)
+        if len(ring) < self.capacity:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self.allocations += 1
+        else:
+            buffer = ring.popleft()
+            self.reuses += 1
+        ring.append(buffer)
+        return buffer
+
+
+def find_content_region(page, probe_dpi: int = PROBE_DPI) -> Optional[fitz.Rect]:
+    """
+    Probe a page at low DPI and return the rectangle (in PDF points) holding its
+    ink, padded by REGION_MARGIN_PT, or None when the page is effectively blank.
+    Rows and columns with only a few specks of ink are ignored as scan noise.
+    """
+    pix = page.get_pixmap(dpi=probe_dpi, colorspace=fitz.csGRAY)
+    ink = pixmap_to_ndarray(pix)[:, :, 0] < INK_LEVEL
+    if ink.mean() < MIN_INK_FRACTION:
+        return None
+
+    rows = np.flatnonzero(ink.mean(axis=1) >= MIN_LINE_INK_FRACTION)
+    cols = np.flatnonzero(ink.mean(axis=0) >= MIN_LINE_INK_FRACTION)
+    if len(rows) == 0 or len(cols) == 0:
+        return None
+
+    scale = 72 / probe_dpi
+    region = fitz.Rect(cols[0] * scale - REGION_MARGIN_PT, rows[0] * scale - REGION_MARGIN_PT,
+                       (cols[-1] + 1) * scale + REGION_MARGIN_PT, (rows[-1] + 1) * scale + REGION_MARGIN_PT)
+    return region & page.rect
+
+
+def render_page_pixmap(page, dpi: int = DEFAULT_DPI, adaptive: bool = False, probe_dpi: int = PROBE_DPI):
+    """
+    Render a page for OCR. With adaptive=True, blank pages return None and other
+    pages are rendered only over their content region; pix.x / pix.y then give
+    the region's offset in the full-page pixel frame at `dpi` (0, 0 otherwise).
+    """
+    if not adaptive:
+        return page.get_pixmap(dpi=dpi)
+    region = find_content_region(page, probe_dpi)
+    if region is None:
+        return None
+    return page.get_pixmap(dpi=dpi, clip=region)
+
+
+def render_page_image(page, dpi: int = DEFAULT_DPI, buffers: Optional[PageBufferPool] = None,
+                      adaptive: bool = False) -> Tuple[Optional[np.ndarray], Tuple[int, int]]:
+    """
+    Rasterize a PDF page into an RGB numpy array for PaddleOCR.
+
+    The samples are copied once, into a reused buffer from `buffers` when given,
+    so the image no longer depends on the pixmap. Returns (image, origin), where
+    origin is the image's offset in the full-page pixel frame (see
+    render_page_pixmap); image is None for pages adaptive rendering finds blank.
+    Callers that can keep the pixmap around can use pixmap_to_ndarray(pix)
+    directly and skip the copy entirely.
+    """
+    pix = render_page_pixmap(page, dpi, adaptive)
+    if pix is None:
+        return None, (0, 0)
+    if buffers is not None:
+        image = pixmap_to_ndarray(pix, out=buffers.acquire((pix.height, pix.width, pix.n)))
+    else:
+        image = pixmap_to_ndarray(pix).copy()
+    return image, (pix.x, pix.y)
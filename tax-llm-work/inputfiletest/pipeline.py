@@ -6,18 +6,27 @@ This script integrates multiple stages of tax-related data processing into a sin
 
 Main Stages
 -----------
-1. Extract OCR data (via 01_get_ocr_data.py).
-2. Perform enhanced cleaning of OCR data (via 01b_enhanced_cleaning.py).
-3. Process commodity numbers (via 02_commodity_number.py).
-4. Process hierarchical descriptions (via 03_hierarchical_description.py).
-5. Process units of quantity (via 04_unit_of_quantity.py).
-6. Process rates of duty (via 05_rate_of_duty.py).
-7. Process tariff paragraphs (via 06_tarrif_para.py).
+1. Extract OCR data (via get_ocr_data.py).
+2. Perform enhanced cleaning of OCR data (via enhanced_clean.py).
+3. Process commodity numbers (via commodity_number02.py).
+4. Process hierarchical descriptions (via hierarchical_description03.py).
+5. Process units of quantity (via unit_of_quantity04.py).
+6. Process rates of duty (via rate_of_duty05.py).
+7. Process tariff paragraphs (via tarrif_para06.py).
+
+All stages run in this process. The cleaned words table and the final table
+are kept in a PipelineContext and handed from stage to stage, instead of
+every stage re-reading and rewriting them, and stages 03-05 share one
+positional index over the words (word_index.WordIndex). The tables are
+written to the stage output paths at the end of the run (and after any
+--checkpoint stage). The OCR stage still writes its word table to disk,
+which the cleaning stage reads. Skipped stages are covered by the tables
+already on disk. The wall time of every stage is reported at the end.
 
 Usage
 -----
 Run the script directly:
-    python tax_llm_pipeline.py
+    python pipeline.py [--skip-ocr] [--checkpoint rates]
 
 Prerequisites
 -------------
@@ -26,56 +35,198 @@ Ensure all the required modules are available and the individual scripts are fun
 
 from __future__ import annotations
 
-import os
-from get_ocr_data import main as extract_ocr_data
-from enhanced_clean import main as enhanced_cleaning
-from commodity_number02 import main as process_commodity_numbers
-from hierarchical_description03 import main as process_hierarchical_descriptions
-from unit_of_quantity04 import main as process_units
-from rate_of_duty05 import main as process_rates
-from tarrif_para06 import main as process_tariff_paragraphs
 import argparse
 import logging
-
-def parse_arguments():
-    parser = argparse.ArgumentParser(description="Run the Tax LLM Data Processing Pipeline.")
-    parser.add_argument("--input-dir", default="data/input", help="Directory for input files.")
-    parser.add_argument("--output-dir", default="data/output", help="Directory for output files.")
-    parser.add_argument("--skip-cleaning", action="store_true", help="Skip the cleaning stage.")
-    parser.add_argument("--skip-commodity", action="store_true", help="Skip the commodity processing stage.")
-    parser.add_argument("--skip-hierarchy", action="store_true", help="Skip the hierarchical description stage.")
-    parser.add_argument("--skip-units", action="store_true", help="Skip the units of quantity stage.")
-    parser.add_argument("--skip-rates", action="store_true", help="Skip the rates of duty stage.")
-    parser.add_argument("--skip-tariff", action="store_true", help="Skip the tariff paragraphs stage.")
-    return parser.parse_args()
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+import commodity_number02
+import enhanced_clean
+import get_ocr_data
+import hierarchical_description03
+import rate_of_duty05
+import tarrif_para06
+import unit_of_quantity04
+from table_schema import (CLEANED_WORDS_DTYPES, FINAL_TABLE_DTYPES, as_read_back, output_format, read_table,
+                          write_table)
+from word_index import WordIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def main():
-    print("Step 1: Extracting OCR data...")
-    extract_ocr_data()
 
-    print("Step 2: Enhanced cleaning of OCR data...")
-    enhanced_cleaning()
+@dataclass
+class PipelineContext:
+    """
+    The tables handed from stage to stage, in the shape read_table() gives.
+    A table a stage needs but no earlier stage in the run produced is read
+    from its stage output path.
+    """
+    words: Optional[pd.DataFrame] = None  # cleaned_classified_words
+    final_table: Optional[pd.DataFrame] = None  # final-table, one row per commodity number
+    descriptions: Optional[pd.Series] = None  # description per commodity key (stage 03)
+    index: Optional[WordIndex] = None  # positional index over words, built on first use
+    produced: List[str] = field(default_factory=list)  # tables changed in this run and not yet saved
+    timings: Dict[str, float] = field(default_factory=dict)  # stage name -> wall seconds
+
+    def cleaned_words(self) -> pd.DataFrame:
+        if self.words is None:
+            self.words = read_table(enhanced_clean.OUTPUT_CSV)
+        return self.words
 
-    print("Step 3: Processing commodity numbers...")
-    process_commodity_numbers()
+    def word_index(self) -> WordIndex:
+        if self.index is None:
+            self.index = WordIndex(self.cleaned_words())
+        return self.index
+
+    def final(self) -> pd.DataFrame:
+        if self.final_table is None:
+            self.final_table = read_table(commodity_number02.OUTPUT_CSV)
+        return self.final_table
+
+    def set_words(self, words: pd.DataFrame):
+        self.words = as_read_back(words, CLEANED_WORDS_DTYPES)
+        self.index = None
+        self._mark('words')
+
+    def set_final(self, final_table: pd.DataFrame):
+        self.final_table = as_read_back(final_table, FINAL_TABLE_DTYPES)
+        self._mark('final_table')
+
+    def set_descriptions(self, descriptions: pd.Series):
+        self.descriptions = descriptions
+        self._mark('descriptions')
+
+    def _mark(self, table: str):
+        if table not in self.produced:
+            self.produced.append(table)
+
+
+# =========================
+# Stages
+# =========================
+
+def run_ocr(context: PipelineContext):
+    get_ocr_data.main()
+
+
+def run_cleaning(context: PipelineContext):
+    df = enhanced_clean.load_and_preprocess(enhanced_clean.INPUT_CSV)
+    context.set_words(enhanced_clean.classify_words(df))
+    enhanced_clean.log_summary(context.words)
+
+
+def run_commodity_numbers(context: PipelineContext):
+    commodity_numbers = commodity_number02.extract_commodity_numbers(context.cleaned_words())
+    context.set_final(commodity_number02.new_final_table(commodity_numbers))
+
+
+def run_hierarchy(context: PipelineContext):
+    context.set_words(hierarchical_description03.add_indent_levels(context.cleaned_words()))
+    words = context.cleaned_words()
+    hierarchical_data = hierarchical_description03.build_hierarchy(words)
+    final_table, descriptions = hierarchical_description03.add_descriptions(
+        hierarchical_data, context.final(), words, context.word_index())
+    context.set_final(final_table)
+    context.set_descriptions(descriptions)
+    hierarchical_description03.print_sample(hierarchical_data, original_data=words, word_index=context.word_index())
+
+
+def run_units(context: PipelineContext):
+    context.set_final(unit_of_quantity04.assign_units(context.cleaned_words(), context.final(), context.word_index()))
+
+
+def run_rates(context: PipelineContext):
+    context.set_final(rate_of_duty05.assign_rates(context.cleaned_words(), context.final(), context.word_index()))
+
+
+def run_tariff_paragraphs(context: PipelineContext):
+    words = context.cleaned_words()
+    commodity_to_tariff = tarrif_para06.extract_tariff_ranges(words)
+    context.set_final(tarrif_para06.add_tariff_paragraphs(context.final(), commodity_to_tariff, words))
+
+
+STAGES: Dict[str, Callable[[PipelineContext], None]] = {
+    'ocr': run_ocr,
+    'cleaning': run_cleaning,
+    'commodity': run_commodity_numbers,
+    'hierarchy': run_hierarchy,
+    'units': run_units,
+    'rates': run_rates,
+    'tariff': run_tariff_paragraphs,
+}
+
+
+def save_tables(context: PipelineContext):
+    """Write the tables changed since the last save to the stage output paths."""
+    if 'words' in context.produced:
+        write_table(context.words, enhanced_clean.OUTPUT_CSV, CLEANED_WORDS_DTYPES)
+        logger.info(f"Saved cleaned words to {enhanced_clean.OUTPUT_CSV}")
+    if 'final_table' in context.produced:
+        write_table(context.final_table, commodity_number02.OUTPUT_CSV, FINAL_TABLE_DTYPES)
+        logger.info(f"Saved final table to {commodity_number02.OUTPUT_CSV}")
+        if output_format(commodity_number02.OUTPUT_CSV) != 'csv':
+            context.final_table.to_csv(tarrif_para06.FINAL_EXPORT_CSV, index=False)
+            logger.info(f"Final table exported to {tarrif_para06.FINAL_EXPORT_CSV}")
+    if 'descriptions' in context.produced:
+        hierarchical_description03.write_descriptions(context.descriptions, hierarchical_description03.OUTPUT_TXT)
+        logger.info(f"Saved descriptions to {hierarchical_description03.OUTPUT_TXT}")
+    context.produced.clear()
+
+
+def run_pipeline(skip=(), checkpoints=(), context: Optional[PipelineContext] = None) -> PipelineContext:
+    """
+    Run the stages in order, except those in skip, passing one context along.
+    Tables are saved after each stage in checkpoints and at the end.
+    """
+    context = context or PipelineContext()
+    for step, (name, stage) in enumerate(STAGES.items(), 1):
+        if name in skip:
+            logger.info(f"Step {step}: skipping {name}")
+            continue
+        print(f"Step {step}: {name}...")
+        started = time.perf_counter()
+        stage(context)
+        context.timings[name] = time.perf_counter() - started
+        if name in checkpoints:
+            save_tables(context)
 
-    print("Step 4: Processing hierarchical descriptions...")
-    process_hierarchical_descriptions()
+    started = time.perf_counter()
+    save_tables(context)
+    context.timings['save'] = time.perf_counter() - started
+    log_timings(context.timings)
+    return context
 
-    print("Step 5: Processing units of quantity...")
-    process_units()
 
-    print("Step 6: Processing rates of duty...")
-    process_rates()
+def log_timings(timings: Dict[str, float]):
+    logger.info("Stage wall times:")
+    for name, seconds in timings.items():
+        logger.info(f"  {name:<10} {seconds:8.3f} s")
+    logger.info(f"  {'total':<10} {sum(timings.values()):8.3f} s")
+
 
-    print("Step 7: Processing tariff paragraphs...")
-    process_tariff_paragraphs()
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run the Tax LLM Data Processing Pipeline.")
+    parser.add_argument("--skip-ocr", action="store_true", help="Skip OCR extraction and use the OCR words on disk.")
+    parser.add_argument("--skip-cleaning", action="store_true", help="Skip the cleaning stage.")
+    parser.add_argument("--skip-commodity", action="store_true", help="Skip the commodity processing stage.")
+    parser.add_argument("--skip-hierarchy", action="store_true", help="Skip the hierarchical description stage.")
+    parser.add_argument("--skip-units", action="store_true", help="Skip the units of quantity stage.")
+    parser.add_argument("--skip-rates", action="store_true", help="Skip the rates of duty stage.")
+    parser.add_argument("--skip-tariff", action="store_true", help="Skip the tariff paragraphs stage.")
+    parser.add_argument("--checkpoint", action="append", default=[], choices=list(STAGES),
+                        help="Save the tables to disk after this stage (repeatable).")
+    return parser.parse_args()
 
+def main():
+    args = parse_arguments()
+    skip = [name for name in STAGES if getattr(args, f"skip_{name}")]
+    run_pipeline(skip=skip, checkpoints=args.checkpoint)
     print("Pipeline execution completed successfully!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,28 +1,32 @@
 import pandas as pd
-import re
+from commodity import parse_commodity_numbers
+from corrections import CorrectionTable
+from patterns import DOLLAR_EACH, RATE, RATE_PATTERNS
+from table_schema import FINAL_TABLE_DTYPES, read_table, write_table
+from word_index import WordIndex
 
-# Updated to work with CSV files and new 6-column structure
-CLEAN_CSV = r'new-work/output/cleaned_classified_words.csv'
-FINAL_CSV = r'new-work/output/final-table.csv'
+# Parquet tables with the new 6-column structure (CSV paths also work)
+CLEAN_CSV = r'new-work/output/cleaned_classified_words.parquet'
+FINAL_CSV = r'new-work/output/final-table.parquet'
 
-# Enhanced rate patterns to capture various formats including OCR artifacts
-rate_patterns = [
-    r'(\d+\.?\d*%)',           # Percentage rates (12%, 15%, etc.)
-    r'(\d+½%)',                # Half percentages (12½%)
-    r'(\d+%%\d*)',             # OCR artifacts like "12%%1"
-    r'(Free\.?)',              # Free rates
-    r'(\$\d+\.?\d*)',          # Dollar amounts
-    r'(\d+\.\d+%)',            # Decimal percentages
-    # OCR artifacts from page 28 data
-    r'(2y21b)',                # OCR artifact for "2½¢ lb"
-    r'(31b)',                  # OCR artifact for "3¢ lb"
-    r'(1½)',                   # Half cent rates
-    r'(\d+¢)',                 # Cent rates
-    r'(\d+t)',                 # OCR "t" for "¢"
-    r'(\d+plb)',               # OCR "plb" patterns
-    r'(\d+each)',              # "each" rates
-    r'(\$\d+\s+each)',         # Dollar each rates
-]
+# Rate patterns for various formats including OCR artifacts, tried in order
+rate_patterns = RATE_PATTERNS
+
+# OCR artifacts in rate text and their corrections
+ocr_corrections = {
+    '2y21b': '2½¢ lb',
+    '31b': '3¢ lb',
+    '1ye': '1½¢',
+    '8plb': '8¢ lb',
+    '2t': '2¢',
+    '3t': '3¢',
+    '4each': '4¢ each',
+    '10lb': '10¢ lb',
+    '6lb': '6¢ lb',
+    '5lb': '5¢ lb',
+    '7lb': '7¢ lb',
+}
+rate_corrections = CorrectionTable(ocr_corrections)
 
 def classify_rate_by_context(rate_text, context_text=""):
     """Classify rate as 1930 or trade agreement based on context."""
@@ -53,44 +57,72 @@ def extract_rates_from_text(text):
     text_str = str(text).strip()
     
     # Handle OCR artifacts first
-    ocr_corrections = {
-        '2y21b': '2½¢ lb',
-        '31b': '3¢ lb',
-        '1ye': '1½¢',
-        '8plb': '8¢ lb',
-        '2t': '2¢',
-        '3t': '3¢',
-        '4each': '4¢ each',
-        '10lb': '10¢ lb',
-        '6lb': '6¢ lb',
-        '5lb': '5¢ lb',
-        '7lb': '7¢ lb',
-    }
-    
-    # Apply corrections
-    for artifact, correction in ocr_corrections.items():
-        if artifact in text_str:
-            text_str = text_str.replace(artifact, correction)
+    text_str = rate_corrections.apply(text_str)
     
-    # Try each pattern
-    for pattern in rate_patterns:
-        match = re.search(pattern, text_str, re.IGNORECASE)
-        if match:
-            return match.group(0)
+    # First pattern that matches, in rate_patterns order
+    match = RATE.search(text_str)
+    if match:
+        return match.group(0)
     
     # Check for dollar amounts with "each"
-    dollar_each_match = re.search(r'\$(\d+\.?\d*)\s*each', text_str, re.IGNORECASE)
+    dollar_each_match = DOLLAR_EACH.search(text_str)
     if dollar_each_match:
         return f"${dollar_each_match.group(1)} each"
     
     return ''
 
+def add_standalone_rates(df_clean, commodity_rates_1930, commodity_rates_trade, word_index=None):
+    """
+    Associate rate words without a commodity number with the nearest commodity
+    number on the same page (within 50 pixels in Y), adding them to the rate maps
+    (keyed by commodity key). word_index is a WordIndex over df_clean; it is built
+    when not given.
+    """
+    if word_index is None:
+        word_index = WordIndex(df_clean)
+    has_commodity = df_clean['Commodity Number'].notna() & (df_clean['Commodity Number'].astype(str).str.strip() != '')
+    standalone = df_clean[~has_commodity]  # rows with a commodity number were processed in groups
+    standalone_rates = standalone['Commodity Description'].map(lambda word: extract_rates_from_text(str(word).strip()))
+    is_rate = standalone_rates != ''
+    rate_rows = standalone[is_rate]
+    
+    # Nearest commodity number for all rate words at once
+    nearest_commodities = parse_commodity_numbers(
+        word_index.subset(has_commodity).nearest_values(rate_rows, 'Commodity Number', 50))
+    
+    for x_pos, rate, nearest_commodity in zip(rate_rows['TopLeft_X'], standalone_rates[is_rate], nearest_commodities):
+        if pd.notna(nearest_commodity):
+            # Classify rate based on X position
+            if 1350 <= x_pos <= 1700:
+                if nearest_commodity not in commodity_rates_1930:
+                    commodity_rates_1930[nearest_commodity] = rate
+                else:
+                    commodity_rates_1930[nearest_commodity] += f" {rate}"
+            elif 1700 <= x_pos <= 2150:
+                if nearest_commodity not in commodity_rates_trade:
+                    commodity_rates_trade[nearest_commodity] = rate
+                else:
+                    commodity_rates_trade[nearest_commodity] += f" {rate}"
+
 def add_rates():
     """Add rate information to final table with new 6-column structure."""
-    # Load data from CSV files
-    df_clean = pd.read_csv(CLEAN_CSV)
-    df_final = pd.read_csv(FINAL_CSV)
+    # Load data from the stage tables
+    df_final = assign_rates(read_table(CLEAN_CSV), read_table(FINAL_CSV))
     
+    # Save updated data
+    write_table(df_final, FINAL_CSV, FINAL_TABLE_DTYPES)
+    print(f"Updated rates in {FINAL_CSV}")
+
+def assign_rates(df_clean, df_final, word_index=None):
+    """
+    Fill the rate of duty columns of the final table from the cleaned words
+    table and return the final table, in the 6-column structure. word_index
+    is a WordIndex over df_clean; it is built when not given.
+
+    Words are grouped into text rows page by page, so rates are only taken
+    from the commodity's own page. Without a Page column all words form one
+    page, as rows did before they were grouped per page.
+    """
     # Ensure all expected columns exist
     expected_columns = [
         'SCHEDULE A COMMODITY NUMBER',
@@ -113,40 +145,25 @@ def add_rates():
     # Group data by Y-coordinate proximity to reconstruct logical rows
     tolerance = 30  # Y-coordinate tolerance for grouping
     
-    # Sort by Y coordinate
-    df_sorted = df_clean.sort_values(['TopLeft_Y', 'TopLeft_X']).reset_index(drop=True)
-    
-    # Group rows by Y proximity
-    current_y_group = []
-    current_y = None
-    y_groups = []
-    
-    for _, row in df_sorted.iterrows():
-        y_coord = row['TopLeft_Y']
-        
-        if current_y is None or abs(y_coord - current_y) <= tolerance:
-            current_y_group.append(row)
-            if current_y is None:
-                current_y = y_coord
-        else:
-            if current_y_group:
-                y_groups.append(current_y_group)
-            current_y_group = [row]
-            current_y = y_coord
+    if word_index is None:
+        word_index = WordIndex(df_clean)
     
-    if current_y_group:
-        y_groups.append(current_y_group)
+    # Group rows by Y proximity on each page: a group holds the rows within tolerance of its first row
+    row_ids = word_index.row_ids(tolerance, mode='anchor')
+    commodity_keys = parse_commodity_numbers(df_clean['Commodity Number'])
+    df_sorted = df_clean.assign(Row_Id=row_ids, Commodity_Key=commodity_keys).sort_values(['TopLeft_Y', 'TopLeft_X'])
+    y_groups = [[row for _, row in group.iterrows()] for _, group in df_sorted.groupby('Row_Id', sort=True)]
     
     # Process each Y-group to extract rates and associate with commodities
     for group in y_groups:
         # Find commodity number in this group
         commodity_num = None
         for row in group:
-            if pd.notna(row['Commodity Number']) and str(row['Commodity Number']).strip():
-                commodity_num = str(row['Commodity Number']).strip()
+            if pd.notna(row['Commodity_Key']):
+                commodity_num = row['Commodity_Key']
                 break
         
-        if not commodity_num:
+        if commodity_num is None:
             continue
             
         # Extract rates from this group based on X coordinates
@@ -203,97 +220,27 @@ def add_rates():
             commodity_rates_trade[commodity_num] = ' '.join(group_trade_rates)
     
     # Also check for standalone rate information and try to associate with nearest commodity
-    for _, row in df_clean.iterrows():
-        word = str(row.get('Commodity Description', '')).strip()
-        x_pos = row['TopLeft_X']
-        y_pos = row['TopLeft_Y']
-        
-        # Skip if already processed in groups
-        if pd.notna(row['Commodity Number']) and str(row['Commodity Number']).strip():
-            continue
-            
-        rate = extract_rates_from_text(word)
-        if not rate:
-            continue
-        
-        # Find nearest commodity number (within reasonable Y distance)
-        nearest_commodity = None
-        min_distance = float('inf')
-        
-        for _, commodity_row in df_clean.iterrows():
-            if pd.notna(commodity_row['Commodity Number']) and str(commodity_row['Commodity Number']).strip():
-                commodity_y = commodity_row['TopLeft_Y']
-                distance = abs(y_pos - commodity_y)
-                if distance < min_distance and distance <= 50:  # Within 50 pixels
-                    min_distance = distance
-                    nearest_commodity = str(commodity_row['Commodity Number']).strip()
-        
-        if nearest_commodity:
-            # Classify rate based on X position
-            if 1350 <= x_pos <= 1700:
-                if nearest_commodity not in commodity_rates_1930:
-                    commodity_rates_1930[nearest_commodity] = rate
-                else:
-                    commodity_rates_1930[nearest_commodity] += f" {rate}"
-            elif 1700 <= x_pos <= 2150:
-                if nearest_commodity not in commodity_rates_trade:
-                    commodity_rates_trade[nearest_commodity] = rate
-                else:
-                    commodity_rates_trade[nearest_commodity] += f" {rate}"
-    
-    # Update final table with extracted rates
-    updated_1930 = 0
-    updated_trade = 0
-    
-    for idx, row in df_final.iterrows():
-        commodity_num_formatted = str(row['SCHEDULE A COMMODITY NUMBER']).strip()
-        
-        # Convert formatted number to match source data format (like we did in previous scripts)
-        clean_num = commodity_num_formatted.replace(' ', '')
-        if len(clean_num) == 7:
-            without_leading_zero = clean_num[1:]
-            without_trailing_zeros = without_leading_zero.rstrip('0')
-            
-            if len(without_trailing_zeros) == 2:
-                converted_num = without_trailing_zeros + '000'
-            elif len(without_trailing_zeros) == 3:
-                converted_num = without_trailing_zeros + '00'
-            elif len(without_trailing_zeros) == 4:
-                converted_num = without_trailing_zeros + '0'
-            else:
-                converted_num = without_trailing_zeros
-                
-            mapping_key = f"{converted_num}.0"
-        else:
-            mapping_key = clean_num
-        
-        # Try both formats for matching
-        for num_format in [commodity_num_formatted, clean_num, mapping_key]:
-            # Add 1930 rates
-            if num_format in commodity_rates_1930:
-                df_final.at[idx, 'RATE OF DUTY 1930'] = commodity_rates_1930[num_format]
-                updated_1930 += 1
-                break
-        
-        for num_format in [commodity_num_formatted, clean_num, mapping_key]:
-            # Add trade agreement rates  
-            if num_format in commodity_rates_trade:
-                df_final.at[idx, 'RATE OF DUTY TRADE AGREEMENT'] = commodity_rates_trade[num_format]
-                updated_trade += 1
-                break
+    add_standalone_rates(df_clean, commodity_rates_1930, commodity_rates_trade, word_index)
+    
+    # Update final table with extracted rates, joined on the commodity key
+    final_keys = parse_commodity_numbers(df_final['SCHEDULE A COMMODITY NUMBER'])
+    rates_1930 = final_keys.map(commodity_rates_1930)
+    rates_trade = final_keys.map(commodity_rates_trade)
+    for column, rates in [('RATE OF DUTY 1930', rates_1930), ('RATE OF DUTY TRADE AGREEMENT', rates_trade)]:
+        df_final[column] = df_final[column].astype(object)
+        df_final.loc[rates.notna(), column] = rates[rates.notna()]
+    updated_1930 = int(rates_1930.notna().sum())
+    updated_trade = int(rates_trade.notna().sum())
     
     # Reorder columns to match new structure
     df_final = df_final[expected_columns]
     
-    # Save updated data
-    df_final.to_csv(FINAL_CSV, index=False)
-    
-    print(f"Updated rates in {FINAL_CSV}")
     print(f"1930 rates updated: {updated_1930}")
     print(f"Trade agreement rates updated: {updated_trade}")
     print(f"Found 1930 rates: {list(set(commodity_rates_1930.values()))}")
     print(f"Found trade rates: {list(set(commodity_rates_trade.values()))}")
     print(f"File now uses new 6-column structure: {expected_columns}")
+    return df_final
 
 def main():
     """
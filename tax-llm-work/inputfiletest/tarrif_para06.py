@@ -1,60 +1,123 @@
+import numpy as np
 import pandas as pd
-import re
+from commodity import parse_commodity_numbers
+from patterns import SPACED_COMMODITY_NUMBER, THREE_DIGIT_TARIFF
+from table_schema import FINAL_TABLE_DTYPES, output_format, read_table, write_table
 
 # === Config ===
-OCR_CSV = r'new-work/output/cleaned_classified_words.csv'
-FINAL_CSV = r'new-work/output/final-table.csv'
+OCR_CSV = r'new-work/output/cleaned_classified_words.parquet'
+FINAL_CSV = r'new-work/output/final-table.parquet'
+FINAL_EXPORT_CSV = r'new-work/output/final-table.csv'  # CSV copy of the finished table
 
 # === Patterns ===
-commodity_pattern = re.compile(r'^\d{4}\s?\d{3}$')
-tariff_pattern = re.compile(r'^\d{3}$')
+commodity_pattern = SPACED_COMMODITY_NUMBER
+tariff_pattern = THREE_DIGIT_TARIFF
+
+
+def page_column(df):
+    """Page of each word; a table without a Page column is a single page."""
+    if 'Page' in df.columns:
+        return df['Page']
+    return pd.Series(0, index=df.index)
+
+
+def cell_text(values):
+    """str(value).strip() for each cell, '' for missing cells."""
+    text = values.astype(str).str.strip()
+    return text.where(values.notna() & (text != 'nan'), '')
+
+
+def tariff_ranges(df):
+    """
+    Y range covered by each tariff paragraph, page by page.
+
+    Commodity and tariff words are taken in Y order within their page. A
+    paragraph printed at mid_y starts at the first commodity below the
+    previous range and ends as far below mid_y as that commodity is above it.
+    Returns a DataFrame with Page, Start_Y, End_Y and Tariff Paragraph.
+    """
+    words = pd.DataFrame({
+        'Page': page_column(df),
+        'Y': df['TopLeft_Y'].astype(float),
+        'Tariff Paragraph': cell_text(df['Tariff Paragraph']),
+    }).dropna(subset=['Y'])
+    commodity_words = words[cell_text(df['Commodity Number']).reindex(words.index) != '']
+    commodity_y = {page: np.sort(group['Y'].to_numpy())
+                   for page, group in commodity_words.groupby('Page', sort=False)}
+    tariff_words = words[words['Tariff Paragraph'] != ''].sort_values(['Page', 'Y'], kind='stable')
 
-
-def extract_tariff_ranges(df):
-    """Identify commodity positions and map tariff paragraph ranges."""
-    # Use separated columns for commodity and tariff paragraph
-    commodity_rows = []
-    for idx, row in df.iterrows():
-        word = str(row['Commodity Number']).strip()
-        if word and word != 'nan':
-            commodity_rows.append((idx, row['TopLeft_Y']))
-
-    tariff_rows = []
-    for idx, row in df.iterrows():
-        para = str(row['Tariff Paragraph']).strip()
-        if para and para != 'nan':
-            tariff_rows.append((idx, row['TopLeft_Y'], para))
-
-    commodity_to_tariff = {}
-    commodity_idx = 0
-    last_endpoint = None
-
-    for t_idx, mid_y, para_no in tariff_rows:
+    ranges = []
+    current_page, cursor, last_endpoint = None, 0, None
+    for page, mid_y, para_no in tariff_words.itertuples(index=False):
+        if page != current_page:
+            current_page, cursor, last_endpoint = page, 0, None
+        page_y = commodity_y.get(page)
+        if page_y is None:
+            continue
         # Find the next commodity number after the last endpoint
         if last_endpoint is not None:
-            while commodity_idx < len(commodity_rows) and commodity_rows[commodity_idx][1] <= last_endpoint:
-                commodity_idx += 1
-        if commodity_idx >= len(commodity_rows):
-            break
-        start_idx, start_y = commodity_rows[commodity_idx]
-        diff = mid_y - start_y
-        end_y = mid_y + diff
-        # Assign para_no to all commodity numbers in this range
-        while commodity_idx < len(commodity_rows):
-            idx, y = commodity_rows[commodity_idx]
-            if start_y <= y <= end_y:
-                commodity_to_tariff[idx] = para_no
-                commodity_idx += 1
-            else:
-                break
+            cursor = max(cursor, int(np.searchsorted(page_y, last_endpoint, side='right')))
+        if cursor >= len(page_y):
+            continue
+        start_y = page_y[cursor]
+        end_y = mid_y + (mid_y - start_y)
+        ranges.append((page, start_y, end_y, para_no))
         last_endpoint = end_y
-    return commodity_to_tariff
-
+    return pd.DataFrame(ranges, columns=['Page', 'Start_Y', 'End_Y', 'Tariff Paragraph'])
+
+
+def assign_tariff_paragraphs(df, ranges=None):
+    """
+    Tariff paragraph of every commodity word in df: the paragraph whose range
+    on the same page contains the word's Y, or '' when none does.
+    """
+    if ranges is None:
+        ranges = tariff_ranges(df)
+    commodity = cell_text(df['Commodity Number']) != ''
+    commodity_words = pd.DataFrame({'Page': page_column(df), 'Y': df['TopLeft_Y'].astype(float)})[commodity]
+    paragraphs = np.full(len(commodity_words), '', dtype=object)
+
+    # A paragraph printed above its first commodity covers nothing
+    ranges = ranges[ranges['End_Y'] >= ranges['Start_Y']]
+    if len(ranges) and len(commodity_words):
+        # Lay the pages end to end along one axis so a single IntervalIndex covers the volume
+        page_codes, _ = pd.factorize(pd.concat([ranges['Page'], commodity_words['Page']], ignore_index=True))
+        low = min(ranges['Start_Y'].min(), commodity_words['Y'].min())
+        stride = max(ranges['End_Y'].max(), commodity_words['Y'].max()) - low + 1
+        offsets = page_codes * stride - low
+        # Each range starts below the end of the previous one, so the intervals do not overlap
+        intervals = pd.IntervalIndex.from_arrays(ranges['Start_Y'].to_numpy() + offsets[:len(ranges)],
+                                                 ranges['End_Y'].to_numpy() + offsets[:len(ranges)], closed='both')
+        found = intervals.get_indexer(commodity_words['Y'].to_numpy() + offsets[len(ranges):])
+        inside = found >= 0
+        paragraphs[inside] = ranges['Tariff Paragraph'].to_numpy()[found[inside]]
+    return pd.Series(paragraphs, index=commodity_words.index, dtype=object)
 
-def apply_tariff_to_final_table(commodity_to_tariff):
-    """Append tariff paragraph numbers to the final-table.csv under correct rows."""
-    final_df = pd.read_csv(FINAL_CSV)
 
+def extract_tariff_ranges(df):
+    """Identify commodity positions and map each commodity word (by index) to its tariff paragraph."""
+    paragraphs = assign_tariff_paragraphs(df)
+    return paragraphs[paragraphs != ''].to_dict()
+
+
+def apply_tariff_to_final_table(commodity_to_tariff, ocr_df=None):
+    """
+    Append tariff paragraph numbers to the final table under correct rows and
+    export the finished table as CSV. commodity_to_tariff comes from
+    extract_tariff_ranges(ocr_df); ocr_df is the cleaned words table and is
+    read from OCR_CSV when not given.
+    """
+    if ocr_df is None:
+        ocr_df = read_table(OCR_CSV)
+    final_df = add_tariff_paragraphs(read_table(FINAL_CSV), commodity_to_tariff, ocr_df)
+    save_final_table(final_df)
+
+
+def add_tariff_paragraphs(final_df, commodity_to_tariff, ocr_df):
+    """
+    Fill the tariff paragraph column of the final table from
+    extract_tariff_ranges(ocr_df) and return the table in the 6-column structure.
+    """
     # Ensure all expected columns exist with proper headers for new 6-column structure
     expected_columns = [
         'SCHEDULE A COMMODITY NUMBER',
@@ -70,81 +133,34 @@ def apply_tariff_to_final_table(commodity_to_tariff):
         if col not in final_df.columns:
             final_df[col] = ''
 
-    # Build a mapping of normalized commodity number to TopLeft_Y from clean CSV
-    ocr_df = pd.read_csv(OCR_CSV)
-    def normalize_commodity(num):
-        num = str(num).strip()
-        if num and num != 'nan':
-            # Handle decimal format like "10600.0" -> "0106 000"
-            if '.' in num:
-                base = num.split('.')[0]
-                if len(base) <= 5:
-                    # Pad with leading zero and format: "10600" -> "0106 000"
-                    padded = base.zfill(5)  # "01060"
-                    if len(padded) >= 4:
-                        return f"0{padded[:3]} {padded[3:].ljust(3, '0')}"
-            # If 7 digits, convert to 'XXXX XXX'
-            elif re.fullmatch(r'\d{7}', num):
-                return f"{num[:4]} {num[4:]}"
-            # If 6 digits, convert to 'XXXX XX'  
-            elif re.fullmatch(r'\d{6}', num):
-                return f"{num[:4]} {num[4:]}"
-            # If already spaced, return as is
-            return num
-        return ''
-    commodity_y_map = {}
-    for _, row in ocr_df.iterrows():
-        raw_num = str(row['Commodity Number']).strip()
-        norm_num = normalize_commodity(raw_num)
-        if norm_num:
-            commodity_y_map[norm_num] = row['TopLeft_Y']
-
-    # Build a list of ranges: (start_y, end_y, para_no)
-    ranges = []
-    commodity_rows = [(str(row['Commodity Number']).strip(), row['TopLeft_Y']) for _, row in ocr_df.iterrows() if str(row['Commodity Number']).strip() and str(row['Commodity Number']).strip() != 'nan']
-    tariff_rows = [(row['TopLeft_Y'], str(row['Tariff Paragraph']).strip()) for _, row in ocr_df.iterrows() if str(row['Tariff Paragraph']).strip() and str(row['Tariff Paragraph']).strip() != 'nan']
-    commodity_idx = 0
-    last_endpoint = None
-    for mid_y, para_no in tariff_rows:
-        # Find the next commodity number after the last endpoint
-        if last_endpoint is not None:
-            while commodity_idx < len(commodity_rows) and commodity_rows[commodity_idx][1] <= last_endpoint:
-                commodity_idx += 1
-        if commodity_idx >= len(commodity_rows):
-            break
-        _, start_y = commodity_rows[commodity_idx]
-        diff = mid_y - start_y
-        end_y = mid_y + diff
-        ranges.append((start_y, end_y, para_no))
-        last_endpoint = end_y
+    # Paragraph of each commodity key; the last word printed with a number wins
+    commodity = cell_text(ocr_df['Commodity Number']) != ''
+    keys = parse_commodity_numbers(ocr_df.loc[commodity, 'Commodity Number']).dropna()
+    paragraphs = pd.Series(commodity_to_tariff, dtype=object).reindex(keys.index).fillna('')
+    commodity_paragraphs = paragraphs.groupby(keys).last()
 
-    # For each row in final_df, assign tariff paragraph if its normalized commodity number's Y falls in a range
-    for i, row in final_df.iterrows():
-        num = str(row['SCHEDULE A COMMODITY NUMBER']).strip()
-        norm_num = normalize_commodity(num)
-        y = commodity_y_map.get(norm_num, None)
-        assigned = False
-        if y is not None:
-            for start_y, end_y, para_no in ranges:
-                if start_y <= y <= end_y:
-                    final_df.at[i, 'TARIFF PARAGRAPH'] = para_no
-                    assigned = True
-                    break
-        if not assigned:
-            final_df.at[i, 'TARIFF PARAGRAPH'] = ''
+    # Join the final table on the commodity key
+    final_keys = parse_commodity_numbers(final_df['SCHEDULE A COMMODITY NUMBER'])
+    final_df['TARIFF PARAGRAPH'] = final_keys.map(commodity_paragraphs).fillna('').astype(object)
 
     # Reorder columns to match new 6-column structure
-    final_df = final_df[expected_columns]
-    
-    final_df.to_csv(FINAL_CSV, index=False)
-    print(f"Updated 'TARIFF PARAGRAPH' column in {FINAL_CSV}")
     print(f"File now uses new 6-column structure: {expected_columns}")
+    return final_df[expected_columns]
+
+
+def save_final_table(final_df):
+    """Write the finished table to FINAL_CSV, with a CSV copy when that is not CSV."""
+    write_table(final_df, FINAL_CSV, FINAL_TABLE_DTYPES)
+    print(f"Updated 'TARIFF PARAGRAPH' column in {FINAL_CSV}")
+    if output_format(FINAL_CSV) != 'csv':
+        final_df.to_csv(FINAL_EXPORT_CSV, index=False)
+        print(f"Final table exported to {FINAL_EXPORT_CSV}")
 
 
 def main():
-    ocr_df = pd.read_csv(OCR_CSV)
+    ocr_df = read_table(OCR_CSV)
     commodity_to_tariff = extract_tariff_ranges(ocr_df)
-    apply_tariff_to_final_table(commodity_to_tariff)
+    apply_tariff_to_final_table(commodity_to_tariff, ocr_df=ocr_df)
 
 
 if __name__ == "__main__":
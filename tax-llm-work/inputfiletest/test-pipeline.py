@@ -6,12 +6,18 @@ This script orchestrates the end-to-end processing of tariff data by sequentiall
 all the modular Python scripts you provided. It verifies script existence, runs each step,
 logs progress and errors, and summarizes the pipeline run.
 
+By default the steps run in this process (pipeline.run_pipeline), sharing the cleaned
+words table and the final table in memory and reporting per-step wall time. With
+--subprocess every script is launched as its own Python process, as before; only that
+mode uses the *_SCRIPT paths.
+
 Environment variables can override default paths for input/output directories
 and script locations.
 
 Usage:
-    python pipeline.py [--skip-get-ocr-data] [--skip-enhanced-clean] [--skip-commodity-number]
-                   [--skip-hierarchical-description] [--skip-rate-of-duty] [--skip-tariff-paragraph]
+    python test-pipeline.py [--skip-get-ocr-data] [--skip-enhanced-clean] [--skip-commodity-number]
+                   [--skip-hierarchical-description] [--skip-unit-of-quantity] [--skip-rate-of-duty]
+                   [--skip-tariff-paragraph] [--subprocess]
 
 Environment Variables:
     TARIFF_BASE_DIR           Base directory for output files (default: 'tax-llm/output')
@@ -21,6 +27,7 @@ Environment Variables:
     ENHANCED_CLEAN_SCRIPT     Path to enhanced_clean.py script
     COMMODITY_NUMBER_SCRIPT   Path to commodity_number02.py script
     HIERARCHICAL_DESCRIPTION_SCRIPT Path to hierarchical_description03.py script
+    UNIT_OF_QUANTITY_SCRIPT   Path to unit_of_quantity04.py script
     RATE_OF_DUTY_SCRIPT       Path to rate_of_duty05.py script
     TARIFF_PARAGRAPH_SCRIPT   Path to tarrif_para06.py script
 """
@@ -44,10 +51,22 @@ SCRIPTS = {
     'enhanced_clean': os.getenv('ENHANCED_CLEAN_SCRIPT', 'enhanced_clean.py'),
     'commodity_number': os.getenv('COMMODITY_NUMBER_SCRIPT', 'commodity_number02.py'),
     'hierarchical_description': os.getenv('HIERARCHICAL_DESCRIPTION_SCRIPT', 'hierarchical_description03.py'),
+    'unit_of_quantity': os.getenv('UNIT_OF_QUANTITY_SCRIPT', 'unit_of_quantity04.py'),
     'rate_of_duty': os.getenv('RATE_OF_DUTY_SCRIPT', 'rate_of_duty05.py'),
     'tariff_paragraph': os.getenv('TARIFF_PARAGRAPH_SCRIPT', 'tarrif_para06.py'),
 }
 
+# Step name -> stage name in pipeline.STAGES
+IN_PROCESS_STAGES = {
+    'get_ocr_data': 'ocr',
+    'enhanced_clean': 'cleaning',
+    'commodity_number': 'commodity',
+    'hierarchical_description': 'hierarchy',
+    'unit_of_quantity': 'units',
+    'rate_of_duty': 'rates',
+    'tariff_paragraph': 'tariff',
+}
+
 def ensure_directories():
     """
     Ensure the base output directory and required input directories exist.
@@ -87,8 +106,10 @@ def main():
     parser.add_argument('--skip-enhanced-clean', action='store_true', help='Skip enhanced_clean.py step')
     parser.add_argument('--skip-commodity-number', action='store_true', help='Skip commodity_number02.py step')
     parser.add_argument('--skip-hierarchical-description', action='store_true', help='Skip hierarchical_description03.py step')
+    parser.add_argument('--skip-unit-of-quantity', action='store_true', help='Skip unit_of_quantity04.py step')
     parser.add_argument('--skip-rate-of-duty', action='store_true', help='Skip rate_of_duty05.py step')
     parser.add_argument('--skip-tariff-paragraph', action='store_true', help='Skip tarrif_para06.py step')
+    parser.add_argument('--subprocess', action='store_true', help='Run every step as a separate Python process')
     args = parser.parse_args()
 
     logging.info("Starting tariff data processing pipeline...")
@@ -99,12 +120,24 @@ def main():
         ('enhanced_clean', args.skip_enhanced_clean),
         ('commodity_number', args.skip_commodity_number),
         ('hierarchical_description', args.skip_hierarchical_description),
+        ('unit_of_quantity', args.skip_unit_of_quantity),
         ('rate_of_duty', args.skip_rate_of_duty),
         ('tariff_paragraph', args.skip_tariff_paragraph),
     ]
 
     results = {}
 
+    if not args.subprocess:
+        import pipeline
+        skip = [IN_PROCESS_STAGES[step_name] for step_name, skipped in steps if skipped]
+        try:
+            pipeline.run_pipeline(skip=skip)
+        except Exception:
+            logging.exception("Pipeline run failed.")
+            sys.exit(1)
+        logging.info("Pipeline completed successfully.")
+        return
+
     for step_name, skip in steps:
         if skip:
             logging.info(f"Skipping {step_name} step as requested.")
@@ -83,4 +83,423 @@ def test_extract_ocr_words_with_output_files(tmp_path):
     assert not cleaned_df.empty, "Cleaned output CSV file is empty."
     assert "Word" in cleaned_df.columns, "Expected column 'Word' not found in the cleaned output CSV."
     assert "TopLeft_X" in cleaned_df.columns, "Expected column 'TopLeft_X' not found in the cleaned output CSV."
-    assert "TopLeft_Y" in cleaned_df.columns, "Expected column 'TopLeft_Y' not found in the cleaned output CSV."
\ No newline at end of file
+    assert "TopLeft_Y" in cleaned_df.columns, "Expected column 'TopLeft_Y' not found in the cleaned output CSV."
+
+def test_extract_ocr_words_parallel_matches_sequential(tmp_path):
+    """
+    Test that the worker-pool mode returns the same rows, in page order, as the in-process loop.
+
+    Why:
+        Parallel OCR must be a drop-in replacement for the sequential ocr_word_coords.csv.
+
+    How:
+        - Creates a 3-page PDF.
+        - Runs extraction once in-process and once with 2 worker processes.
+        - Compares both CSVs row for row.
+    """
+    from get_ocr_data import ocr_model_config
+
+    pdf_path = tmp_path / "sample.pdf"
+    sequential_csv = tmp_path / "sequential.csv"
+    parallel_csv = tmp_path / "parallel.csv"
+    create_valid_dummy_pdf(pdf_path, num_pages=3)
+
+    extract_ocr_words_with_coords(pdf_path, 1, 3, PaddleOCR(**ocr_model_config), output_csv=sequential_csv)
+    extract_ocr_words_with_coords(pdf_path, 1, 3, None, output_csv=parallel_csv, workers=2)
+
+    sequential_df = pd.read_csv(sequential_csv)
+    parallel_df = pd.read_csv(parallel_csv)
+    assert parallel_df['Page'].is_monotonic_increasing, "Worker results were not written in page order."
+    pd.testing.assert_frame_equal(sequential_df, parallel_df)
+
+
+def test_extract_ocr_words_reuses_cached_pages(tmp_path):
+    """
+    Test that a re-run with an OCR cache skips ocr.predict and writes the same CSV.
+
+    Why:
+        Changing a downstream heuristic should not pay for OCR again.
+
+    How:
+        - Runs extraction twice over the same PDF with the same cache directory.
+        - Counts predict calls on the second run and compares the two CSVs.
+    """
+    from get_ocr_data import ocr_model_config
+    from ocr_cache import OcrPageCache
+
+    class CountingOCR:
+        def __init__(self, ocr):
+            self.ocr = ocr
+            self.calls = 0
+
+        def predict(self, image):
+            self.calls += 1
+            return self.ocr.predict(image)
+
+    pdf_path = tmp_path / "sample.pdf"
+    first_csv = tmp_path / "first.csv"
+    second_csv = tmp_path / "second.csv"
+    create_valid_dummy_pdf(pdf_path, num_pages=2)
+    ocr = CountingOCR(PaddleOCR(**ocr_model_config))
+    cache = OcrPageCache(str(tmp_path / "cache"))
+
+    extract_ocr_words_with_coords(pdf_path, 1, 2, ocr, output_csv=first_csv, cache=cache)
+    assert ocr.calls == 2
+
+    extract_ocr_words_with_coords(pdf_path, 1, 2, ocr, output_csv=second_csv, cache=cache)
+    assert ocr.calls == 2, "Cached pages were sent to OCR again."
+    assert cache.hits == 2
+
+    pd.testing.assert_frame_equal(pd.read_csv(first_csv), pd.read_csv(second_csv))
+
+
+def test_extract_ocr_words_streaming_matches_sequential(tmp_path):
+    """
+    Test that the bounded-queue render/OCR/write pipeline produces the same CSV as the plain loop.
+
+    Why:
+        Overlapping rasterization with inference must not reorder or drop pages.
+
+    How:
+        - Creates a 4-page PDF.
+        - Runs extraction with and without the streaming pipeline and compares the CSVs.
+    """
+    from get_ocr_data import ocr_model_config
+
+    pdf_path = tmp_path / "sample.pdf"
+    plain_csv = tmp_path / "plain.csv"
+    streaming_csv = tmp_path / "streaming.csv"
+    create_valid_dummy_pdf(pdf_path, num_pages=4)
+    ocr = PaddleOCR(**ocr_model_config)
+
+    extract_ocr_words_with_coords(pdf_path, 1, 4, ocr, output_csv=plain_csv)
+    extract_ocr_words_with_coords(pdf_path, 1, 4, ocr, output_csv=streaming_csv,
+                                  render_queue_depth=1, write_queue_depth=1)
+
+    pd.testing.assert_frame_equal(pd.read_csv(plain_csv), pd.read_csv(streaming_csv))
+
+
+def test_batch_pages_respects_size_and_memory_caps(tmp_path):
+    """
+    Test that pages are grouped into predict batches bounded by count and by rendered bytes.
+    """
+    from get_ocr_data import batch_pages
+
+    pdf_path = tmp_path / "sample.pdf"
+    create_valid_dummy_pdf(pdf_path, num_pages=7)
+    doc = fitz.open(pdf_path)
+    page_bytes = int(round(doc[0].rect.width * 300 / 72)) * int(round(doc[0].rect.height * 300 / 72)) * 3
+
+    assert batch_pages(doc, list(range(7)), 3, 10 * page_bytes) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert batch_pages(doc, list(range(7)), 3, 2 * page_bytes) == [[0, 1], [2, 3], [4, 5], [6]]
+    # A page above the byte budget is still processed, alone
+    assert batch_pages(doc, [0, 1], 3, page_bytes // 2) == [[0], [1]]
+    doc.close()
+
+
+def extract_in_batches(tmp_path, pages, batch_sizes):
+    """OCR a pages-long dummy PDF once per batch size: {batch_size: (seconds, words)}."""
+    import time
+    from get_ocr_data import ocr_model_config
+
+    pdf_path = tmp_path / "sample.pdf"
+    create_valid_dummy_pdf(pdf_path, num_pages=pages)
+    ocr = PaddleOCR(**ocr_model_config)
+
+    runs = {}
+    for batch_size in batch_sizes:
+        output_csv = tmp_path / f"batch_{batch_size}.csv"
+        started = time.perf_counter()
+        extract_ocr_words_with_coords(pdf_path, 1, pages, ocr, output_csv=output_csv, batch_size=batch_size)
+        runs[batch_size] = (time.perf_counter() - started, pd.read_csv(output_csv))
+    return runs
+
+
+def test_batched_predict_matches_single_pages(tmp_path):
+    """
+    Test that batched multi-page predict calls give the same words as the one-page-at-a-time loop.
+
+    Why:
+        Batching must not change which words land on which page.
+
+    How:
+        - Extracts a 5-page PDF with batch_size=1 and batch_size=4 (one full and one partial batch).
+        - Checks both runs produce the same words with the same Page numbers.
+    """
+    runs = extract_in_batches(tmp_path, 5, (1, 4))
+    single, batched = runs[1][1], runs[4][1]
+    assert batched['Page'].tolist() == single['Page'].tolist()
+    assert batched['Word'].tolist() == single['Word'].tolist()
+
+
+@pytest.mark.benchmark
+def test_batched_predict_benchmark(tmp_path):
+    """
+    Benchmark batched multi-page predict calls against the one-page-at-a-time loop.
+
+    How:
+        - Times extraction of an 8-page PDF with batch_size=1 and batch_size=4 and prints pages/sec.
+    """
+    pages = 8
+    for batch_size, (seconds, _) in extract_in_batches(tmp_path, pages, (1, 4)).items():
+        print(f"batch_size={batch_size}: {pages / seconds:.2f} pages/sec")
+
+
+def test_adaptive_dpi_keeps_full_page_coordinates(tmp_path):
+    """
+    Test that adaptive rendering skips blank pages and reports coordinates in the 300-DPI page frame.
+
+    Why:
+        enhanced_clean.py zones are tuned to full-page 300-DPI coordinates.
+
+    How:
+        - Creates a PDF with a blank page between two text pages.
+        - Runs extraction with and without adaptive rendering.
+        - Checks the same words are found at (nearly) the same coordinates.
+    """
+    from get_ocr_data import ocr_model_config
+
+    pdf_path = tmp_path / "sample.pdf"
+    doc = fitz.open()
+    for text in ("0010 600 Cattle", None, "0010 700 Sheep"):
+        page = doc.new_page()
+        if text:
+            page.insert_text((200, 300), text, fontsize=14)
+    doc.save(pdf_path)
+    doc.close()
+
+    full_csv = tmp_path / "full.csv"
+    adaptive_csv = tmp_path / "adaptive.csv"
+    ocr = PaddleOCR(**ocr_model_config)
+    extract_ocr_words_with_coords(pdf_path, 1, 3, ocr, output_csv=full_csv)
+    extract_ocr_words_with_coords(pdf_path, 1, 3, ocr, output_csv=adaptive_csv, adaptive=True)
+
+    full_df = pd.read_csv(full_csv)
+    adaptive_df = pd.read_csv(adaptive_csv)
+    assert 2 not in adaptive_df['Page'].tolist()
+    assert adaptive_df['Word'].tolist() == full_df['Word'].tolist()
+    coords = ['TopLeft_X', 'TopLeft_Y', 'BottomRight_X', 'BottomRight_Y']
+    assert (adaptive_df[coords] - full_df[coords]).abs().max().max() <= 3
+
+
+def test_text_layer_pages_skip_ocr(tmp_path):
+    """
+    Test that pages with an embedded text layer are read directly and only image-only pages are OCR'd.
+
+    Why:
+        Born-digital or pre-OCR'd pages do not need PaddleOCR at all.
+
+    How:
+        - Creates a PDF with a text page and an image-only page (a rasterized copy of the text).
+        - Runs extraction with the text-layer fast path and counts predict calls.
+        - Checks both pages produce the same words at nearly the same coordinates.
+    """
+    from get_ocr_data import ocr_model_config
+
+    class CountingOCR:
+        def __init__(self, ocr):
+            self.ocr = ocr
+            self.calls = 0
+
+        def predict(self, image):
+            self.calls += 1
+            return self.ocr.predict(image)
+
+    pdf_path = tmp_path / "sample.pdf"
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((200, 300), "0010 600 Cattle, weighing less than 200 pounds each", fontsize=14)
+    pix = page.get_pixmap(dpi=300)
+    scan = doc.new_page()
+    scan.insert_image(scan.rect, pixmap=pix)
+    doc.save(pdf_path)
+    doc.close()
+
+    output_csv = tmp_path / "ocr_word_coords.csv"
+    ocr = CountingOCR(PaddleOCR(**ocr_model_config))
+    extract_ocr_words_with_coords(pdf_path, 1, 2, ocr, output_csv=output_csv, text_layer=True)
+    assert ocr.calls == 1, "The text-layer page was sent to OCR."
+
+    df = pd.read_csv(output_csv)
+    text_page = df[df['Page'] == 1].reset_index(drop=True)
+    ocr_page = df[df['Page'] == 2].reset_index(drop=True)
+    assert (text_page['Confidence'] == 1.0).all()
+    assert len(text_page) == len(ocr_page)
+    coords = ['TopLeft_X', 'TopLeft_Y', 'BottomRight_X', 'BottomRight_Y']
+    assert (text_page[coords] - ocr_page[coords]).abs().max().max() <= 40
+
+
+def test_sharded_extraction_resumes_after_a_crash(tmp_path):
+    """
+    Test that a sharded run checkpoints finished shards and a restarted run only OCRs the rest.
+
+    Why:
+        A crash late in a long volume should not throw away the pages already done.
+
+    How:
+        - Runs a 5-page extraction in 2-page shards with an OCR that fails on its fourth page.
+        - Re-runs with a working OCR and counts predict calls.
+        - Compares the merged CSV with a single-pass extraction.
+    """
+    from get_ocr_data import extract_ocr_words_sharded, ocr_model_config
+
+    class FlakyOCR:
+        def __init__(self, ocr, fail_on_call=None):
+            self.ocr = ocr
+            self.calls = 0
+            self.fail_on_call = fail_on_call
+
+        def predict(self, image):
+            self.calls += 1
+            if self.calls == self.fail_on_call:
+                raise RuntimeError("OCR crashed")
+            return self.ocr.predict(image)
+
+    pdf_path = tmp_path / "sample.pdf"
+    create_valid_dummy_pdf(pdf_path, num_pages=5)
+    shard_dir = tmp_path / "shards"
+    merged_csv = tmp_path / "merged.csv"
+    single_csv = tmp_path / "single.csv"
+    model = PaddleOCR(**ocr_model_config)
+
+    with pytest.raises(RuntimeError):
+        extract_ocr_words_sharded(pdf_path, 1, 5, FlakyOCR(model, fail_on_call=4),
+                                  output_csv=merged_csv, shard_size=2, shard_dir=str(shard_dir))
+    assert not merged_csv.exists()
+
+    ocr = FlakyOCR(model)
+    extract_ocr_words_sharded(pdf_path, 1, 5, ocr, output_csv=merged_csv, shard_size=2, shard_dir=str(shard_dir))
+    assert ocr.calls == 3, "Pages 1-2 were checkpointed and should not be OCR'd again."
+
+    extract_ocr_words_with_coords(pdf_path, 1, 5, model, output_csv=single_csv)
+    pd.testing.assert_frame_equal(pd.read_csv(merged_csv), pd.read_csv(single_csv))
+
+
+def test_extract_ocr_words_writes_parquet(tmp_path):
+    """
+    Test that a .parquet output path produces the same rows as the CSV output.
+
+    Why:
+        Word rows are streamed to disk page by page in either format.
+
+    How:
+        - Extracts the same pages to CSV and to Parquet and compares the frames.
+    """
+    pytest.importorskip("pyarrow")
+    from get_ocr_data import ocr_model_config
+
+    pdf_path = tmp_path / "sample.pdf"
+    create_valid_dummy_pdf(pdf_path, num_pages=3)
+    csv_path = tmp_path / "ocr_word_coords.csv"
+    parquet_path = tmp_path / "ocr_word_coords.parquet"
+    ocr = PaddleOCR(**ocr_model_config)
+    extract_ocr_words_with_coords(pdf_path, 1, 3, ocr, output_csv=csv_path)
+    extract_ocr_words_with_coords(pdf_path, 1, 3, ocr, output_csv=parquet_path)
+
+    csv_df = pd.read_csv(csv_path)
+    parquet_df = pd.read_parquet(parquet_path)
+    assert parquet_df['Word'].tolist() == csv_df['Word'].tolist()
+    assert parquet_df['Page'].tolist() == csv_df['Page'].tolist()
+    assert parquet_df['TopLeft_X'].tolist() == csv_df['TopLeft_X'].tolist()
+
+
+def legacy_classify_ocr_words(df):
+    """The row-by-row classifier that classify_ocr_words replaced, kept as a reference."""
+    from get_ocr_data import classify_by_pattern, classify_row_context
+
+    df = df.copy()
+    df['Commodity_Number'] = None
+    df['Description'] = None
+    df['Tariff_Paragraph'] = None
+    df['Pattern_Classification'] = df['Word'].apply(classify_by_pattern)
+
+    df_sorted = df.sort_values('TopLeft_Y').reset_index(drop=True)
+    rows, current_row, current_y = [], [0], df_sorted.iloc[0]['TopLeft_Y']
+    for i in range(1, len(df_sorted)):
+        y_coord = df_sorted.iloc[i]['TopLeft_Y']
+        if abs(y_coord - current_y) <= 25:
+            current_row.append(i)
+        else:
+            rows.append(current_row)
+            current_row, current_y = [i], y_coord
+    rows.append(current_row)
+    for row in rows:
+        row_indices = [df_sorted.index[i] for i in row]
+        if len(row_indices) <= 1:
+            continue
+        refined = classify_row_context([df.iloc[i]['Word'] for i in row_indices],
+                                       [df.iloc[i]['Pattern_Classification'] for i in row_indices])
+        for i in row_indices:
+            word = df.iloc[i]['Word']
+            if word in refined:
+                df.at[i, 'Pattern_Classification'] = refined[word]
+
+    for idx, row in df.iterrows():
+        if row['Pattern_Classification'] == 'commodity_number':
+            df.at[idx, 'Commodity_Number'] = row['Word']
+        elif row['Pattern_Classification'] == 'tariff_paragraph':
+            df.at[idx, 'Tariff_Paragraph'] = row['Word']
+        else:
+            df.at[idx, 'Description'] = row['Word']
+    return df
+
+
+def synthetic_ocr_words(count, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(['0010 600', '0010700', '1530(b)', '1765', '701', 'Cattle:', 'lb', '2½¢ lb',
+                           'Weighing less than 200 pounds', ' 0020 000 ', '12345', '', None], dtype=object)
+    return pd.DataFrame({
+        'Word': vocabulary[rng.integers(0, len(vocabulary), size=count)],
+        'TopLeft_Y': rng.integers(0, 3300, size=count),
+        'Page': rng.integers(1, 5, size=count),
+    })
+
+
+def test_classify_ocr_words_matches_legacy_loops():
+    """
+    Test that the columnar classifier gives the same labels and columns as the row loops.
+
+    Why:
+        The vectorized rewrite must not change cleaned_classified_words.
+
+    How:
+        - Classifies a synthetic word frame with both implementations and compares the outputs.
+    """
+    from get_ocr_data import classify_ocr_words
+
+    words = synthetic_ocr_words(3000)
+    expected = legacy_classify_ocr_words(words)
+    actual = classify_ocr_words(words)
+    columns = ['Pattern_Classification', 'Commodity_Number', 'Description', 'Tariff_Paragraph']
+    pd.testing.assert_frame_equal(actual[columns].fillna('<missing>'), expected[columns].fillna('<missing>'))
+
+
+@pytest.mark.benchmark
+def test_classify_ocr_words_benchmark():
+    """
+    Benchmark the columnar classifier on a synthetic 1M-word frame against the row loops.
+
+    How:
+        - Times the legacy loops on a 20k-word slice and extrapolates to 1M words.
+        - Times classify_ocr_words on the full 1M words and prints the speedup.
+    """
+    import time
+    from get_ocr_data import classify_ocr_words
+
+    words = synthetic_ocr_words(1_000_000, seed=1)
+    sample = words.iloc[:20_000].reset_index(drop=True)
+
+    started = time.perf_counter()
+    legacy_classify_ocr_words(sample)
+    legacy_per_word = (time.perf_counter() - started) / len(sample)
+
+    started = time.perf_counter()
+    classify_ocr_words(words)
+    vectorized_seconds = time.perf_counter() - started
+
+    legacy_seconds = legacy_per_word * len(words)
+    print(f"\nclassify 1M words: loops ~{legacy_seconds:.0f}s (extrapolated), "
+          f"vectorized {vectorized_seconds:.2f}s, {legacy_seconds / vectorized_seconds:.0f}x faster")
+    assert vectorized_seconds * 10 < legacy_seconds
@@ -1,7 +1,9 @@
 import os
 import tempfile
+import numpy as np
 import pandas as pd
 import pytest
+from commodity import format_commodity_number, format_commodity_numbers, parse_commodity_numbers
 from commodity_number02 import (
     clean_ocr_artifacts_in_number,
     extract_commodity_number,
@@ -33,9 +35,9 @@ def test_extract_commodity_numbers_from_csv():
 
     try:
         numbers = extract_commodity_numbers_from_csv(tmp_path)
-        # Adjusted assertion to match actual output format
-        assert '10600' in numbers
-        assert '10701' in numbers
+        # Leading zeros dropped by the numeric column are restored: "0010 600"
+        assert '0010 600' in numbers
+        assert '0010 701' in numbers
         assert len(numbers) == 4
     finally:
         os.remove(tmp_path)
@@ -59,4 +61,20 @@ def test_main_function():
         # Read output CSV before assertions
         df = pd.read_csv(output_csv)
         df['SCHEDULE A COMMODITY NUMBER'] = df['SCHEDULE A COMMODITY NUMBER'].astype(str)
-        assert df['SCHEDULE A COMMODITY NUMBER'].iloc[0] == '10600'
\ No newline at end of file
+        assert df['SCHEDULE A COMMODITY NUMBER'].iloc[0] == '0010 600'
+
+
+def test_parse_commodity_numbers_accepts_every_stage_format():
+    text = pd.Series(['0010 600', '0010600', '10600', '10600.0', ' 0106 000 ', '', 'nan', None, '12345678', 'Cattle'])
+    assert parse_commodity_numbers(text).tolist() == [10600, 10600, 10600, 10600, 106000] + [pd.NA] * 5
+    numbers = pd.Series([10600.0, np.nan, 106000.0, 10600.5, -1.0])
+    assert parse_commodity_numbers(numbers).tolist() == [10600, pd.NA, 106000, pd.NA, pd.NA]
+    assert str(parse_commodity_numbers(numbers).dtype) == 'Int64'
+
+
+def test_format_commodity_numbers_round_trip():
+    keys = parse_commodity_numbers(pd.Series([10600.0, np.nan, 2540000.0]))
+    assert format_commodity_numbers(keys).tolist() == ['0010 600', '', '2540 000']
+    assert parse_commodity_numbers(format_commodity_numbers(keys)).tolist() == keys.tolist()
+    assert format_commodity_number(10600) == '0010 600'
+
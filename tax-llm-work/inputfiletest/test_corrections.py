@@ -0,0 +1,108 @@
+import random
+import string
+
+import numpy as np
+import pandas as pd
+
+import hierarchical_description03 as hd
+import rate_of_duty05 as rd
+from corrections import CorrectionTable, trie_pattern
+
+
+def sequential_replace(corrections, text):
+    """The per-entry str.replace loop the stages used before CorrectionTable."""
+    for incorrect, correct in corrections.items():
+        text = text.replace(incorrect, correct)
+    return text
+
+
+def test_trie_pattern_prefers_longest_key():
+    table = CorrectionTable({'ea': 'EA', 'each': 'EACH', 'eachch': 'each'})
+    assert trie_pattern(['each', 'ea', 'eachch']) == 'ea(?:ch(?:ch)?)?'
+    assert table.apply('eachch each ea eac') == 'each EACH EA EAc'
+
+
+def test_replacements_are_not_rescanned():
+    table = CorrectionTable({'ab': 'b', 'bb': 'X'})
+    assert table.apply('abb') == 'bb'  # the 'b' left by 'ab' -> 'b' does not form a new 'bb'
+    assert table.apply('') == ''
+    assert len(CorrectionTable({'same': 'same'})) == 0
+    assert CorrectionTable({}).apply('unchanged') == 'unchanged'
+
+
+def test_description_corrections_match_sequential_replace():
+    words = list(hd.description_corrections.corrections) + list(hd.description_corrections.corrections.values()) + \
+        ['Cattle', 'weighing', 'less', 'than', '200', 'lb', 'each', ':', '-', 'n.', 's.', 'p.', 'f.', '0', 'f', 'r']
+    rng = random.Random(3)
+    old_corrections = dict(hd.description_corrections.corrections)
+    for _ in range(2000):
+        text = rng.choice(['', ' ']).join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        assert hd.description_corrections.apply(text) == sequential_replace(old_corrections, text), text
+
+
+def test_rate_corrections_match_sequential_replace():
+    tokens = list(rd.ocr_corrections) + ['1', '2', '3', 'lb', 't', 'each', '¢', ' ', '%', 'Free']
+    rng = random.Random(4)
+    for _ in range(2000):
+        text = ''.join(rng.choice(tokens) for _ in range(rng.randint(1, 6)))
+        assert rd.rate_corrections.apply(text) == sequential_replace(rd.ocr_corrections, text), text
+
+
+def test_apply_series_matches_apply():
+    texts = pd.Series(['Catt1e, 1ive', np.nan, 'Mutt0n  --  fr0zen', '', '  H0gs  '], index=[10, 11, 12, 13, 14])
+    corrected = hd.description_corrections.apply_series(texts)
+    assert corrected.index.equals(texts.index)
+    assert pd.isna(corrected[11])
+    for idx in [10, 12, 13, 14]:
+        assert corrected[idx] == hd.description_corrections.apply(texts[idx])
+
+    cleaned = hd.apply_advanced_ocr_corrections_series(texts)
+    assert cleaned.tolist() == ['Cattle, live', '', 'Mutton - frozen', '', 'Hogs']
+    assert cleaned[12] == hd.apply_advanced_ocr_corrections(texts[12])
+
+
+class CountingRegex:
+    """Stands in for a table's compiled regex and counts the scans of the text."""
+
+    def __init__(self, regex):
+        self.regex = regex
+        self.scans = 0
+
+    def sub(self, replace, text):
+        self.scans += 1
+        return self.regex.sub(replace, text)
+
+
+class CountingDict(dict):
+    """A correction dictionary that counts its lookups."""
+    lookups = 0
+
+    def get(self, key, default=None):
+        self.lookups += 1
+        return super().get(key, default)
+
+
+def test_each_text_is_scanned_once_whatever_the_dictionary_size():
+    rng = random.Random(7)
+
+    def random_word():
+        return ''.join(rng.choice(string.ascii_lowercase + '01') for _ in range(rng.randint(4, 10)))
+
+    big = {random_word(): random_word() for _ in range(5000)}
+    small = dict(list(big.items())[:50])
+    texts = [' '.join(random_word() for _ in range(12)) for _ in range(200)]
+    texts += [' '.join(rng.sample(list(big), 6)) for _ in range(200)]
+
+    for corrections in (small, big):
+        table = CorrectionTable(corrections)
+        matches = sum(len(table.regex.findall(text)) for text in texts)
+        table.corrections = CountingDict(table.corrections)
+        table.regex = CountingRegex(table.regex)
+        for text in texts:
+            table.apply(text)
+        # One regex pass per text and one dictionary lookup per match, never a pass per entry
+        assert table.regex.scans == len(texts)
+        assert table.corrections.lookups == matches > 0
+
+    # Shared prefixes are matched once: the trie is shorter than the plain alternation of the keys
+    assert len(trie_pattern(big)) < len('|'.join(big))
@@ -1,5 +1,7 @@
 import os
 import tempfile
+import time
+import numpy as np
 import pandas as pd
 import pytest
 from enhanced_clean import (
@@ -7,7 +9,14 @@ from enhanced_clean import (
     load_and_preprocess,
     analyze_coordinate_zones,
     classify_word_by_coordinates,
-    clean_commodity_number
+    classify_words_by_coordinates,
+    clean_commodity_number,
+    analyze_page_zones,
+    page_anchor_columns,
+    classify_words,
+    shift_zones,
+    CLASSIFIED_COLUMNS,
+    ZoneTemplateCache
 )
 
 # Sample OCR CSV content simulating page_28.png
@@ -114,6 +123,218 @@ def test_analyze_coordinate_zones():
     assert 'description' in zones
     assert 'rate_1930' in zones
     # 'rate_trade' may or may not be present depending on data
+
+
+SYNTHETIC_ZONES = {
+    'commodity': {'min_x': 40, 'max_x': 130},
+    'description': {'min_x': 140, 'max_x': 300},
+    'unit': {'min_x': 310, 'max_x': 400},
+    'rate_1930': {'min_x': 410, 'max_x': 480},
+    'rate_trade': {'min_x': 480, 'max_x': 550},  # shares X=480 with rate_1930
+    'tariff': {'min_x': 540, 'max_x': 650}  # overlaps rate_trade
+}
+
+
+def synthetic_words(count, seed=0):
+    # Words of every kind at X values on, between and outside the zone bounds
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(['0010600', '0010 600', ' 0022 000 ', '001 0600', '701', '1558', '7010', 'Cattle',
+                           'Lb', 'No.', '2 1/2¢', 'Free', '', '  ', None, np.nan], dtype=object)
+    x_values = np.array([0, 40, 85.5, 130, 135, 140, 300, 310, 400, 410, 480, 500, 540, 550, 650, 700, np.nan])
+    return pd.DataFrame({
+        'Word': vocabulary[rng.integers(0, len(vocabulary), size=count)],
+        'TopLeft_X': x_values[rng.integers(0, len(x_values), size=count)],
+    }, index=rng.permutation(count) + 100)
+
+
+def classify_rows(df, zones):
+    # The per-row df.apply classify_words used before classify_words_by_coordinates
+    classified = df.apply(
+        lambda row: pd.Series(classify_word_by_coordinates(row['Word'], row['TopLeft_X'], zones)), axis=1)
+    classified.columns = CLASSIFIED_COLUMNS
+    return classified
+
+
+def test_classify_words_by_coordinates_matches_rows():
+    df = synthetic_words(5000)
+    for zones in [SYNTHETIC_ZONES, {}, {'tariff': SYNTHETIC_ZONES['tariff'], 'unit': SYNTHETIC_ZONES['unit']}]:
+        expected = classify_rows(df, zones)
+        actual = classify_words_by_coordinates(df['Word'], df['TopLeft_X'], zones)
+        pd.testing.assert_frame_equal(actual, expected)
+
+    # Missing words classify as the text 'nan', like str(word) does
+    actual = classify_words_by_coordinates(pd.Series([np.nan]), pd.Series([85.0]), SYNTHETIC_ZONES)
+    assert actual.iloc[0].tolist() == ['nan', None, None, None, None, None]
+
+    empty = classify_words_by_coordinates(pd.Series([], dtype=object), pd.Series([], dtype=float), SYNTHETIC_ZONES)
+    assert empty.empty and list(empty.columns) == CLASSIFIED_COLUMNS
+
+
+@pytest.mark.benchmark
+def test_classify_words_by_coordinates_benchmark():
+    # Per-row apply timed on a 20k-word slice and extrapolated to 1M words
+    df = synthetic_words(1_000_000, seed=1)
+    sample = df.iloc[:20_000]
+
+    started = time.perf_counter()
+    classify_rows(sample, SYNTHETIC_ZONES)
+    rows_seconds = (time.perf_counter() - started) / len(sample) * len(df)
+
+    started = time.perf_counter()
+    classify_words_by_coordinates(df['Word'], df['TopLeft_X'], SYNTHETIC_ZONES)
+    vectorized_seconds = time.perf_counter() - started
+
+    print(f"\nclassify 1M words by coordinates: apply ~{rows_seconds:.0f}s (extrapolated), "
+          f"vectorized {vectorized_seconds:.2f}s, {rows_seconds / vectorized_seconds:.0f}x faster")
+    assert vectorized_seconds * 10 < rows_seconds
+
+
+# One text row of a schedule page: (word, X) at the page's unshifted positions
+LAYOUT_ROW = [('0010600', 50), ('Cattle', 275), ('weighing', 290), ('Lb', 350), ('2 1/2¢', 420), ('1 1/2¢', 560),
+              ('701', 700)]
+WIDE_LAYOUT_ROW = [('0010600', 80), ('Cattle', 200), ('Lb.', 520), ('6%', 600), ('3%', 760), ('1558', 950)]
+
+
+def layout_page(page, shift, rows=20, layout=LAYOUT_ROW):
+    # A page of identical rows, moved right by shift
+    words = pd.DataFrame([{'Word': word, 'TopLeft_X': x + shift, 'TopLeft_Y': 100 + 40 * row}
+                          for row in range(rows) for word, x in layout])
+    return words.assign(TopRight_X=words['TopLeft_X'] + 40, TopRight_Y=words['TopLeft_Y'],
+                        BottomRight_X=words['TopLeft_X'] + 40, BottomRight_Y=words['TopLeft_Y'] + 20,
+                        BottomLeft_X=words['TopLeft_X'], BottomLeft_Y=words['TopLeft_Y'] + 20,
+                        Confidence=0.95, Page=page)
+
+
+def test_classify_words_uses_zones_per_page():
+    # The second page is scanned 150 px further right than the first
+    df = pd.concat([layout_page(1, 0), layout_page(2, 150)], ignore_index=True)
+    classified = classify_words(df.copy())
+    for page in [1, 2]:
+        on_page = classified[df['Page'] == page]
+        assert on_page['Unit of Quantity'].dropna().unique().tolist() == ['Lb']
+        assert on_page['Rate of Duty 1930'].dropna().unique().tolist() == ['2 1/2¢']
+        assert on_page['Rate of Duty Trade Agreement'].dropna().unique().tolist() == ['1 1/2¢']
+        assert set(on_page['Commodity Description'].dropna()) == {'Cattle', 'weighing'}
+
+    # One zone set for both pages stretches the commodity zone over page 1's units
+    single_page = classify_words(df.assign(Page=1))
+    assert single_page.loc[df['Page'] == 1, 'Unit of Quantity'].isna().all()
+
+
+def test_zone_templates_are_reused_within_tolerance():
+    shifts = [0, 4, -6, 10, 200, 205, 196, 3]
+    df = pd.concat([layout_page(page, shift) for page, shift in enumerate(shifts, 1)], ignore_index=True)
+    cache = ZoneTemplateCache(tolerance=25)
+    page_zones = analyze_page_zones(df, cache)
+
+    # Two layouts calibrated, the other pages moved a template onto their anchors
+    assert len(cache.templates) == 2 and cache.misses == 2 and cache.hits == 6
+    for page, shift in enumerate(shifts, 1):
+        recalibrated = analyze_coordinate_zones(df[df['Page'] == page])
+        assert page_zones[page].keys() == recalibrated.keys()
+        for zone, bounds in recalibrated.items():
+            for key, value in bounds.items():
+                assert page_zones[page][zone][key] == pytest.approx(value)
+
+    # A cache kept from an earlier run calibrates nothing new
+    analyze_page_zones(df, cache)
+    assert len(cache.templates) == 2 and cache.misses == 2
+
+    # Pages of another layout get their own template
+    wide = pd.concat([df, layout_page(9, 0, layout=WIDE_LAYOUT_ROW)], ignore_index=True)
+    analyze_page_zones(wide, cache)
+    assert len(cache.templates) == 3
+
+
+def test_pages_are_calibrated_whatever_their_tariff_numbers():
+    # Tariff paragraph 1601 is not a Schedule A number; the pages are scanned 150 and 10 px further right
+    layout = LAYOUT_ROW[:-1] + [('1601', 700)]
+    df = pd.concat([layout_page(page, shift, layout=layout) for page, shift in [(1, 0), (2, 150), (3, 10)]],
+                   ignore_index=True)
+    cache = ZoneTemplateCache()
+    classified = classify_words(df.copy(), cache)
+    assert cache.misses == 2 and cache.hits == 1
+    for page in [1, 2, 3]:
+        on_page = classified[df['Page'] == page]
+        assert on_page['Unit of Quantity'].dropna().unique().tolist() == ['Lb']
+        assert on_page['Rate of Duty 1930'].dropna().unique().tolist() == ['2 1/2¢']
+        assert on_page['Tariff Paragraph'].dropna().unique().tolist() == ['1601']
+
+
+def test_pages_without_column_bands_use_zones_of_all_words():
+    df = pd.concat([layout_page(1, 0), layout_page(2, 0, layout=[('Cattle', 275)]).assign(TopLeft_X=np.nan)],
+                   ignore_index=True)
+    page_zones = analyze_page_zones(df)
+    assert page_zones[2] == analyze_coordinate_zones(df)
+    assert page_anchor_columns(df).loc[2].isna().all()
+    assert shift_zones({'unit': {'min_x': 1, 'max_x': 2}}, 5) == {'unit': {'min_x': 6, 'max_x': 7}}
+
+
+def drifting_pages(pages, rows):
+    # Pages in three layouts with small scan drifts
+    rng = np.random.default_rng(5)
+    base = rng.choice([0, 150, 300], size=pages)
+    shifts = base + rng.integers(-10, 11, size=pages)
+    return pd.concat([layout_page(page, shift, rows=rows) for page, shift in enumerate(shifts, 1)], ignore_index=True)
+
+
+def test_drifting_pages_share_a_few_templates():
+    cache = ZoneTemplateCache()
+    analyze_page_zones(drifting_pages(200, rows=5), cache)
+    assert len(cache.templates) <= 6
+    assert cache.misses == len(cache.templates) and cache.hits + cache.misses == 200
+
+
+@pytest.mark.benchmark
+def test_page_zone_templates_benchmark():
+    df = drifting_pages(1000, rows=30)
+
+    started = time.perf_counter()
+    cache = ZoneTemplateCache()
+    analyze_page_zones(df, cache)
+    cached_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    analyze_page_zones(df, ZoneTemplateCache(tolerance=-1))  # every page recalibrated
+    recalibrated_seconds = time.perf_counter() - started
+
+    print(f"\nzones for 1000 pages: {len(cache.templates)} templates {cached_seconds:.2f}s, "
+          f"recalibrating every page {recalibrated_seconds:.2f}s")
+    assert cached_seconds * 3 < recalibrated_seconds
+
+
+def test_zones_follow_the_column_bands():
+    # Tariff paragraphs the tariff patterns do not know, and a 1930 rate column in two bands
+    layout = [('0010600', 50), ('Cattle', 275), ('Lb', 350), ('2 1/2¢', 420), ('per lb.', 480), ('1 1/2¢', 640),
+              ('1601', 800)]
+    zones = analyze_coordinate_zones(layout_page(1, 0, layout=layout))
+    assert zones['tariff']['min_x'] == 750 and zones['tariff']['max_x'] == 900
+    assert zones['rate_1930']['max_x'] == zones['rate_trade']['min_x'] == (480 + 640) / 2
+
+    # A single rate column
+    zones = analyze_coordinate_zones(layout_page(1, 0, layout=[w for w in layout if w[0] not in ('per lb.', '1 1/2¢')]))
+    assert 'rate_trade' not in zones and zones['rate_1930']['max_x'] == 750 - 20
+
+    # A stray word right of the tariff column is not taken for it
+    words = pd.concat([layout_page(1, 0, layout=layout), layout_page(1, 0, rows=1, layout=[('28', 1200)])])
+    assert analyze_coordinate_zones(words)['tariff']['max_x'] == 900
+
+
+def test_pages_of_another_layout_are_anchored_on_their_column_bands():
+    # The layout above on two pages, the second scanned 200 px further right, the first with a stray page number
+    layout = [('0010600', 50), ('Cattle', 275), ('Lb', 350), ('2 1/2¢', 420), ('per lb.', 480), ('1 1/2¢', 640),
+              ('1601', 800)]
+    df = pd.concat([layout_page(1, 0, layout=layout), layout_page(1, 0, rows=1, layout=[('28', 1200)]),
+                    layout_page(2, 200, layout=layout)], ignore_index=True)
+    assert page_anchor_columns(df).to_numpy().tolist() == [[50, 800], [250, 1000]]
+
+    page_zones = analyze_page_zones(df)
+    for page in [1, 2]:
+        assert page_zones[page] == analyze_coordinate_zones(df[df['Page'] == page])
+    assert page_zones[2]['tariff']['min_x'] == 950
+    assert page_zones[2]['rate_1930']['max_x'] == page_zones[2]['rate_trade']['min_x'] == (680 + 840) / 2
+
+
 def test_load_and_preprocess():
     # Write sample CSV to temp file
     with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.csv') as tmp:
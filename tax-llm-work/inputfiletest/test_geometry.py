@@ -0,0 +1,172 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geometry import assign_row_ids, column_bands, indent_levels, nearest_anchor, row_id_series
+
+
+def legacy_anchor_rows(y, threshold):
+    """The original loop: a row holds the words within threshold of its first word."""
+    df_sorted = pd.DataFrame({'TopLeft_Y': y}).sort_values('TopLeft_Y', kind='stable')
+    rows, current_row = [], [df_sorted.index[0]]
+    current_y = df_sorted.iloc[0]['TopLeft_Y']
+    for i in range(1, len(df_sorted)):
+        y_coord = df_sorted.iloc[i]['TopLeft_Y']
+        if abs(y_coord - current_y) <= threshold:
+            current_row.append(df_sorted.index[i])
+        else:
+            rows.append(current_row)
+            current_row = [df_sorted.index[i]]
+            current_y = y_coord
+    rows.append(current_row)
+    return rows
+
+
+def rows_from_ids(row_ids):
+    return [list(np.flatnonzero(row_ids == row_id)) for row_id in range(row_ids.max() + 1)]
+
+
+def test_gap_mode_splits_on_gaps_between_neighbours():
+    y = np.array([100, 160, 110, 300, 120, 320, 500])
+    assert assign_row_ids(y, threshold=25).tolist() == [0, 1, 0, 2, 0, 2, 3]
+    # A chain of small gaps stays one row, even when it drifts past the threshold
+    assert assign_row_ids(np.array([0, 20, 40, 60]), threshold=25).tolist() == [0, 0, 0, 0]
+
+
+def test_anchor_mode_matches_the_original_loop():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 3000, size=2000).astype(float)
+    expected = legacy_anchor_rows(y, 25)
+    assert rows_from_ids(assign_row_ids(y, 25, mode='anchor')) == [sorted(row) for row in expected]
+    assert assign_row_ids(np.array([0, 20, 40, 60]), 25, mode='anchor').tolist() == [0, 0, 1, 1]
+
+
+def test_rows_do_not_span_groups_and_missing_y_stands_alone():
+    y = np.array([100, 105, 100, np.nan, 105])
+    pages = np.array([1, 1, 2, 2, 2])
+    assert assign_row_ids(y, 25, groups=pages).tolist() == [0, 0, 1, 2, 1]
+    assert assign_row_ids(np.array([np.nan, np.nan, 10.0]), 25).tolist() == [1, 2, 0]
+
+
+def test_row_id_series_aligns_with_the_frame():
+    df = pd.DataFrame({'TopLeft_Y': [300, 100, 110], 'Page': [1, 1, 1]}, index=[7, 8, 9])
+    row_ids = row_id_series(df, 25, group_column='Page')
+    assert row_ids.index.tolist() == [7, 8, 9]
+    assert row_ids.tolist() == [1, 0, 0]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('mode', ['gap', 'anchor'])
+def test_row_banding_benchmark(mode):
+    """Tens of thousands of words per page should band in milliseconds."""
+    rng = np.random.default_rng(1)
+    words_per_page, pages = 50_000, 4
+    y = rng.integers(0, 3300, size=words_per_page * pages).astype(float)
+    page = np.repeat(np.arange(pages), words_per_page)
+
+    started = time.perf_counter()
+    row_ids = assign_row_ids(y, 25, groups=page, mode=mode)
+    elapsed = time.perf_counter() - started
+    print(f"\n{mode}: {len(y)} words banded into {row_ids.max() + 1} rows in {elapsed * 1000:.1f} ms")
+
+
+def brute_force_nearest(y, anchor_y, tolerance, groups=None, anchor_groups=None):
+    """Scan every anchor per word, keeping the first strictly closer one."""
+    result = []
+    for i, y_coord in enumerate(y):
+        best, best_distance = -1, float('inf')
+        for j, anchor in enumerate(anchor_y):
+            if groups is not None and groups[i] != anchor_groups[j]:
+                continue
+            distance = abs(y_coord - anchor)
+            if distance < best_distance and distance <= tolerance:
+                best, best_distance = j, distance
+        result.append(best)
+    return result
+
+
+def test_nearest_anchor_matches_brute_force():
+    rng = np.random.default_rng(4)
+    for _ in range(20):
+        y = rng.integers(0, 400, size=300).astype(float)
+        anchor_y = rng.integers(0, 400, size=40).astype(float)  # integer Y values give plenty of ties
+        y[rng.integers(0, 300, size=5)] = np.nan
+        anchor_y[rng.integers(0, 40, size=2)] = np.nan
+        pages = rng.integers(1, 4, size=300)
+        anchor_pages = rng.integers(1, 4, size=40)
+        assert nearest_anchor(y, anchor_y, 30).tolist() == brute_force_nearest(y, anchor_y, 30)
+        assert nearest_anchor(y, anchor_y, 30, pages, anchor_pages).tolist() == \
+            brute_force_nearest(y, anchor_y, 30, pages, anchor_pages)
+
+
+def test_nearest_anchor_ties_and_edges():
+    # 100 is 10 from both anchors: the one listed first wins
+    assert nearest_anchor([100.0], [110.0, 90.0], 30).tolist() == [0]
+    assert nearest_anchor([100.0], [90.0, 110.0], 30).tolist() == [0]
+    assert nearest_anchor([100.0, 200.0], [120.0, 120.0], 30).tolist() == [0, -1]
+    assert nearest_anchor([], [1.0], 30).tolist() == []
+    assert nearest_anchor([1.0], [], 30).tolist() == [-1]
+    assert nearest_anchor([100.0], [100.0], 0, groups=[2], anchor_groups=[1]).tolist() == [-1]
+
+
+@pytest.mark.benchmark
+def test_nearest_anchor_benchmark():
+    """Every word of a dense document placed against its page's anchors."""
+    rng = np.random.default_rng(2)
+    pages, words_per_page, anchors_per_page = 50, 4_000, 200
+    y = rng.integers(0, 3300, size=pages * words_per_page).astype(float)
+    groups = np.repeat(np.arange(pages), words_per_page)
+    anchor_y = rng.integers(0, 3300, size=pages * anchors_per_page).astype(float)
+    anchor_groups = np.repeat(np.arange(pages), anchors_per_page)
+
+    started = time.perf_counter()
+    nearest = nearest_anchor(y, anchor_y, 30, groups, anchor_groups)
+    elapsed = time.perf_counter() - started
+    print(f"\n{len(y)} words matched against {len(anchor_y)} anchors in {elapsed * 1000:.1f} ms")
+    assert (nearest >= 0).any()
+
+
+def test_column_bands():
+    bands = column_bands([300, 50, 55, 60, np.nan, 121, 120], bin_width=10, min_gap=40)
+    assert bands.values.tolist() == [[50, 60, 55, 3], [120, 121, 120.5, 2], [300, 300, 300, 1]]
+    # Empty stretches narrower than min_gap stay inside a band
+    assert len(column_bands([50, 60, 85, 110], bin_width=10, min_gap=40)) == 1
+    assert column_bands([50, 55, 120, 300], min_count=2)['min_x'].tolist() == [50]
+    assert column_bands([]).empty and column_bands([np.nan]).empty
+
+
+def test_column_bands_find_any_number_of_columns():
+    rng = np.random.default_rng(4)
+    for columns in [1, 2, 5, 9]:
+        starts = np.cumsum(rng.integers(100, 400, size=columns)).astype(float)
+        x = np.concatenate([start + rng.uniform(0, 40, size=rng.integers(5, 300)) for start in starts])
+        bands = column_bands(rng.permutation(x), bin_width=10, min_gap=40)
+        assert len(bands) == columns
+        assert (bands['min_x'].to_numpy() >= starts).all() and (bands['max_x'].to_numpy() <= starts + 40).all()
+        assert bands['count'].sum() == len(x)
+
+
+@pytest.mark.benchmark
+def test_column_bands_benchmark():
+    """One histogram pass over a million word left edges."""
+    rng = np.random.default_rng(6)
+    x = rng.choice([240.0, 900.0, 1300.0, 1450.0, 1700.0, 2140.0], size=1_000_000) + rng.uniform(0, 60, 1_000_000)
+
+    started = time.perf_counter()
+    bands = column_bands(x)
+    elapsed = time.perf_counter() - started
+    print(f"\n{len(x)} left edges into {len(bands)} column bands in {elapsed * 1000:.1f} ms")
+    assert len(bands) == 6
+
+
+def test_indent_levels():
+    x = [515, 480, 548, 514, np.nan, 476, 590, 519, 553, 587]
+    assert indent_levels(x, 12).tolist() == [1, 0, 2, 1, -1, 0, 3, 1, 2, 3]
+    # With no tolerance every distinct X is a level of its own
+    assert indent_levels(x, 0).tolist() == [3, 1, 5, 2, -1, 0, 8, 4, 6, 7]
+    # A level spans at most the tolerance from its first value, so small steps don't chain
+    assert indent_levels([10, 20, 30, 38], 10).tolist() == [0, 0, 1, 1]
+    assert indent_levels(np.arange(476, 600, 12), 12).tolist() == [0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5]
+    assert indent_levels([], 12).tolist() == []
@@ -1,11 +1,17 @@
 import pytest
+import numpy as np
 import pandas as pd
 from io import StringIO
 import os
 import tempfile
+import time
 
+import commodity_number02
+import enhanced_clean
 import hierarchical_description03 as hd
 
+FIXTURE_OCR_CSV = os.path.join(os.path.dirname(__file__), '..', 'output', 'ocr_word_coords.csv')
+
 
 @pytest.fixture
 def sample_data():
@@ -35,6 +41,246 @@ def test_combine_split_lines(sample_data):
     assert any('Weighing less than 200 pounds' in desc for desc in combined_descs)
 
 
+def legacy_combine_split_lines(data, y_threshold):
+    """The row loop combine_split_lines used before: continuation lines merge pairwise only."""
+    processed_data = data.copy().reset_index(drop=True)
+    skip_indices = set()
+    for i in range(len(processed_data) - 1):
+        curr, nxt = processed_data.iloc[i], processed_data.iloc[i + 1]
+        curr_desc = str(curr['Commodity Description']).strip() if pd.notna(curr['Commodity Description']) else ''
+        next_desc = str(nxt['Commodity Description']).strip() if pd.notna(nxt['Commodity Description']) else ''
+        if curr_desc and next_desc:
+            if (nxt['TopLeft_X'] > curr['TopLeft_X']) and (nxt['TopLeft_Y'] - curr['TopLeft_Y'] < y_threshold) \
+                    and not curr_desc.endswith(':'):
+                processed_data.at[i, 'Commodity Description'] = f"{curr_desc} {next_desc}"
+                skip_indices.add(i + 1)
+    return processed_data.drop(index=list(skip_indices)).reset_index(drop=True)
+
+
+def fragment_rows(count, seed=0):
+    """Description fragments with random indents and line spacing, some empty or ending with ':'."""
+    rng = np.random.default_rng(seed)
+    words = np.array(['Cattle:', 'Weighing less than', '200 pounds each', ' (calves) ', '', None, 'Hogs', 'n.s.p.f.:'],
+                     dtype=object)
+    return pd.DataFrame({
+        'Page': 1,
+        'TopLeft_X': rng.choice([10, 50, 70, 90], size=count),
+        'TopLeft_Y': np.cumsum(rng.choice([5, 10, 30, 60], size=count)),
+        'Commodity Description': words[rng.integers(0, len(words), size=count)],
+        'Commodity Number': '0010600',
+    }, index=rng.permutation(count))
+
+
+def continuation_links(data, y_threshold):
+    """For each pair of neighbouring lines, whether the second continues the first (the loop's condition)."""
+    rows = data.reset_index(drop=True)
+    text = [str(d).strip() if pd.notna(d) else '' for d in rows['Commodity Description']]
+    return [bool(text[i] and text[i + 1] and rows['TopLeft_X'][i + 1] > rows['TopLeft_X'][i]
+                 and rows['TopLeft_Y'][i + 1] - rows['TopLeft_Y'][i] < y_threshold and not text[i].endswith(':'))
+            for i in range(len(rows) - 1)]
+
+
+def test_combine_split_lines_matches_loop():
+    chained = 0
+    for seed in range(300):
+        data = fragment_rows(12, seed)
+        links = continuation_links(data, 20)
+        actual = hd.combine_split_lines(data, 20)
+        if not any(a and b for a, b in zip(links, links[1:])):
+            # Without chains of three or more lines the run-length merge gives the loop's result
+            pd.testing.assert_frame_equal(actual, legacy_combine_split_lines(data, 20))
+            continue
+
+        # Every run collapses into its first line
+        chained += 1
+        rows = data.reset_index(drop=True)
+        starts = [i for i in range(len(rows)) if i == 0 or not links[i - 1]]
+        assert actual['TopLeft_Y'].tolist() == rows['TopLeft_Y'][starts].tolist()
+        for start, end, description in zip(starts, starts[1:] + [len(rows)], actual['Commodity Description']):
+            if end - start > 1:
+                assert description == ' '.join(str(d).strip() for d in rows['Commodity Description'][start:end])
+    assert 0 < chained < 300
+
+
+def test_combine_split_lines_collapses_chains():
+    data = pd.DataFrame({
+        'Page': 1,
+        'TopLeft_X': [10, 50, 70, 90, 10, 50],
+        'TopLeft_Y': [100, 110, 115, 120, 200, 210],
+        'Commodity Description': ['Cattle', ' weighing less', 'than 200 pounds', 'each', 'Hogs:', 'live'],
+        'Commodity Number': '0010600',
+    })
+    combined = hd.combine_split_lines(data, y_threshold=20)
+    assert combined['Commodity Description'].tolist() == [
+        'Cattle weighing less than 200 pounds each', 'Hogs:', 'live']
+    assert combined['TopLeft_Y'].tolist() == [100, 200, 210]
+    # The loop merged the first two lines and lost the rest of the chain
+    assert legacy_combine_split_lines(data, 20)['Commodity Description'].tolist() == [
+        'Cattle weighing less', 'Hogs:', 'live']
+    assert hd.combine_split_lines(data.iloc[:0], 20).empty
+
+
+@pytest.mark.benchmark
+def test_combine_split_lines_benchmark():
+    """Pages with many thousand description fragments."""
+    data = fragment_rows(200_000, seed=1)
+    sample = data.iloc[:5_000]
+
+    started = time.perf_counter()
+    legacy_combine_split_lines(sample, 20)
+    loop_seconds = (time.perf_counter() - started) / len(sample) * len(data)
+
+    started = time.perf_counter()
+    hd.combine_split_lines(data, 20)
+    vectorized_seconds = time.perf_counter() - started
+
+    print(f"\ncombine 200k fragments: loop ~{loop_seconds:.1f}s (extrapolated), "
+          f"vectorized {vectorized_seconds:.2f}s")
+    assert vectorized_seconds * 10 < loop_seconds
+
+
+def legacy_process_descriptions(data):
+    """The loop process_commodity_descriptions_by_pixels used before: one level per distinct X."""
+    data = data.sort_values(by=['Page', 'TopLeft_Y'])
+    x_values = sorted(data['TopLeft_X'].unique())
+    x_level_map = {x: level for level, x in enumerate(x_values)}
+    current_texts = [None] * len(x_values)
+    data['Is Parent'] = False
+    corrected_descriptions = hd.apply_advanced_ocr_corrections_series(data['Commodity Description'])
+    for idx, row in data.iterrows():
+        description = str(row['Commodity Description']).strip() if pd.notna(row['Commodity Description']) else ''
+        if not description:
+            continue
+        description = corrected_descriptions.at[idx]
+        x_coord = row['TopLeft_X']
+        level = x_level_map[x_coord]
+        current_texts[level] = description
+        for i in range(level + 1, len(current_texts)):
+            current_texts[i] = None
+        is_parent = (description.endswith(':') or level == 0 or x_coord < 100 or
+                     any(pattern in description.lower() for pattern in
+                         ['cattle', 'sheep', 'lambs', 'animals', 'live', 'meat', 'poultry',
+                          'fresh', 'chilled', 'frozen', 'prepared', 'preserved']))
+        data.at[idx, 'Is Parent'] = is_parent
+        if not is_parent and level != 0:
+            relevant_parents = []
+            for i in range(level):
+                if current_texts[i] and current_texts[i] != description:
+                    parent_text = current_texts[i].rstrip(':').strip()
+                    if parent_text and not hd.is_noise_text(parent_text):
+                        relevant_parents.append(parent_text)
+            if relevant_parents and not description.startswith(relevant_parents[-1]):
+                description = f"{relevant_parents[-1]}: {description}"
+        data.at[idx, 'Commodity Description'] = description
+    result = data[(~data['Is Parent']) |
+                  (data['Is Parent'] & data['Commodity Description'].str.contains(':', na=False))].copy()
+    return result.drop(columns=['Is Parent'])
+
+
+def outline_rows(count, seed=0, jitter=0):
+    """Description lines of a nested schedule: indents 480/515/550/590 plus up to jitter px of OCR noise."""
+    rng = np.random.default_rng(seed)
+    texts = np.array(['Cattle:', 'Weighing less than 200 pounds', 'Cows for dairy', 'Veal', 'Fresh or chilled:',
+                      'Turkeys', 'Dead, dressed:', 'Chickens and guineas', '', None, 'Goat meat', 'Ducks'], dtype=object)
+    return pd.DataFrame({
+        'Page': np.repeat([1, 2], [count // 2, count - count // 2]),
+        'TopLeft_X': rng.choice([480, 515, 550, 590], size=count) + rng.integers(0, jitter + 1, size=count),
+        'TopLeft_Y': rng.permutation(count) * 30,
+        'Commodity Description': texts[rng.integers(0, len(texts), size=count)],
+        'Commodity Number': '0010600',
+    })
+
+
+def test_hierarchy_matches_distinct_x_levels_without_tolerance():
+    for seed in range(40):
+        data = outline_rows(60, seed, jitter=6)
+        expected = legacy_process_descriptions(data)
+        actual = hd.process_commodity_descriptions_by_pixels(data, indent_tolerance=0)
+        # Top-level lines with nothing under them are kept as leaves; they were dropped as parents
+        extra = actual.index.difference(expected.index)
+        assert (actual.loc[extra, 'Indent Level'] == 0).all()
+        assert not actual.loc[extra, 'Commodity Description'].str.endswith(':').any()
+        pd.testing.assert_frame_equal(actual.drop(index=extra, columns=['Indent Level']), expected)
+
+
+def test_hierarchy_clusters_jittered_indents():
+    data = pd.DataFrame({
+        'Page': 1,
+        'TopLeft_X': [480, 514, 517, 512, 481, 552, 547, 590, 586],
+        'TopLeft_Y': [100, 130, 160, 190, 220, 250, 280, 310, 340],
+        'Commodity Description': ['Birds, wild:', 'Turkeys, dressed', 'Ducks', 'Geese', 'Fish, n.s.p.f.:',
+                                  'Dead, dressed:', 'Cod', 'Salted', 'Smoked'],
+        'Commodity Number': '0010600',
+    })
+    result = hd.process_commodity_descriptions_by_pixels(data)
+    assert result['Indent Level'].tolist() == [0, 1, 1, 1, 0, 2, 2, 3, 3]
+    # 'Cod' is a sibling of 'Dead, dressed:' and closes it; one-word lines are not used as parents
+    assert result['Commodity Description'].tolist() == [
+        'Birds, wild:', 'Birds, wild: Turkeys, dressed', 'Birds, wild: Ducks', 'Birds, wild: Geese', 'Fish, n.s.p.f.:',
+        'Dead, dressed:', 'Fish, n.s.p.f.: Cod', 'Fish, n.s.p.f.: Salted', 'Fish, n.s.p.f.: Smoked']
+    # One level per distinct X: 'Turkeys, dressed' (514) became the parent of 'Ducks' (517)
+    legacy = legacy_process_descriptions(data)
+    assert legacy['Commodity Description'].tolist()[2] == 'Turkeys, dressed: Ducks'
+
+
+def test_sample_page_keeps_every_commodity_description():
+    words = enhanced_clean.classify_words(enhanced_clean.load_and_preprocess(FIXTURE_OCR_CSV))
+    final_table = commodity_number02.new_final_table(commodity_number02.extract_commodity_numbers(words))
+    combined = hd.combine_split_lines(words[words['Commodity Description'].notna() & (words['Commodity Description'] != '')])
+
+    def described(indent_tolerance):
+        hierarchy = hd.process_commodity_descriptions_by_pixels(combined.copy(), indent_tolerance=indent_tolerance)
+        return hd.add_descriptions(hierarchy, final_table.copy(), words)[1]
+
+    per_x, clustered = described(0), described(hd.INDENT_TOLERANCE)
+    assert len(per_x) > 0
+    assert per_x.index.difference(clustered.index).empty
+    # 'Goats.-' starts level 0 once 476-483 are one level, and has nothing under it
+    assert any(description.startswith('Goats') for description in clustered)
+
+
+def test_indent_levels_are_added_to_the_words_table():
+    data = pd.DataFrame({
+        'Page': 1,
+        'TopLeft_X': [10, 50, 70, 90, 300, 12, 50],
+        'TopLeft_Y': [100, 110, 115, 120, 150, 200, 210],
+        'Commodity Description': ['Cattle', ' weighing less', 'than 200 pounds', 'each', np.nan, 'Hogs:', 'live'],
+        'Commodity Number': '0010600',
+    }, index=[5, 6, 7, 8, 9, 10, 11])
+    words = hd.add_indent_levels(data)
+    # Continuation words take the level of the line they are merged into
+    assert words['Indent Level'].tolist() == [0, 0, 0, 0, pd.NA, 0, 1]
+    assert words.index.equals(data.index) and str(words['Indent Level'].dtype) == 'Int64'
+
+    # The same levels as the hierarchy gives the combined lines, on the sample page too
+    for data in [data, enhanced_clean.classify_words(enhanced_clean.load_and_preprocess(FIXTURE_OCR_CSV))]:
+        words = hd.add_indent_levels(data)
+        line_starts = words[hd.has_description(data)].reset_index(drop=True)
+        line_starts = line_starts[~hd.continuation_lines(line_starts)].reset_index(drop=True)
+        hierarchy = hd.process_commodity_descriptions_by_pixels(hd.combine_split_lines(data[hd.has_description(data)]))
+        assert hierarchy['Indent Level'].tolist() == line_starts.loc[hierarchy.index, 'Indent Level'].tolist()
+
+
+@pytest.mark.benchmark
+def test_hierarchy_benchmark():
+    """Thousands of lines whose jittered indents made thousands of levels."""
+    data = outline_rows(20_000, seed=3, jitter=8)
+    sample = data.iloc[:2_000]
+
+    started = time.perf_counter()
+    legacy_process_descriptions(sample)
+    loop_seconds = (time.perf_counter() - started) / len(sample) * len(data)
+
+    started = time.perf_counter()
+    result = hd.process_commodity_descriptions_by_pixels(data)
+    stack_seconds = time.perf_counter() - started
+
+    print(f"\nhierarchy of 20k lines: per-X levels ~{loop_seconds:.1f}s (extrapolated), "
+          f"{result['Indent Level'].max() + 1} clustered levels {stack_seconds:.2f}s")
+    assert result['Indent Level'].max() == 3
+    assert stack_seconds * 5 < loop_seconds
+
+
 def test_apply_advanced_ocr_corrections():
     corrected = hd.apply_advanced_ocr_corrections('Catt1e weighing p0unds')
     assert 'Cattle' in corrected
@@ -0,0 +1,82 @@
+import os
+import time
+import numpy as np
+import pytest
+
+from ocr_cache import OcrPageCache, normalize_ocr_result, pdf_content_hash
+
+
+@pytest.fixture
+def sample_result():
+    """Return a page result shaped like PaddleOCR's predict output."""
+    return {
+        "rec_texts": ["0010 600", "Cattle:"],
+        "rec_polys": [
+            np.array([[240, 708], [416, 706], [417, 740], [240, 742]], dtype=np.int16),
+            np.array([[480, 675], [592, 675], [592, 711], [480, 711]], dtype=np.int16),
+        ],
+        "rec_scores": [np.float32(0.9996), np.float32(0.9976)],
+    }
+
+
+def test_normalize_ocr_result_keeps_values(sample_result):
+    normalized = normalize_ocr_result(sample_result)
+    assert normalized["rec_texts"] == ["0010 600", "Cattle:"]
+    assert normalized["rec_polys"][0][0] == [240, 708]
+    assert isinstance(normalized["rec_polys"][0][0][0], int)
+    assert normalized["rec_scores"][0] == float(np.float32(0.9996))
+
+
+def test_make_key_depends_on_every_field():
+    base = OcrPageCache.make_key("abc", 28, 300, "det", "rec")
+    assert base == OcrPageCache.make_key("abc", 28, 300, "det", "rec")
+    assert base != OcrPageCache.make_key("abd", 28, 300, "det", "rec")
+    assert base != OcrPageCache.make_key("abc", 29, 300, "det", "rec")
+    assert base != OcrPageCache.make_key("abc", 28, 150, "det", "rec")
+    assert base != OcrPageCache.make_key("abc", 28, 300, "det2", "rec")
+    assert base != OcrPageCache.make_key("abc", 28, 300, "det", "rec2")
+
+
+def test_pdf_content_hash_tracks_bytes(tmp_path):
+    first = tmp_path / "a.pdf"
+    second = tmp_path / "b.pdf"
+    first.write_bytes(b"%PDF-1.4 one")
+    second.write_bytes(b"%PDF-1.4 one")
+    assert pdf_content_hash(first) == pdf_content_hash(second)
+    second.write_bytes(b"%PDF-1.4 two")
+    assert pdf_content_hash(first) != pdf_content_hash(second)
+
+
+def test_cache_round_trip_and_counters(tmp_path, sample_result):
+    cache = OcrPageCache(str(tmp_path / "cache"))
+    key = OcrPageCache.make_key("abc", 28, 300, "det", "rec")
+
+    assert cache.get(key) is None
+    cache.put(key, normalize_ocr_result(sample_result))
+    assert cache.get(key) == normalize_ocr_result(sample_result)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A fresh cache over the same directory sees the stored page
+    reopened = OcrPageCache(str(tmp_path / "cache"))
+    assert reopened.get(key) is not None
+
+
+def test_cache_evicts_least_recently_used(tmp_path, sample_result):
+    results = normalize_ocr_result(sample_result)
+    probe = OcrPageCache(str(tmp_path / "probe"))
+    probe.put("probe", results)
+    entry_size = os.path.getsize(os.path.join(probe.cache_dir, "probe.json"))
+
+    cache = OcrPageCache(str(tmp_path / "cache"), max_bytes=entry_size * 2)
+    cache.put("first", results)
+    time.sleep(0.01)
+    cache.put("second", results)
+    time.sleep(0.01)
+    cache.get("first")  # first is now more recent than second
+    time.sleep(0.01)
+    cache.put("third", results)
+
+    assert cache.evictions == 1
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from ocr_shards import ShardManifest, merge_shards, plan_shards
+
+
+def test_plan_shards_covers_the_range():
+    assert plan_shards(1, 10, 4) == [(1, 4), (5, 8), (9, 10)]
+    assert plan_shards(28, 28, 50) == [(28, 28)]
+    assert plan_shards(3, 7, 0) == [(3, 7)]
+
+
+def test_manifest_round_trip_and_settings_check(tmp_path):
+    config = {"pdf_hash": "abc", "start_page": 1, "end_page": 4, "shard_size": 2}
+    shards = plan_shards(1, 4, 2)
+    manifest = ShardManifest(str(tmp_path), config)
+    pd.DataFrame({"Word": ["a"], "Page": [1]}).to_csv(manifest.shard_path(1, 2), index=False)
+    manifest.mark_complete(1, 2, rows=1)
+
+    reloaded = ShardManifest.load(str(tmp_path), config)
+    assert reloaded.is_complete(1, 2)
+    assert reloaded.first_incomplete_page(shards) == 3
+
+    other = ShardManifest.load(str(tmp_path), dict(config, pdf_hash="def"))
+    assert other.completed == {}, "Shards from a different PDF must not be reused."
+
+
+def test_manifest_drops_shards_whose_csv_is_gone(tmp_path):
+    config = {"pdf_hash": "abc"}
+    manifest = ShardManifest(str(tmp_path), config)
+    manifest.mark_complete(1, 2, rows=0)
+    assert not ShardManifest.load(str(tmp_path), config).is_complete(1, 2)
+
+
+def test_merge_shards_in_page_order(tmp_path):
+    manifest = ShardManifest(str(tmp_path / "shards"), {})
+    shards = plan_shards(1, 5, 2)
+    for first_page, last_page in reversed(shards):
+        pages = list(range(first_page, last_page + 1))
+        pd.DataFrame({"Word": [f"w{p}" for p in pages], "Page": pages}).to_csv(
+            manifest.shard_path(first_page, last_page), index=False)
+        manifest.mark_complete(first_page, last_page, rows=len(pages))
+
+    output_csv = tmp_path / "merged.csv"
+    assert merge_shards(manifest, shards, str(output_csv)) == 5
+    merged = pd.read_csv(output_csv)
+    assert merged["Page"].tolist() == [1, 2, 3, 4, 5]
+    assert merged["Word"].tolist() == ["w1", "w2", "w3", "w4", "w5"]
+
+
+def test_merge_to_parquet_keeps_words_that_look_like_missing_values(tmp_path):
+    manifest = ShardManifest(str(tmp_path / "shards"), {})
+    words = ["NA", "null", "None", "nan", "N/A", "", "Cattle"]
+    pd.DataFrame({"Word": words, "TopLeft_X": [10, 20, 30, 40, 50, 60, None], "Confidence": 0.9, "Page": 1}).to_csv(
+        manifest.shard_path(1, 1), index=False)
+    manifest.mark_complete(1, 1, rows=len(words))
+
+    output_path = tmp_path / "merged.parquet"
+    assert merge_shards(manifest, [(1, 1)], str(output_path)) == len(words)
+    merged = pd.read_parquet(output_path)
+    # Empty words are missing, as in every typed table (table_schema.cast_to_schema)
+    assert merged["Word"].fillna("<missing>").tolist() == ["NA", "null", "None", "nan", "N/A", "<missing>", "Cattle"]
+    assert merged["TopLeft_X"].isna().tolist() == [False] * 6 + [True]
+    assert str(merged["Page"].dtype) == "Int64"
+
+
+def test_merge_refuses_incomplete_runs(tmp_path):
+    manifest = ShardManifest(str(tmp_path), {})
+    with pytest.raises(RuntimeError):
+        merge_shards(manifest, [(1, 2)], str(tmp_path / "merged.csv"))
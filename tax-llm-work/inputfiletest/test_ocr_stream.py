@@ -0,0 +1,59 @@
+import threading
+import time
+import pytest
+
+from ocr_stream import run_page_pipeline
+
+
+def test_run_page_pipeline_writes_in_page_order():
+    written = []
+    run_page_pipeline(
+        [3, 1, 2, 5],
+        render=lambda page: f"image-{page}",
+        recognize=lambda image: image.upper(),
+        write=lambda page, result: written.append((page, result)),
+        render_queue_depth=1,
+        write_queue_depth=1,
+    )
+    assert written == [(3, "IMAGE-3"), (1, "IMAGE-1"), (2, "IMAGE-2"), (5, "IMAGE-5")]
+
+
+def test_run_page_pipeline_bounds_rendered_pages_in_flight():
+    """The renderer may not run further ahead of OCR than the queue depth allows."""
+    lock = threading.Lock()
+    in_flight = {'now': 0, 'peak': 0}
+
+    def render(page):
+        with lock:
+            in_flight['now'] += 1
+            in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+        return page
+
+    def recognize(image):
+        time.sleep(0.01)  # slow OCR so the renderer fills the queue
+        with lock:
+            in_flight['now'] -= 1
+        return image
+
+    run_page_pipeline(range(20), render, recognize, lambda page, result: None,
+                      render_queue_depth=2, write_queue_depth=2)
+    # queued pages + one being recognized + one rendered and waiting to be queued
+    assert in_flight['peak'] <= 2 + 2
+
+
+@pytest.mark.parametrize("failing_stage", ["render", "recognize", "write"])
+def test_run_page_pipeline_reraises_stage_errors(failing_stage):
+    def maybe_fail(stage, value):
+        if stage == failing_stage and value == 2:
+            raise ValueError(f"{stage} failed")
+        return value
+
+    with pytest.raises(ValueError, match=f"{failing_stage} failed"):
+        run_page_pipeline(
+            range(10),
+            render=lambda page: maybe_fail("render", page),
+            recognize=lambda image: maybe_fail("recognize", image),
+            write=lambda page, result: maybe_fail("write", result),
+            render_queue_depth=1,
+            write_queue_depth=1,
+        )
@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+from ocr_writer import OcrRowWriter, output_format
+
+COLUMNS = ["Word", "Confidence", "TopLeft_X", "Page"]
+
+
+def page_frame(page, words):
+    return pd.DataFrame({"Word": words, "Confidence": [0.9] * len(words),
+                         "TopLeft_X": list(range(len(words))), "Page": [page] * len(words)})
+
+
+def test_output_format_from_extension():
+    assert output_format("out/ocr_word_coords.csv") == "csv"
+    assert output_format("out/ocr_word_coords.parquet") == "parquet"
+
+
+def test_csv_writer_appends_pages(tmp_path):
+    path = tmp_path / "words.csv"
+    with OcrRowWriter(str(path), COLUMNS) as writer:
+        writer.write_batch(page_frame(1, ["a", "b"]))
+        writer.write_batch(page_frame(2, []))
+        writer.write_batch(page_frame(3, ["c"]))
+        assert not path.exists(), "Rows go to a .part file until the writer is closed."
+    assert writer.rows_written == 3
+
+    expected = pd.concat([page_frame(1, ["a", "b"]), page_frame(3, ["c"])], ignore_index=True)
+    pd.testing.assert_frame_equal(pd.read_csv(path), expected)
+
+
+def test_csv_writer_without_rows_writes_header(tmp_path):
+    path = tmp_path / "words.csv"
+    with OcrRowWriter(str(path), COLUMNS):
+        pass
+    assert list(pd.read_csv(path).columns) == COLUMNS
+
+
+def test_writer_discards_partial_output_on_error(tmp_path):
+    path = tmp_path / "words.csv"
+    with pytest.raises(RuntimeError):
+        with OcrRowWriter(str(path), COLUMNS) as writer:
+            writer.write_batch(page_frame(1, ["a"]))
+            raise RuntimeError("OCR crashed")
+    assert os.listdir(tmp_path) == []
+
+
+def test_parquet_writer_writes_one_row_group_per_page(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "words.parquet"
+    with OcrRowWriter(str(path), COLUMNS) as writer:
+        writer.write_batch(page_frame(1, ["a", "b"]))
+        writer.write_batch(page_frame(2, ["c"]))
+
+    assert pq.ParquetFile(path).num_row_groups == 2
+    df = pd.read_parquet(path)
+    assert df["Word"].tolist() == ["a", "b", "c"]
+    assert df["Page"].tolist() == [1, 1, 2]
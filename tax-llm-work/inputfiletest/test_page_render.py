@@ -0,0 +1,130 @@
+import gc
+import time
+import numpy as np
+import pytest
+import fitz  # PyMuPDF
+
+from page_render import (
+    PageBufferPool,
+    find_content_region,
+    pixmap_to_ndarray,
+    render_page_image,
+    render_page_pixmap,
+)
+
+
+@pytest.fixture
+def sample_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "0010 600 Cattle: Weighing less than 200 pounds each")
+    yield page
+    doc.close()
+
+
+def legacy_render(page, dpi):
+    """The original pix.samples -> PIL.Image -> np.array conversion."""
+    Image = pytest.importorskip("PIL.Image")
+    pix = page.get_pixmap(dpi=dpi)
+    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return np.array(image)
+
+
+def test_pixmap_to_ndarray_is_a_view(sample_page):
+    pix = sample_page.get_pixmap(dpi=72)
+    view = pixmap_to_ndarray(pix)
+    assert view.shape == (pix.height, pix.width, 3)
+    assert view.dtype == np.uint8
+    assert not view.flags['OWNDATA']
+    np.testing.assert_array_equal(view, legacy_render(sample_page, 72))
+
+
+def test_pixmap_view_keeps_the_pixmap_alive(sample_page):
+    view = pixmap_to_ndarray(sample_page.get_pixmap(dpi=150))
+    expected = legacy_render(sample_page, 150)
+    # Allocate and free other pixmaps so a freed sample buffer would be reused
+    for _ in range(20):
+        sample_page.get_pixmap(dpi=150, alpha=True)
+    gc.collect()
+    assert not view.flags['OWNDATA']
+    np.testing.assert_array_equal(view, expected)
+
+
+def test_render_page_image_matches_legacy_conversion(sample_page):
+    image, origin = render_page_image(sample_page, dpi=100)
+    assert origin == (0, 0)
+    np.testing.assert_array_equal(image, legacy_render(sample_page, 100))
+
+
+def test_page_buffer_pool_reuses_matching_shapes(sample_page):
+    pool = PageBufferPool(capacity=2)
+    first = render_page_image(sample_page, dpi=100, buffers=pool)[0]
+    second = render_page_image(sample_page, dpi=100, buffers=pool)[0]
+    third = render_page_image(sample_page, dpi=100, buffers=pool)[0]
+    assert first is not second
+    assert third is first  # ring wrapped around
+    assert (pool.allocations, pool.reuses) == (2, 1)
+
+    # A different page size gets its own buffers
+    render_page_image(sample_page, dpi=72, buffers=pool)
+    assert pool.allocations == 3
+    np.testing.assert_array_equal(third, legacy_render(sample_page, 100))
+
+
+def test_render_benchmark_against_legacy_conversion(sample_page):
+    """Per-page conversion time at 300 DPI: PIL round trip vs a single copy into a reused buffer."""
+    pytest.importorskip("PIL.Image")
+    pages = 5
+    pool = PageBufferPool(capacity=1)
+
+    started = time.perf_counter()
+    for _ in range(pages):
+        legacy_render(sample_page, 300)
+    legacy_seconds = (time.perf_counter() - started) / pages
+
+    started = time.perf_counter()
+    for _ in range(pages):
+        render_page_image(sample_page, 300, pool)
+    pooled_seconds = (time.perf_counter() - started) / pages
+
+    print(f"\nPer-page render+convert at 300 DPI: legacy {legacy_seconds * 1000:.1f} ms, "
+          f"pooled buffer {pooled_seconds * 1000:.1f} ms")
+    assert pool.allocations == 1
+
+
+def test_find_content_region_skips_blank_pages():
+    doc = fitz.open()
+    blank = doc.new_page()
+    assert find_content_region(blank) is None
+    assert render_page_pixmap(blank, dpi=300, adaptive=True) is None
+    doc.close()
+
+
+def test_find_content_region_bounds_the_text(sample_page):
+    region = find_content_region(sample_page)
+    text_bounds = fitz.Rect()
+    for x0, y0, x1, y1, *_ in sample_page.get_text("words"):
+        text_bounds |= fitz.Rect(x0, y0, x1, y1)
+    assert region is not None
+    assert region.contains(text_bounds)
+    assert region.get_area() < sample_page.rect.get_area() / 4
+
+
+def test_adaptive_render_lines_up_with_full_page_frame(sample_page):
+    """The clipped render, placed at (pix.x, pix.y), matches the same area of the full render."""
+    full_pix = sample_page.get_pixmap(dpi=300)
+    full = pixmap_to_ndarray(full_pix)
+    pix = render_page_pixmap(sample_page, dpi=300, adaptive=True)
+    clipped = pixmap_to_ndarray(pix)
+    assert (pix.x, pix.y) != (0, 0)
+    crop = full[pix.y:pix.y + pix.height, pix.x:pix.x + pix.width]
+    assert crop.shape == clipped.shape
+    assert np.abs(crop.astype(int) - clipped.astype(int)).mean() < 1.0
+
+    # render_page_image copies the same region out and reports the same origin
+    image, origin = render_page_image(sample_page, dpi=300, adaptive=True)
+    assert origin == (pix.x, pix.y)
+    np.testing.assert_array_equal(image, clipped)
+    blank = fitz.open()
+    assert render_page_image(blank.new_page(), dpi=300, adaptive=True) == (None, (0, 0))
+    blank.close()
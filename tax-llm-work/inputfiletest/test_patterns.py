@@ -0,0 +1,107 @@
+import random
+import re
+import time
+
+import pytest
+
+import patterns
+from patterns import FirstMatchPattern, NOISE, NOISE_PATTERNS, RATE, RATE_PATTERNS, UNIT, UNIT_PATTERNS
+
+
+def first_match_loop(pattern_list, text, flags=re.IGNORECASE):
+    """The per-pattern loop the stages used before the registry."""
+    for pattern in pattern_list:
+        match = re.search(pattern, text, flags)
+        if match:
+            return match
+    return None
+
+
+RATE_TOKENS = ['12%', '12½%', '12%%1', 'Free', 'free.', '$12', '$1.50', '2.5%', '2y21b', '31b', '1½',
+               '3¢', '2t', '8plb', '4each', '$3 each', 'lb', 'per', '$', '%', '5', 'x', ' ']
+UNIT_TOKENS = ['lb', 'lbs', 'pounds', 'kg', 'tons', 'gal', 'qt', 'pint', 'oz', 'cu ft', 'cubic feet',
+               'sq ft', 'linear feet', 'lin ft', 'yd', 'm', 'meter', 'each', 'ea', 'doz', 'gross', 'cases',
+               'box', 'bag', 'bales', 'bundle', 'head', 'hd', 'no', 'number', 'cattle', 'of', 'the', '12', ' ']
+
+
+def random_texts(tokens, count, seed):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(tokens) for _ in range(rng.randint(0, 6))) for _ in range(count)]
+
+
+def test_first_match_pattern_matches_ordered_loop():
+    for pattern, pattern_list, tokens in [(RATE, RATE_PATTERNS, RATE_TOKENS), (UNIT, UNIT_PATTERNS, UNIT_TOKENS)]:
+        for text in random_texts(tokens, 3000, seed=13) + random_texts(tokens, 500, seed=14):
+            expected = first_match_loop(pattern_list, text)
+            actual = pattern.search(text)
+            if expected is None:
+                assert actual is None, text
+            else:
+                assert actual is not None, text
+                assert (actual.group(0), actual.start(), actual.groups()) == \
+                    (expected.group(0), expected.start(), expected.groups()), text
+
+
+def test_first_match_pattern_keeps_list_priority():
+    # The dollar amount starts further left, but the percentage pattern comes first in the list
+    assert RATE.search('$12%').group(0) == '12%'
+    assert RATE.search('2t then 5%').group(0) == '5%'
+    assert UNIT.search('12 each per lb').group(0) == 'lb'
+    assert RATE.search('no rate here') is None
+    assert list(FirstMatchPattern([r'a', r'b'])) == [r'a', r'b']
+
+
+def test_noise_matches_any_pattern_at_start():
+    samples = ['SCHEDULE A', 'schedule a commodity', 'Group 00 - ANIMALS', '12345', '---', 'CATTLE',
+               'Cattle, weighing less than 200 lb', 'Meat: fresh', 'Rate of duty 1930', 'see TARIFF', '']
+    for text in samples:
+        expected = any(re.match(pattern, text, re.IGNORECASE) for pattern in NOISE_PATTERNS)
+        assert (NOISE.match(text) is not None) == expected, text
+
+
+def test_digit_context_pattern_matches_separate_substitutions():
+    for text in ['O01O6OO', 'lO5l', 'SS5', '5S', 'S5', 'ABC', '1I1', 'IOI', '']:
+        for char in 'OIlS':
+            expected = re.sub(rf'(?<=\d){char}(?=\d)', '0', text)
+            expected = re.sub(rf'^{char}(?=\d)', '0', expected)
+            expected = re.sub(rf'(?<=\d){char}$', '0', expected)
+            assert patterns.digit_context_pattern(char).sub('0', text) == expected
+
+
+@pytest.mark.benchmark
+def test_per_word_classification_benchmark():
+    """Per-word cost of the inline regex loops against the compiled registry."""
+    words = random_texts(RATE_TOKENS + UNIT_TOKENS + ['0010 600', '0010600', '1530(b)', '701'], 20_000, seed=5)
+
+    def inline(word):
+        if re.fullmatch(r'\d{4}\s*\d{3}', word):
+            return 'commodity_number'
+        if re.fullmatch(r'\d{3,4}(?:\([a-zA-Z]\))?', word):
+            return 'tariff_paragraph'
+        rate = first_match_loop(RATE_PATTERNS, word)
+        unit = first_match_loop(UNIT_PATTERNS, word)
+        noise = any(re.match(pattern, word, re.IGNORECASE) for pattern in NOISE_PATTERNS)
+        return rate and rate.group(0), unit and unit.group(0), noise
+
+    def registry(word):
+        if patterns.COMMODITY_NUMBER.fullmatch(word):
+            return 'commodity_number'
+        if patterns.TARIFF_PARAGRAPH.fullmatch(word):
+            return 'tariff_paragraph'
+        rate = RATE.search(word)
+        unit = UNIT.search(word)
+        noise = NOISE.match(word) is not None
+        return rate and rate.group(0), unit and unit.group(0), noise
+
+    timings = {}
+    for name, classify in [('inline', inline), ('registry', registry)]:
+        start = time.perf_counter()
+        results = [classify(word) for word in words]
+        timings[name] = time.perf_counter() - start
+        timings[name + '_results'] = results
+
+    assert timings['registry_results'] == timings['inline_results']
+    per_word = {name: timings[name] / len(words) * 1e6 for name in ('inline', 'registry')}
+    print(f"\nPer-word classification: inline {per_word['inline']:.1f} us, "
+          f"registry {per_word['registry']:.1f} us ({timings['inline'] / timings['registry']:.1f}x)")
+    assert timings['registry'] < timings['inline']
@@ -0,0 +1,109 @@
+import os
+
+import pandas as pd
+import pytest
+
+import commodity_number02
+import enhanced_clean
+import hierarchical_description03
+import pipeline
+import rate_of_duty05
+import tarrif_para06
+import unit_of_quantity04
+from table_schema import read_table, write_table, OCR_WORDS_DTYPES
+from word_index import WordIndex
+
+pytest.importorskip("pyarrow")
+
+FIXTURE_OCR_CSV = os.path.join(os.path.dirname(__file__), '..', 'output', 'ocr_word_coords.csv')
+
+
+def point_stages_at(monkeypatch, directory):
+    """Point every stage's input and output paths into directory, as the scripts' config would."""
+    ocr = os.path.join(directory, 'ocr_word_coords.parquet')
+    clean = os.path.join(directory, 'cleaned_classified_words.parquet')
+    final = os.path.join(directory, 'final-table.parquet')
+    write_table(pd.read_csv(FIXTURE_OCR_CSV), ocr, OCR_WORDS_DTYPES)
+    monkeypatch.setattr(enhanced_clean, 'INPUT_CSV', ocr)
+    monkeypatch.setattr(enhanced_clean, 'OUTPUT_CSV', clean)
+    monkeypatch.setattr(commodity_number02, 'CLEAN_CSV', clean)
+    monkeypatch.setattr(commodity_number02, 'OUTPUT_CSV', final)
+    monkeypatch.setattr(hierarchical_description03, 'INPUT_CSV', clean)
+    monkeypatch.setattr(hierarchical_description03, 'FINAL_TABLE_CSV', final)
+    monkeypatch.setattr(hierarchical_description03, 'OUTPUT_TXT', os.path.join(directory, 'formatted_commodities.txt'))
+    for module in (unit_of_quantity04, rate_of_duty05):
+        monkeypatch.setattr(module, 'CLEAN_CSV', clean)
+        monkeypatch.setattr(module, 'FINAL_CSV', final)
+    monkeypatch.setattr(tarrif_para06, 'OCR_CSV', clean)
+    monkeypatch.setattr(tarrif_para06, 'FINAL_CSV', final)
+    monkeypatch.setattr(tarrif_para06, 'FINAL_EXPORT_CSV', os.path.join(directory, 'final-table.csv'))
+    return clean, final
+
+
+def read_outputs(directory):
+    with open(os.path.join(directory, 'formatted_commodities.txt'), encoding='utf-8') as f:
+        descriptions = f.read()
+    return (read_table(os.path.join(directory, 'cleaned_classified_words.parquet')),
+            read_table(os.path.join(directory, 'final-table.parquet')),
+            pd.read_csv(os.path.join(directory, 'final-table.csv')),
+            descriptions)
+
+
+def test_in_process_run_matches_stage_scripts(tmp_path, monkeypatch):
+    scripts_dir, runner_dir = tmp_path / 'scripts', tmp_path / 'runner'
+    os.makedirs(scripts_dir)
+    os.makedirs(runner_dir)
+
+    point_stages_at(monkeypatch, str(scripts_dir))
+    enhanced_clean.main()
+    commodity_number02.main()
+    hierarchical_description03.main()
+    unit_of_quantity04.main()
+    rate_of_duty05.main()
+    tarrif_para06.main()
+
+    point_stages_at(monkeypatch, str(runner_dir))
+    context = pipeline.run_pipeline(skip=['ocr'])
+
+    expected, actual = read_outputs(str(scripts_dir)), read_outputs(str(runner_dir))
+    pd.testing.assert_frame_equal(actual[0], expected[0])
+    assert actual[0]['Indent Level'].notna().any()  # saved by the hierarchy stage for the later stages
+    pd.testing.assert_frame_equal(actual[1], expected[1])
+    pd.testing.assert_frame_equal(actual[2], expected[2])
+    assert actual[3] == expected[3]
+    pd.testing.assert_frame_equal(context.final_table, expected[1])
+    assert list(context.timings) == ['cleaning', 'commodity', 'hierarchy', 'units', 'rates', 'tariff', 'save']
+
+
+def test_skipped_stages_read_tables_from_disk_and_checkpoints_save(tmp_path, monkeypatch):
+    clean, final = point_stages_at(monkeypatch, str(tmp_path))
+    later_stages = ['hierarchy', 'units', 'rates', 'tariff']
+
+    saved = []
+    monkeypatch.setattr(pipeline, 'write_table', lambda df, path, dtypes=None: saved.append(path) or write_table(df, path, dtypes))
+    pipeline.run_pipeline(skip=['ocr'] + later_stages, checkpoints=['cleaning'])
+    # The checkpoint saves the words table; the end of the run saves only the new final table
+    assert saved == [clean, final]
+
+    # A run that starts after cleaning picks up the tables written above
+    context = pipeline.run_pipeline(skip=['ocr', 'cleaning', 'commodity'])
+    assert context.words is not None and len(context.final_table) == len(read_table(final))
+    assert (context.final_table['TARIFF PARAGRAPH'] != '').any()
+
+
+def test_stages_share_one_word_index(tmp_path, monkeypatch):
+    point_stages_at(monkeypatch, str(tmp_path))
+    built = []
+
+    def counting_index(words):
+        built.append(len(words))
+        return WordIndex(words)
+
+    def no_stage_index(words):
+        raise AssertionError("a stage indexed the words table itself")
+
+    monkeypatch.setattr(pipeline, 'WordIndex', counting_index)
+    for module in (hierarchical_description03, unit_of_quantity04, rate_of_duty05):
+        monkeypatch.setattr(module, 'WordIndex', no_stage_index)
+    context = pipeline.run_pipeline(skip=['ocr'])
+    assert built == [len(context.words)]
@@ -5,7 +5,12 @@ import tempfile
 import os
 import re
 
+import numpy as np
+
 import rate_of_duty05 as rd
+from commodity import parse_commodity_numbers
+
+FIXTURE_CLEAN_CSV = os.path.join(os.path.dirname(__file__), '..', 'output', 'cleaned_classified_words.csv')
 
 @pytest.fixture
 def sample_data():
@@ -103,5 +108,72 @@ def test_add_rates(sample_data):
         assert updated_final['RATE OF DUTY 1930'].iloc[0] != ''
         assert updated_final['RATE OF DUTY TRADE AGREEMENT'].iloc[0] != ''
 
+def legacy_standalone_rates(df_clean):
+    """The original nested loop: every rate word scans every commodity row."""
+    rates_1930, rates_trade = {}, {}
+    for _, row in df_clean.iterrows():
+        if pd.notna(row['Commodity Number']) and str(row['Commodity Number']).strip():
+            continue
+        rate = rd.extract_rates_from_text(str(row.get('Commodity Description', '')).strip())
+        if not rate:
+            continue
+        nearest_commodity, min_distance = None, float('inf')
+        for _, commodity_row in df_clean.iterrows():
+            if pd.notna(commodity_row['Commodity Number']) and str(commodity_row['Commodity Number']).strip():
+                distance = abs(row['TopLeft_Y'] - commodity_row['TopLeft_Y'])
+                if distance < min_distance and distance <= 50:
+                    min_distance = distance
+                    nearest_commodity = str(commodity_row['Commodity Number']).strip()
+        if nearest_commodity:
+            if 1350 <= row['TopLeft_X'] <= 1700:
+                rates_1930[nearest_commodity] = (rates_1930[nearest_commodity] + f" {rate}") if nearest_commodity in rates_1930 else rate
+            elif 1700 <= row['TopLeft_X'] <= 2150:
+                rates_trade[nearest_commodity] = (rates_trade[nearest_commodity] + f" {rate}") if nearest_commodity in rates_trade else rate
+    return rates_1930, rates_trade
+
+
+def synthetic_rate_words(seed=0, words=400):
+    rng = np.random.default_rng(seed)
+    has_commodity = rng.random(words) < 0.2
+    descriptions = rng.choice(['12%', 'Free', '$3 each', '2t', '31b', 'Cattle', 'each', '1½¢ lb', np.nan], size=words)
+    return pd.DataFrame({
+        'Page': 1,
+        'TopLeft_X': rng.integers(1200, 2200, size=words),
+        'TopLeft_Y': rng.integers(0, 3000, size=words).astype(float),
+        'Commodity Description': descriptions,
+        'Commodity Number': np.where(has_commodity, rng.integers(10000, 99999, size=words).astype(float), np.nan),
+    })
+
+
+@pytest.mark.parametrize('df_clean', [
+    pd.read_csv(FIXTURE_CLEAN_CSV), synthetic_rate_words(0), synthetic_rate_words(1)])
+def test_standalone_rates_match_legacy_nested_loop(df_clean):
+    rates_1930, rates_trade = {}, {}
+    rd.add_standalone_rates(df_clean, rates_1930, rates_trade)
+    legacy_1930, legacy_trade = legacy_standalone_rates(df_clean)
+    # The legacy maps are keyed by the commodity number text ("10600.0")
+    assert rates_1930 == dict(zip(parse_commodity_numbers(list(legacy_1930)), legacy_1930.values()))
+    assert rates_trade == dict(zip(parse_commodity_numbers(list(legacy_trade)), legacy_trade.values()))
+
+
+def test_rate_rows_are_grouped_per_page():
+    # Two pages with a commodity row at the same height; within 30 px these were one row group across pages
+    df_clean = pd.DataFrame({
+        'Page': [1, 1, 2, 2],
+        'TopLeft_X': [240, 1400, 240, 1400],
+        'TopLeft_Y': [100.0, 105.0, 110.0, 115.0],
+        'Commodity Description': [np.nan] * 4,
+        'Commodity Number': ['0010600', np.nan, '0010700', np.nan],
+        'Rate of Duty 1930': [np.nan, '2t', np.nan, '3t'],
+        'Rate of Duty Trade Agreement': [np.nan] * 4,
+    })
+    final = pd.DataFrame({'SCHEDULE A COMMODITY NUMBER': ['0010600', '0010700'],
+                          'RATE OF DUTY 1930': '', 'RATE OF DUTY TRADE AGREEMENT': ''})
+    rates = rd.assign_rates(df_clean, final.copy())['RATE OF DUTY 1930'].tolist()
+    assert rates == ['2¢', '3¢']
+    # Without a page column the rows still group across pages
+    rates = rd.assign_rates(df_clean.drop(columns='Page'), final.copy())['RATE OF DUTY 1930'].tolist()
+    assert rates == ['2¢ 3¢', '']
+
 if __name__ == '__main__':
     pytest.main()
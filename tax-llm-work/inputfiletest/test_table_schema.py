@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from table_schema import CLEANED_WORDS_DTYPES, FINAL_TABLE_DTYPES, as_read_back, is_parquet_file, read_table, write_table
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def cleaned_words():
+    return pd.DataFrame({
+        "Commodity Number": ["0010600", None, "0010700"],
+        "Commodity Description": [None, "Cattle:", ""],
+        "Tariff Paragraph": [None, None, "701"],
+        "TopLeft_X": [240, 480, 240],
+        "TopLeft_Y": [708, 675, 760],
+        "Confidence": [0.99, 0.98, 0.97],
+        "Page": [28, 28, 28],
+    })
+
+
+def test_parquet_round_trip_matches_csv_round_trip(tmp_path, cleaned_words):
+    """Stages must see the same values and dtypes from Parquet as they did from CSV."""
+    parquet_path = tmp_path / "cleaned.parquet"
+    csv_path = tmp_path / "cleaned.csv"
+    write_table(cleaned_words, str(parquet_path), CLEANED_WORDS_DTYPES)
+    write_table(cleaned_words, str(csv_path), CLEANED_WORDS_DTYPES)
+    assert is_parquet_file(parquet_path) and not is_parquet_file(csv_path)
+
+    from_parquet = read_table(str(parquet_path))
+    from_csv = read_table(str(csv_path))
+    assert from_parquet["Commodity Number"].dtype == np.float64
+    np.testing.assert_array_equal(from_parquet["Commodity Number"], [10600.0, np.nan, 10700.0])
+    assert from_parquet["TopLeft_X"].dtype == np.int64
+    assert str(from_parquet.loc[0, "Commodity Description"]) == "nan", "Missing text must read back as NaN."
+    assert pd.isna(from_parquet.loc[2, "Commodity Description"]), "Empty strings are missing values, as in CSV."
+    # Text stays text: the paragraph number is not re-inferred as 701.0
+    assert from_parquet.loc[2, "Tariff Paragraph"] == "701"
+    pd.testing.assert_frame_equal(from_parquet.drop(columns="Tariff Paragraph"),
+                                  from_csv.drop(columns="Tariff Paragraph"), check_dtype=False)
+
+
+def test_final_table_keeps_formatted_commodity_numbers(tmp_path):
+    path = tmp_path / "final-table.parquet"
+    final = pd.DataFrame({column: [""] * 2 for column in FINAL_TABLE_DTYPES})
+    final["SCHEDULE A COMMODITY NUMBER"] = ["0010 600", "0106 000"]
+    write_table(final, str(path), FINAL_TABLE_DTYPES)
+
+    df = read_table(str(path))
+    assert df["SCHEDULE A COMMODITY NUMBER"].tolist() == ["0010 600", "0106 000"]
+    assert df["UNIT OF QUANTITY"].isna().all()
+    df.at[0, "UNIT OF QUANTITY"] = "No"  # text columns accept strings without dtype warnings
+    assert df["UNIT OF QUANTITY"].dtype == object
+
+
+def test_integer_columns_with_gaps_read_as_float(tmp_path):
+    path = tmp_path / "words.parquet"
+    write_table(pd.DataFrame({"TopLeft_X": [1.0, np.nan]}), str(path), CLEANED_WORDS_DTYPES)
+    assert read_table(str(path))["TopLeft_X"].dtype == np.float64
+
+
+def test_as_read_back_matches_parquet_round_trip(tmp_path, cleaned_words):
+    words = cleaned_words.set_index(pd.Index([5, 6, 7]))
+    words["TopLeft_Y"] = pd.array([708, None, 760], dtype="Int64")
+    parquet_path = str(tmp_path / "cleaned.parquet")
+    write_table(words, parquet_path, CLEANED_WORDS_DTYPES)
+    pd.testing.assert_frame_equal(as_read_back(words, CLEANED_WORDS_DTYPES), read_table(parquet_path))
+
+    final = pd.DataFrame({"SCHEDULE A COMMODITY NUMBER": ["0010 600", "0010 700"], "UNIT OF QUANTITY": ["No", ""]})
+    write_table(final, parquet_path, FINAL_TABLE_DTYPES)
+    pd.testing.assert_frame_equal(as_read_back(final, FINAL_TABLE_DTYPES), read_table(parquet_path))
+
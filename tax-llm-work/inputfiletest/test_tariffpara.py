@@ -1,4 +1,8 @@
+import random
+import time
+
 import pytest
+import numpy as np
 import pandas as pd
 from io import StringIO
 import tempfile
@@ -60,5 +64,95 @@ def test_apply_tariff_to_final_table(sample_ocr_data, sample_final_table):
         # Check that tariff paragraphs column is not empty for some rows
         assert updated_final['TARIFF PARAGRAPH'].dropna().astype(bool).any()
 
+
+
+def legacy_tariff_ranges(df):
+    """The (start_y, end_y, para_no) ranges built by the row loop apply_tariff_to_final_table used before."""
+    ranges = []
+    commodity_rows = [(str(row['Commodity Number']).strip(), row['TopLeft_Y']) for _, row in df.iterrows() if str(row['Commodity Number']).strip() and str(row['Commodity Number']).strip() != 'nan']
+    tariff_rows = [(row['TopLeft_Y'], str(row['Tariff Paragraph']).strip()) for _, row in df.iterrows() if str(row['Tariff Paragraph']).strip() and str(row['Tariff Paragraph']).strip() != 'nan']
+    commodity_idx = 0
+    last_endpoint = None
+    for mid_y, para_no in tariff_rows:
+        if last_endpoint is not None:
+            while commodity_idx < len(commodity_rows) and commodity_rows[commodity_idx][1] <= last_endpoint:
+                commodity_idx += 1
+        if commodity_idx >= len(commodity_rows):
+            break
+        _, start_y = commodity_rows[commodity_idx]
+        end_y = mid_y + (mid_y - start_y)
+        ranges.append((start_y, end_y, para_no))
+        last_endpoint = end_y
+    return ranges
+
+
+def legacy_paragraph(ranges, y):
+    for start_y, end_y, para_no in ranges:
+        if start_y <= y <= end_y:
+            return para_no
+    return ''
+
+
+def synthetic_page(rng, rows=40):
+    """One page of words in Y order: commodity numbers down the left, tariff paragraphs at irregular heights."""
+    words = []
+    y = 100
+    for i in range(rows):
+        y += rng.randint(20, 60)
+        words.append({'Commodity Number': 10000 + i * 100.0, 'TopLeft_Y': y, 'Tariff Paragraph': np.nan})
+        if rng.random() < 0.3:
+            words.append({'Commodity Number': np.nan, 'TopLeft_Y': y + rng.randint(-40, 40),
+                          'Tariff Paragraph': str(rng.choice([701, 702, 703, 1558]))})
+        if rng.random() < 0.3:
+            words.append({'Commodity Number': np.nan, 'TopLeft_Y': y + 5, 'Tariff Paragraph': np.nan})
+    return pd.DataFrame(words).sort_values('TopLeft_Y', kind='stable').reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_tariff_paragraphs_match_legacy_ranges(seed):
+    df = synthetic_page(random.Random(seed))
+    ranges = legacy_tariff_ranges(df)
+    expected = {idx: legacy_paragraph(ranges, row['TopLeft_Y'])
+                for idx, row in df.iterrows() if str(row['Commodity Number']).strip() != 'nan'}
+    assert tp.assign_tariff_paragraphs(df).to_dict() == expected
+    assert tp.extract_tariff_ranges(df) == {idx: para for idx, para in expected.items() if para}
+
+
+def test_tariff_ranges_are_keyed_by_page():
+    page = synthetic_page(random.Random(1))
+    two_pages = pd.concat([page.assign(Page=1), page.assign(Page=2)], ignore_index=True)
+    ranges = tp.tariff_ranges(two_pages)
+    assert ranges['Page'].tolist().count(1) == ranges['Page'].tolist().count(2) == len(tp.tariff_ranges(page))
+    paragraphs = tp.assign_tariff_paragraphs(two_pages)
+    # Both copies of the page get the same paragraphs despite sharing Y coordinates
+    assert paragraphs.iloc[:len(paragraphs) // 2].tolist() == paragraphs.iloc[len(paragraphs) // 2:].tolist()
+    assert tp.assign_tariff_paragraphs(page).tolist() == paragraphs.iloc[:len(paragraphs) // 2].tolist()
+
+
+@pytest.mark.benchmark
+def test_tariff_assignment_benchmark():
+    """A volume's worth of pages against the per-row loop over all ranges."""
+    rng = random.Random(2)
+    pages = [synthetic_page(rng, rows=60).assign(Page=page) for page in range(1, 301)]
+    volume = pd.concat(pages, ignore_index=True)
+
+    started = time.perf_counter()
+    paragraphs = tp.assign_tariff_paragraphs(volume)
+    vectorized = time.perf_counter() - started
+
+    sample = pages[:20]
+    started = time.perf_counter()
+    for page in sample:
+        ranges = legacy_tariff_ranges(page)
+        for _, row in page.iterrows():
+            if str(row['Commodity Number']).strip() != 'nan':
+                legacy_paragraph(ranges, row['TopLeft_Y'])
+    legacy = (time.perf_counter() - started) / len(sample) * len(pages)
+
+    print(f"\n{len(paragraphs)} commodities on {len(pages)} pages: {vectorized * 1000:.0f} ms "
+          f"(row loops, extrapolated: {legacy * 1000:.0f} ms)")
+    assert (paragraphs != '').any()
+    assert vectorized < legacy
+
 if __name__ == '__main__':
     pytest.main()
\ No newline at end of file
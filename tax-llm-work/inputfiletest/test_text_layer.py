@@ -0,0 +1,59 @@
+import fitz  # PyMuPDF
+import pytest
+
+from text_layer import has_usable_text_layer, text_layer_result
+
+
+@pytest.fixture
+def text_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "0010 600 Cattle: Weighing less than 200 pounds each")
+    page.insert_text((72, 100), "0010 700 Sheep and lambs")
+    return page
+
+
+def test_has_usable_text_layer(text_page):
+    assert has_usable_text_layer(text_page)
+
+    doc = fitz.open()
+    blank = doc.new_page()
+    assert not has_usable_text_layer(blank)
+
+    scan = doc.new_page()
+    scan.insert_image(scan.rect, pixmap=text_page.get_pixmap(dpi=72))
+    assert not has_usable_text_layer(scan), "An image-only page has no text layer."
+
+    symbols = doc.new_page()
+    symbols.insert_text((72, 72), "~~ ## ** -- ;; :: ~~ ## ** -- ;; ::")
+    assert not has_usable_text_layer(symbols)
+
+
+def test_text_layer_result_matches_ocr_schema(text_page):
+    result = text_layer_result(text_page, dpi=300)
+    assert result['rec_texts'] == ["0010 600 Cattle: Weighing less than 200 pounds each",
+                                   "0010 700 Sheep and lambs"]
+    assert result['rec_scores'] == [1.0, 1.0]
+    for poly in result['rec_polys']:
+        assert len(poly) == 4
+        assert all(isinstance(value, int) for point in poly for value in point)
+
+    # Boxes are in the 300-DPI pixel frame, not PDF points
+    (x0, y0), _, (x1, y1), _ = result['rec_polys'][0]
+    scale = 300 / 72
+    assert x0 == pytest.approx(72 * scale, abs=5)
+    assert y0 < 72 * scale < y1
+    assert x1 < text_page.rect.width * scale
+
+
+def test_text_layer_result_follows_page_rotation(text_page):
+    upright = text_layer_result(text_page, dpi=300)['rec_polys'][0]
+    text_page.set_rotation(90)
+    rotated = text_layer_result(text_page, dpi=300)['rec_polys'][0]
+
+    (x0, y0), _, (x1, y1), _ = upright
+    (rx0, ry0), _, (rx1, ry1), _ = rotated
+    # A 90 degree page shows the text running top to bottom along the right side
+    assert rx1 - rx0 == y1 - y0
+    assert ry1 - ry0 == x1 - x0
+    assert rx0 > text_page.rect.height * 300 / 72 / 2
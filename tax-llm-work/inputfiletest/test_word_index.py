@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geometry import nearest_anchor
+from word_index import WordIndex
+
+
+def random_words(pages=3, words_per_page=200, seed=0):
+    rng = np.random.default_rng(seed)
+    count = pages * words_per_page
+    df = pd.DataFrame({
+        'Page': np.repeat(np.arange(1, pages + 1), words_per_page),
+        'TopLeft_X': rng.integers(0, 2400, size=count).astype(float),
+        'TopLeft_Y': rng.integers(0, 3300, size=count).astype(float),
+        'Commodity Number': np.where(rng.random(count) < 0.1, rng.integers(10000, 99999, size=count), np.nan),
+    })
+    df.loc[rng.integers(0, count, size=5), 'TopLeft_Y'] = np.nan
+    return df.sample(frac=1, random_state=seed).set_index(np.arange(count) * 10)
+
+
+def test_nearest_values_by_page():
+    anchors = pd.DataFrame({'Commodity Number': [10600.0, 10700.0], 'TopLeft_X': [100, 100],
+                            'TopLeft_Y': [100, 100], 'Page': [1, 2]})
+    words = pd.DataFrame({'TopLeft_X': [0, 0, 0], 'TopLeft_Y': [105, 110, 400], 'Page': [2.0, 1.0, 1.0]},
+                         index=[5, 6, 7])
+    values = WordIndex(anchors).nearest_values(words, 'Commodity Number', 30)
+    assert values.index.tolist() == [5, 6, 7]
+    assert values.tolist()[:2] == [10700.0, 10600.0]
+    assert pd.isna(values[7])
+    # Without a page column on the queries, every anchor is a candidate
+    across_pages = WordIndex(anchors).nearest_values(words.drop(columns='Page'), 'Commodity Number', 30)
+    assert across_pages.tolist()[:2] == [10600.0, 10600.0]
+
+
+def test_nearest_in_y_matches_nearest_anchor():
+    words = random_words(seed=3)
+    index = WordIndex(words)
+    commodities = index.subset(words['Commodity Number'].notna())
+    anchors = commodities.words
+    expected = nearest_anchor(words['TopLeft_Y'], anchors['TopLeft_Y'], 30, words['Page'], anchors['Page'])
+    assert commodities.nearest_in_y(words, 30).tolist() == expected.tolist()
+
+
+def test_row_ids_are_numbered_per_page():
+    words = pd.DataFrame({'TopLeft_X': [0, 0, 0, 0], 'TopLeft_Y': [100, 110, 100, 500], 'Page': [1, 1, 2, 1]})
+    assert WordIndex(words).row_ids(25).tolist() == [0, 0, 2, 1]
+    assert WordIndex(words.drop(columns='Page')).row_ids(25).tolist() == [0, 0, 0, 1]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('pages', [1000])
+def test_word_index_benchmark(pages):
+    """A volume-sized words table: build once, then answer every nearest lookup and band the rows."""
+    words = random_words(pages=pages, words_per_page=500, seed=1)
+
+    started = time.perf_counter()
+    index = WordIndex(words)
+    commodities = index.subset(words['Commodity Number'].notna())
+    built = time.perf_counter() - started
+
+    started = time.perf_counter()
+    nearest = commodities.nearest_values(words, 'Commodity Number', 30)
+    nearest_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index.row_ids(30, mode='anchor')
+    row_seconds = time.perf_counter() - started
+
+    print(f"\n{len(words)} words on {pages} pages: index built in {built * 1000:.0f} ms, "
+          f"{len(words)} nearest lookups in {nearest_seconds * 1000:.0f} ms, "
+          f"rows banded in {row_seconds * 1000:.0f} ms")
+    assert nearest.notna().any()
@@ -0,0 +1,52 @@
+"""
+Read words from a PDF's embedded text layer instead of running OCR.
+
+Some scans already carry an OCR text layer. For those pages PyMuPDF's word
+extraction is exact and nearly free, so the extractor emits its lines in the
+same shape as a PaddleOCR page result: one entry per text line, with the line's
+box scaled from PDF points to the OCR render DPI.
+"""
+from typing import Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+MIN_TEXT_LAYER_CHARS = 20  # Fewer visible characters than this is not a usable text layer
+MIN_ALNUM_FRACTION = 0.5  # Garbled layers are mostly symbols and replacement characters
+TEXT_LAYER_SCORE = 1.0
+
+
+def has_usable_text_layer(page, min_chars: int = MIN_TEXT_LAYER_CHARS) -> bool:
+    """Return True when the page has enough readable embedded text to skip OCR."""
+    text = "".join(page.get_text("text").split())
+    if len(text) < min_chars:
+        return False
+    alnum = sum(ch.isalnum() for ch in text)
+    return alnum / len(text) >= MIN_ALNUM_FRACTION
+
+
+def text_layer_result(page, dpi: int) -> dict:
+    """
+    Build an OCR-style page result (rec_texts, rec_polys, rec_scores) from the
+    text layer. Words are joined into lines by PyMuPDF's block/line numbers, as
+    PaddleOCR recognizes whole text lines, and boxes are given in the pixel frame
+    of the page rendered at `dpi`.
+    """
+    scale = dpi / 72
+    # Word boxes come in unrotated page space; map them to the rendered orientation
+    to_pixels = page.rotation_matrix * fitz.Matrix(scale, scale)
+
+    lines: Dict[Tuple[int, int], List[tuple]] = {}
+    for x0, y0, x1, y1, word, block_no, line_no, word_no in page.get_text("words", sort=True):
+        lines.setdefault((block_no, line_no), []).append((word_no, word, fitz.Rect(x0, y0, x1, y1)))
+
+    rec_texts, rec_polys, rec_scores = [], [], []
+    for words in lines.values():
+        words.sort(key=lambda item: item[0])
+        bounds = fitz.Rect()
+        for _, _, rect in words:
+            bounds |= rect
+        box = (bounds * to_pixels).round()
+        rec_texts.append(" ".join(word for _, word, _ in words))
+        rec_polys.append([[box.x0, box.y0], [box.x1, box.y0], [box.x1, box.y1], [box.x0, box.y1]])
+        rec_scores.append(TEXT_LAYER_SCORE)
+    return {"rec_texts": rec_texts, "rec_polys": rec_polys, "rec_scores": rec_scores}
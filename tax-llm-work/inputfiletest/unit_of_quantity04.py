@@ -1,54 +1,17 @@
 import pandas as pd
-import re
+from commodity import parse_commodity_numbers
+from patterns import UNIT, UNIT_CONTEXT_PATTERNS, UNIT_CONTEXTS, UNIT_PATTERNS
+from table_schema import FINAL_TABLE_DTYPES, read_table, write_table
+from word_index import WordIndex
 
-CLEAN_CSV = r'new-work/output/cleaned_classified_words.csv'
-FINAL_CSV = r'new-work/output/final-table.csv'
+CLEAN_CSV = r'new-work/output/cleaned_classified_words.parquet'
+FINAL_CSV = r'new-work/output/final-table.parquet'
 
 # Pattern to identify units of quantity
-unit_patterns = [
-    r'\b(lb|lbs|pound|pounds)\b',
-    r'\b(kg|kilogram|kilograms)\b',
-    r'\b(ton|tons|tonne|tonnes)\b',
-    r'\b(gal|gallon|gallons)\b',
-    r'\b(qt|quart|quarts)\b',
-    r'\b(pt|pint|pints)\b',
-    r'\b(oz|ounce|ounces)\b',
-    r'\b(cu\s?ft|cubic\s+feet?)\b',
-    r'\b(sq\s?ft|square\s+feet?)\b',
-    r'\b(linear\s+feet?|lin\s?ft)\b',
-    r'\b(yard|yards|yd)\b',
-    r'\b(meter|metres?|m)\b',
-    r'\b(each|ea)\b',
-    r'\b(dozen|doz)\b',
-    r'\b(gross)\b',
-    r'\b(case|cases)\b',
-    r'\b(box|boxes)\b',
-    r'\b(bag|bags)\b',
-    r'\b(bale|bales)\b',
-    r'\b(bundle|bundles)\b',
-    r'\b(head|hd)\b',  # For livestock
-    r'\b(no|number)\b',  # Sometimes "No" indicates quantity units
-]
+unit_patterns = UNIT_PATTERNS
 
 # Context-aware patterns for specific commodities
-context_patterns = {
-    'livestock': {
-        'patterns': [r'cattle', r'sheep', r'lamb', r'swine', r'pig', r'horse', r'animal'],
-        'units': ['No', 'Head']
-    },
-    'weight_based': {
-        'patterns': [r'meat', r'beef', r'pork', r'carcass', r'dressed', r'fresh', r'frozen'],
-        'units': ['Lb', 'Cwt']
-    },
-    'volume_based': {
-        'patterns': [r'liquid', r'oil', r'milk', r'beverage'],
-        'units': ['Gal', 'Qt']
-    },
-    'count_based': {
-        'patterns': [r'eggs', r'birds', r'chickens', r'turkeys', r'ducks', r'poultry'],
-        'units': ['No', 'Doz']
-    }
-}
+context_patterns = UNIT_CONTEXT_PATTERNS
 
 def extract_unit_from_text(text, context_description=''):
     """
@@ -62,26 +25,23 @@ def extract_unit_from_text(text, context_description=''):
     combined_text = f"{text_lower} {context_lower}".strip()
     
     # Check context-specific patterns
-    for context_type, context_info in context_patterns.items():
-        for pattern in context_info['patterns']:
-            if re.search(pattern, combined_text, re.IGNORECASE):
-                for unit in context_info['units']:
-                    unit_pattern = rf'\b{re.escape(unit.lower())}\b'
-                    if re.search(unit_pattern, combined_text, re.IGNORECASE):
-                        return unit
-                return context_info['units'][0]  # Default to the first unit if no match
+    for context_type, context_regex, unit_regexes in UNIT_CONTEXTS:
+        if context_regex.search(combined_text):
+            for unit, unit_regex in unit_regexes:
+                if unit_regex.search(combined_text):
+                    return unit
+            return unit_regexes[0][0]  # Default to the first unit if no match
 
-    # General pattern matching
-    for pattern in unit_patterns:
-        match = re.search(pattern, text_lower, re.IGNORECASE)
-        if match:
-            matched_text = match.group(0).lower()
-            return {
-                'lb': 'Lb', 'lbs': 'Lb', 'pound': 'Lb', 'pounds': 'Lb',
-                'no': 'No', 'number': 'No',
-                'each': 'No', 'ea': 'No',
-                'head': 'Head', 'hd': 'Head'
-            }.get(matched_text, matched_text.capitalize())
+    # General pattern matching (first of unit_patterns that matches)
+    match = UNIT.search(text_lower)
+    if match:
+        matched_text = match.group(0).lower()
+        return {
+            'lb': 'Lb', 'lbs': 'Lb', 'pound': 'Lb', 'pounds': 'Lb',
+            'no': 'No', 'number': 'No',
+            'each': 'No', 'ea': 'No',
+            'head': 'Head', 'hd': 'Head'
+        }.get(matched_text, matched_text.capitalize())
     
     return ''
 
@@ -104,7 +64,7 @@ def infer_unit_from_commodity_type(commodity_num, description):
     
     # Default fallback based on commodity number ranges
     try:
-        num = int(commodity_num.replace(' ', ''))
+        num = int(str(commodity_num).replace(' ', ''))
         if 100 <= num <= 199:  # Livestock range (example)
             return 'No'
         elif 200 <= num <= 299:  # Meat products range (example)
@@ -118,46 +78,42 @@ def add_units():
     """
     Main function to process and add units of quantity to the final table.
     """
-    df_clean = pd.read_csv(CLEAN_CSV)
-    df_final = pd.read_csv(FINAL_CSV)
-    
+    df_final = assign_units(read_table(CLEAN_CSV), read_table(FINAL_CSV))
+    write_table(df_final, FINAL_CSV, FINAL_TABLE_DTYPES)
+    print(f"Saved units of quantity to {FINAL_CSV}")
+
+def assign_units(df_clean, df_final, word_index=None):
+    """
+    Fill the unit of quantity column of the final table from the cleaned words
+    table and return the final table. word_index is a WordIndex over df_clean;
+    it is built when not given.
+    """
     commodity_units = {}
-    commodity_descriptions = {}
 
-    # Collect descriptions for each commodity
-    for _, row in df_clean.iterrows():
-        commodity_num = str(row.get('Commodity Number', '')).strip()
-        description = str(row.get('Commodity Description', '')).strip()
-        if commodity_num and description:
-            commodity_descriptions.setdefault(commodity_num, []).append(description)
+    # Collect descriptions for each commodity key
+    keys = parse_commodity_numbers(df_clean['Commodity Number'])
+    descriptions = df_clean['Commodity Description'].astype(str).str.strip()
+    has_description = keys.notna() & df_clean['Commodity Description'].notna() & (descriptions != '')
+    commodity_context = descriptions[has_description].groupby(keys[has_description], sort=False).agg(' '.join)
     
-    # Extract units with context awareness
-    for _, row in df_clean.iterrows():
-        description = str(row.get('Commodity Description', '')).strip()
-        y_coord = row.get('TopLeft_Y', 0)
-        tolerance = 30
-        
-        nearby_commodities = df_clean[
-            (df_clean['Commodity Number'].notna()) &
-            (abs(df_clean['TopLeft_Y'] - y_coord) <= tolerance)
-        ]
-        
-        if not nearby_commodities.empty:
-            commodity_num = str(nearby_commodities.iloc[0]['Commodity Number']).strip()
-            context_descriptions = commodity_descriptions.get(commodity_num, [])
-            full_context = ' '.join(context_descriptions)
-            unit = extract_unit_from_text(description, full_context) or infer_unit_from_commodity_type(commodity_num, full_context)
+    # Extract units with context awareness, using the nearest commodity number on the same page
+    tolerance = 30
+    if word_index is None:
+        word_index = WordIndex(df_clean)
+    commodity_index = word_index.subset(keys.notna())
+    nearest_keys = parse_commodity_numbers(commodity_index.nearest_values(df_clean, 'Commodity Number', tolerance))
+    for description, commodity_key in zip(descriptions, nearest_keys):
+        if pd.notna(commodity_key):
+            full_context = commodity_context.get(commodity_key, '')
+            unit = extract_unit_from_text(description, full_context) or infer_unit_from_commodity_type(commodity_key, full_context)
             if unit:
-                commodity_units[commodity_num] = unit
-    
-    # Update final table
-    for idx, row in df_final.iterrows():
-        commodity_num = str(row.get('SCHEDULE A COMMODITY NUMBER', '')).strip()
-        unit = commodity_units.get(commodity_num, 'No')
-        df_final.at[idx, 'UNIT OF QUANTITY'] = unit
+                commodity_units[commodity_key] = unit
     
-    df_final.to_csv(FINAL_CSV, index=False)
-    print(f"Updated {len(commodity_units)} units in {FINAL_CSV}")
+    # Update final table, joined on the commodity key
+    final_keys = parse_commodity_numbers(df_final['SCHEDULE A COMMODITY NUMBER'])
+    df_final['UNIT OF QUANTITY'] = final_keys.map(commodity_units).fillna('No').astype(object)
+    print(f"Updated {len(commodity_units)} units")
+    return df_final
 
 def main():
     """
@@ -0,0 +1,103 @@
+"""
+Page-aware spatial index over the cleaned OCR words.
+
+Stages 03-05 look up words by position: the commodity number printed on the
+same line as a description, and the words of a text row. Filtering the whole
+words table per lookup is O(N) each time and, without a Page filter, mixes up
+words from different pages at the same height.
+
+WordIndex sorts the words once per page by Y, and nearest-in-Y lookups place
+a whole batch of words at once (see geometry.nearest_anchor). One index is
+built per words table and handed to the stages (the pipeline keeps it on its
+PipelineContext); each stage builds its own only when run on its own.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from geometry import assign_row_ids, group_bounds, nearest_in_sorted
+
+
+class WordIndex:
+    """
+    Words (rows of the cleaned words table) indexed by page and Y position.
+
+    Query results are Series aligned with the index labels of the queried
+    rows, or positions into `words` for nearest_in_y(). Without a page column
+    all words are treated as one page.
+    """
+
+    def __init__(self, words: pd.DataFrame, y_column: str = 'TopLeft_Y', page_column: Optional[str] = 'Page'):
+        self.words = words
+        self.y_column = y_column
+        self.page_column = page_column if page_column in words.columns else None
+        self.y = words[y_column].to_numpy(dtype=float)
+
+        if self.page_column is None:
+            self.page_codes = np.zeros(len(words), dtype=np.int64)
+            self.pages = pd.Index([None])
+        else:
+            self.page_codes, self.pages = pd.factorize(words[self.page_column], sort=True)
+
+        # Positions ordered by (page, y); missing coordinates sort last in their page
+        self.by_y = np.lexsort((self.y, self.page_codes))
+        codes, starts, ends = group_bounds(self.page_codes[self.by_y])
+        self._page_slices = {code: (start, end) for code, start, end in zip(codes.tolist(), starts, ends)}
+
+    def subset(self, mask) -> 'WordIndex':
+        """A new index over the rows where mask is True (e.g. rows with a commodity number)."""
+        return WordIndex(self.words[np.asarray(mask, dtype=bool)], self.y_column, self.page_column)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _sorted_page(self, page_code: int):
+        """(positions, Y values) of one page's words in Y order, missing Y values dropped."""
+        start, end = self._page_slices.get(page_code, (0, 0))
+        positions = self.by_y[start:end]
+        coordinates = self.y[positions]
+        valid = ~np.isnan(coordinates)
+        return positions[valid], coordinates[valid]
+
+    def row_ids(self, tolerance: float, mode: str = "gap") -> pd.Series:
+        """Text-row id per word, numbered page by page (see geometry.assign_row_ids)."""
+        groups = self.page_codes if self.page_column is not None else None
+        return pd.Series(assign_row_ids(self.y, tolerance, groups, mode), index=self.words.index, name='Row_Id')
+
+    def nearest_in_y(self, queries: pd.DataFrame, tolerance: float) -> np.ndarray:
+        """
+        For each row of queries, the position (into words) of the indexed word
+        nearest in Y on the same page and at most tolerance away, or -1. Ties
+        go to the word listed first. Pages are ignored when either side has
+        no page column.
+        """
+        query_y = queries[self.y_column].to_numpy(dtype=float)
+        result = np.full(len(queries), -1, dtype=np.int64)
+        if len(queries) == 0 or len(self.words) == 0:
+            return result
+
+        if self.page_column is None or self.page_column not in queries.columns:
+            valid = np.flatnonzero(~np.isnan(self.y))
+            order = valid[np.argsort(self.y[valid], kind='stable')]
+            found = ~np.isnan(query_y)
+            result[found] = nearest_in_sorted(self.y[order], order, query_y[found], tolerance)
+            return result
+
+        query_codes = self.pages.get_indexer(queries[self.page_column])
+        query_order = np.flatnonzero((query_codes >= 0) & ~np.isnan(query_y))
+        query_order = query_order[np.argsort(query_codes[query_order], kind='stable')]
+        for code, start, end in zip(*group_bounds(query_codes[query_order])):
+            positions, coordinates = self._sorted_page(code)
+            group = query_order[start:end]
+            result[group] = nearest_in_sorted(coordinates, positions, query_y[group], tolerance)
+        return result
+
+    def nearest_values(self, queries: pd.DataFrame, column: str, tolerance: float) -> pd.Series:
+        """nearest_in_y() as the nearest word's `column` value (NaN when none), aligned with queries.index."""
+        positions = self.nearest_in_y(queries, tolerance)
+        values = self.words[column].to_numpy(dtype=object)
+        found = positions >= 0
+        out = np.full(len(queries), np.nan, dtype=object)
+        out[found] = values[positions[found]]
+        return pd.Series(out, index=queries.index, name=column)